@@ -12,6 +12,9 @@ from app.infrastructure.database.repositories.inventory_repository import Invent
 from app.infrastructure.database.repositories.movement_repository import MovementRepository
 from app.infrastructure.database.repositories.report_repository import ReportRepository
 from app.infrastructure.database.repositories.system_repository import SystemRepository
+from app.infrastructure.database.repositories.reservation_repository import (
+    ReservationRepository,
+)
 
 # Services
 from app.core.services.location_service import LocationService
@@ -20,6 +23,7 @@ from app.core.services.inventory_service import InventoryService
 from app.core.services.movement_service import MovementService
 from app.core.services.report_service import ReportService
 from app.core.services.system_service import SystemService
+from app.core.services.reservation_service import ReservationService
 
 
 # === Repositories ===
@@ -55,6 +59,11 @@ def get_system_repository(pool: Pool = Depends(get_db_pool)) -> SystemRepository
     return SystemRepository(pool)
 
 
+def get_reservation_repository(pool: Pool = Depends(get_db_pool)) -> ReservationRepository:
+    """DI для ReservationRepository"""
+    return ReservationRepository(pool)
+
+
 # === Services ===
 
 
@@ -102,3 +111,10 @@ def get_system_service(
 ) -> SystemService:
     """DI для SystemService"""
     return SystemService(system_repository)
+
+
+def get_reservation_service(
+    reservation_repository: ReservationRepository = Depends(get_reservation_repository),
+) -> ReservationService:
+    """DI для ReservationService"""
+    return ReservationService(reservation_repository)
@@ -1,23 +1,33 @@
 """API endpoints для контейнеров"""
 
 from fastapi import APIRouter, Depends, status, Query, Path
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
 from app.core.schemas.container import (
     ContainerRegister,
     ContainerRegisterResponse,
     ContainerResponse,
+    ContainerBatchLookup,
+    ContainerBatchLookupResponse,
     ContainerLocationUpdate,
     ContainerLocationUpdateResponse,
     ContainerUnpack,
     ContainerUnpackResponse,
+    ContainerUnpackBatch,
+    ContainerUnpackBatchResponse,
     ContainerStatusUpdate,
     ContainerStatusUpdateResponse,
+    ContainerBulkStatusUpdate,
+    ContainerBulkStatusUpdateResponse,
     ContainerHistoryItem,
     ContainerInLocation,
+    ContainerSubtreePage,
 )
 from app.core.services.container_service import ContainerService
 from app.api.v1.dependencies import get_container_service
+from app.shared.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.shared.utils.streaming import NDJSON_MEDIA_TYPE
 
 router = APIRouter(prefix="/containers", tags=["Контейнеры"])
 
@@ -49,6 +59,54 @@ async def register_container(
     return await service.register_container(data)
 
 
+@router.post("/status/bulk", response_model=ContainerBulkStatusUpdateResponse)
+async def bulk_update_container_status(
+    data: ContainerBulkStatusUpdate,
+    service: ContainerService = Depends(get_container_service),
+):
+    """
+    Массово обновить статус контейнеров
+
+    Меняет статус всех контейнеров, отобранных по списку ID и/или фильтрам,
+    одним запросом. Заблокированные контейнеры не меняются и
+    возвращаются в skipped_blocked.
+
+    **Параметры:**
+    - **status**: Новый статус
+    - **container_ids**: Список ID контейнеров (опционально)
+    - **location_id**: Все контейнеры в поддереве локации (опционально)
+    - **batch_number**: Контейнеры с партией в содержимом (опционально)
+    - **container_type**: Тип контейнера (опционально)
+
+    Фильтры объединяются через AND; нужен хотя бы один.
+
+    **Возвращает:**
+    - Обновлённые, пропущенные (blocked) и ненайденные контейнеры
+    """
+    return await service.bulk_update_container_status(data)
+
+
+@router.post("/lookup", response_model=ContainerBatchLookupResponse)
+async def lookup_containers(
+    data: ContainerBatchLookup,
+    service: ContainerService = Depends(get_container_service),
+):
+    """
+    Получить контейнеры по списку QR-кодов
+
+    Пакетный вариант GET /containers/{qr_code} для сверки отсканированных
+    кодов после восстановления связи терминала. Все коды разрешаются одним
+    запросом.
+
+    **Параметры:**
+    - **qr_codes**: Список QR-кодов (до 1000)
+
+    **Возвращает:**
+    - Найденные контейнеры и список ненайденных QR-кодов
+    """
+    return await service.lookup_containers(data)
+
+
 @router.get("/{qr_code}", response_model=ContainerResponse)
 async def get_container(
     qr_code: str = Path(..., description="QR-код контейнера"),
@@ -115,6 +173,30 @@ async def unpack_container(
     return await service.unpack_container(container_id, data)
 
 
+@router.post("/{container_id}/unpack-batch", response_model=ContainerUnpackBatchResponse)
+async def unpack_container_lines(
+    container_id: int = Path(..., description="ID контейнера"),
+    data: ContainerUnpackBatch = ...,
+    service: ContainerService = Depends(get_container_service),
+):
+    """
+    Вскрыть контейнер по нескольким позициям
+
+    Извлекает несколько товаров из контейнера в россыпь за один запрос.
+    Все позиции применяются в одной транзакции: при нехватке любой позиции
+    изменения не сохраняются.
+
+    **Параметры:**
+    - **container_id**: ID контейнера
+    - **qr_code**: QR-код контейнера (для проверки)
+    - **lines**: Список позиций (product_id, quantity)
+
+    **Возвращает:**
+    - Для каждой позиции: оставшееся количество в контейнере и россыпи
+    """
+    return await service.unpack_container_lines(container_id, data)
+
+
 @router.patch("/{container_id}/status", response_model=ContainerStatusUpdateResponse)
 async def update_container_status(
     container_id: int = Path(..., description="ID контейнера"),
@@ -181,3 +263,62 @@ async def get_containers_in_location(
     - Список контейнеров в локации
     """
     return await service.get_containers_in_location(location_id, status, container_type)
+
+
+@router.get(
+    "/location/{location_id}/subtree",
+    response_model=ContainerSubtreePage,
+)
+async def get_containers_in_subtree(
+    location_id: int = Path(..., description="ID корневой локации (зона, стеллаж, ...)"),
+    status: Optional[str] = Query(None, description="Фильтр по статусу"),
+    container_type: Optional[str] = Query(None, description="Фильтр по типу контейнера"),
+    after_id: Optional[int] = Query(None, description="Курсор: container_id последней записи"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    service: ContainerService = Depends(get_container_service),
+):
+    """
+    Получить контейнеры во всём поддереве локации
+
+    Возвращает контейнеры во всех дочерних локациях (через LTREE) с
+    количеством товаров и единиц по каждому контейнеру.
+    Постраничная выдача по курсору (keyset по container_id).
+
+    **Параметры:**
+    - **location_id**: ID корневой локации
+    - **status**: Фильтр по статусу (опционально)
+    - **container_type**: Фильтр по типу контейнера (опционально)
+    - **after_id**: Курсор из next_after_id предыдущей страницы (опционально)
+    - **limit**: Размер страницы (по умолчанию 100, максимум 1000)
+
+    **Возвращает:**
+    - Страницу контейнеров и курсор следующей страницы
+    """
+    return await service.get_containers_in_subtree(
+        location_id, status, container_type, after_id, limit
+    )
+
+
+@router.get("/location/{location_id}/subtree/stream")
+async def stream_containers_in_subtree(
+    location_id: int = Path(..., description="ID корневой локации (зона, стеллаж, ...)"),
+    status: Optional[str] = Query(None, description="Фильтр по статусу"),
+    container_type: Optional[str] = Query(None, description="Фильтр по типу контейнера"),
+    service: ContainerService = Depends(get_container_service),
+):
+    """
+    Выгрузить контейнеры поддерева локации потоком
+
+    Отдаёт все контейнеры поддерева в формате NDJSON (один JSON-объект
+    на строку) без загрузки всего списка в память. Подходит для аудита зоны.
+
+    **Параметры:**
+    - **location_id**: ID корневой локации
+    - **status**: Фильтр по статусу (опционально)
+    - **container_type**: Фильтр по типу контейнера (опционально)
+
+    **Возвращает:**
+    - Поток NDJSON с контейнерами (формат как в /subtree)
+    """
+    stream = await service.stream_containers_in_subtree(location_id, status, container_type)
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
@@ -1,18 +1,34 @@
 """API endpoints для инвентаря (остатков)"""
 
-from fastapi import APIRouter, Depends, Query, Path
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, Query, Path, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 
 from app.core.schemas.inventory import (
     InventoryItemResponse,
+    ProductStockBatchRequest,
     InventoryInLocationResponse,
     InventorySummaryResponse,
     InventoryInContainerResponse,
     LooseInventoryResponse,
     InventorySearchResult,
+    InventoryDeltaResponse,
+    InventorySubtreeAggregate,
+    AllocationRequest,
+    AllocationResponse,
+    BatchExpiryUpdate,
+    BatchAgeResponse,
 )
 from app.core.services.inventory_service import InventoryService
 from app.api.v1.dependencies import get_inventory_service
+from app.shared.constants import MIN_SUMMARY_STALENESS
+from app.shared.utils.streaming import (
+    NDJSON_MEDIA_TYPE,
+    CSV_MEDIA_TYPE,
+    SSE_MEDIA_TYPE,
+    accepts_gzip,
+    gzip_stream,
+)
 
 router = APIRouter(prefix="/inventory", tags=["Остатки"])
 
@@ -37,6 +53,29 @@ async def get_inventory_by_product(
     return await service.get_inventory_by_product(product_id)
 
 
+@router.post("/products/stock")
+async def get_stock_by_products(
+    data: ProductStockBatchRequest,
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Получить остатки списка товаров
+
+    Пакетный вариант GET /inventory/product/{product_id}: остатки всех
+    переданных товаров одним запросом к БД. Ответ отдаётся потоком NDJSON,
+    одна строка на товар с разбивкой по локациям, партиям и контейнерам.
+
+    **Параметры:**
+    - **product_ids**: Список ID товаров (до 5000)
+
+    **Возвращает:**
+    - Поток NDJSON: product_id, product_name, total_quantity, items.
+      Товары без остатков идут в конце с total_quantity = 0
+    """
+    stream = await service.stream_stock_by_products(data.product_ids)
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get("/location/{location_id}", response_model=List[InventoryInLocationResponse])
 async def get_inventory_by_location(
     location_id: int = Path(..., description="ID локации"),
@@ -56,9 +95,97 @@ async def get_inventory_by_location(
     return await service.get_inventory_by_location(location_id)
 
 
+@router.get("/location/{location_id}/subtree", response_model=List[InventorySubtreeAggregate])
+async def get_subtree_inventory(
+    location_id: int = Path(..., description="ID локации"),
+    group_by: Literal["product", "batch", "status"] = Query(
+        "product", description="Группировка: по товару, партии или статусу"
+    ),
+    breakdown: bool = Query(False, description="Разбивка по дочерним локациям"),
+    product_id: Optional[str] = Query(None, description="Фильтр по ID товара"),
+    loose_only: bool = Query(False, description="Только россыпь"),
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Получить остатки в поддереве локации
+
+    Суммирует остатки локации и всех вложенных локаций (зона, стеллаж,
+    секция...) без обхода дерева на клиенте.
+
+    **Параметры:**
+    - **location_id**: ID корневой локации поддерева
+    - **group_by**: product - по товарам, batch - по товарам и партиям,
+      status - по товарам и статусам
+    - **breakdown**: Разбить итоги по прямым дочерним локациям
+    - **product_id**: Только указанный товар (опционально)
+    - **loose_only**: Учитывать только россыпь
+
+    **Возвращает:**
+    - Итоги: количество, число локаций, в контейнерах и россыпью
+    """
+    return await service.get_subtree_inventory(
+        location_id,
+        group_by=group_by,
+        breakdown=breakdown,
+        product_id=product_id,
+        loose_only=loose_only,
+    )
+
+
+@router.post("/allocate", response_model=AllocationResponse)
+async def allocate_inventory(
+    data: AllocationRequest,
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Построить план отбора заказа (FIFO/FEFO)
+
+    Для каждой строки заказа возвращает, из каких локаций, контейнеров
+    и партий отбирать товар. Партии списываются по политике: fifo - по дате
+    первой приёмки, fefo - по сроку годности (партии без срока - после
+    партий со сроком). Внутри партии предпочтительна россыпь
+    в pickable-локациях. Зарезервированный товар не распределяется,
+    кроме товара в резерве самого заказа (reservation_id).
+
+    **Параметры:**
+    - **policy**: fifo или fefo (по умолчанию fifo)
+    - **lines**: Строки заказа: product_id, quantity (до 500)
+    - **reservation_id**: Активный резерв заказа (опционально)
+
+    **Возвращает:**
+    - План отбора по строкам; shortage - сколько не хватило
+    """
+    return await service.allocate(data)
+
+
+@router.put("/batches/expiry", response_model=BatchAgeResponse)
+async def update_batch_expiry(
+    data: BatchExpiryUpdate,
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Задать срок годности партии
+
+    Срок годности используется политикой FEFO при аллокации.
+
+    **Параметры:**
+    - **product_id**: ID товара
+    - **batch_number**: Номер партии
+    - **expires_at**: Срок годности (null - сбросить)
+
+    **Возвращает:**
+    - Дата первой приёмки и срок годности партии
+    """
+    return await service.update_batch_expiry(data)
+
+
 @router.get("/summary", response_model=List[InventorySummaryResponse])
 async def get_inventory_summary(
+    response: Response,
     category: Optional[str] = Query(None, description="Фильтр по категории"),
+    max_staleness: Optional[int] = Query(
+        None, ge=MIN_SUMMARY_STALENESS, description="Допустимый возраст данных в секундах"
+    ),
     service: InventoryService = Depends(get_inventory_service),
 ):
     """
@@ -67,13 +194,27 @@ async def get_inventory_summary(
     Возвращает суммарные остатки по всем товарам
     с разбивкой на количество в контейнерах и россыпью.
 
+    Без max_staleness данные считаются по живому представлению v_product_stock.
+    С max_staleness читается материализованное mv_product_stock; если оно
+    старше указанного числа секунд, оно обновляется перед чтением.
+    Возраст данных в секундах возвращается в заголовке X-Data-Age.
+    Движения горячих товаров (wms.hot_inventory_keys) попадают в сводку
+    после переноса их счётчиков в inventory (HOT_COUNTER_COMPACT_INTERVAL).
+
     **Параметры:**
     - **category**: Фильтр по категории товаров (опционально)
+    - **max_staleness**: Допустимый возраст данных в секундах, не меньше 5 (опционально)
 
     **Возвращает:**
     - Агрегированные остатки по товарам
     """
-    return await service.get_inventory_summary(category)
+    if max_staleness is None:
+        response.headers["X-Data-Age"] = "0"
+        return await service.get_inventory_summary(category)
+
+    items, age = await service.get_inventory_summary_cached(category, max_staleness)
+    response.headers["X-Data-Age"] = f"{age:.3f}"
+    return items
 
 
 @router.get("/container/{qr_code}", response_model=List[InventoryInContainerResponse])
@@ -117,18 +258,142 @@ async def get_loose_inventory(
 @router.get("/search", response_model=List[InventorySearchResult])
 async def search_inventory(
     query: str = Query(..., min_length=2, description="Поисковый запрос"),
+    mode: Literal["full", "typeahead"] = Query("full", description="Режим поиска"),
+    limit: int = Query(50, ge=1, le=200, description="Максимум результатов"),
     service: InventoryService = Depends(get_inventory_service),
 ):
     """
     Поиск товара на складе
 
     Ищет товар по product_id, названию, номеру партии или коду контейнера.
-    Результаты отсортированы по релевантности.
+    Результаты отсортированы по релевантности. Каждое поле ищется
+    по своему триграммному индексу.
+    Движения горячих товаров (wms.hot_inventory_keys) попадают в результаты
+    после переноса их счётчиков в inventory (HOT_COUNTER_COMPACT_INTERVAL).
 
     **Параметры:**
     - **query**: Поисковый запрос (минимум 2 символа)
+    - **mode**:
+      - full - точный product_id, затем название с начала, затем остальное
+      - typeahead - для автодополнения: сначала совпадения по началу
+        product_id, названия, партии и кода контейнера
+    - **limit**: Максимум результатов (по умолчанию 50)
+
+    **Возвращает:**
+    - Список найденных товаров с локациями
+    """
+    return await service.search_inventory(query, mode, limit)
+
+
+@router.get("/export")
+async def export_inventory(
+    request: Request,
+    export_format: Literal["csv", "ndjson"] = Query(
+        "csv", alias="format", description="Формат выгрузки"
+    ),
+    zone_type: Optional[str] = Query(None, description="Фильтр по типу зоны"),
+    status: Optional[str] = Query(None, description="Фильтр по статусу остатка"),
+    location_id: Optional[int] = Query(None, description="Только поддерево локации"),
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Выгрузить все остатки
+
+    Полная выгрузка inventory с локациями и товарами для BI и синхронизации
+    с маркетплейсами. Данные читаются через server-side cursor и отдаются
+    потоком с постоянным расходом памяти. Если клиент передал
+    `Accept-Encoding: gzip` (с q > 0), ответ сжимается на лету.
+    Движения горячих товаров (wms.hot_inventory_keys) попадают в выгрузку
+    после переноса их счётчиков в inventory (HOT_COUNTER_COMPACT_INTERVAL).
+
+    **Параметры:**
+    - **format**: csv (по умолчанию) или ndjson
+    - **zone_type**: Фильтр по типу зоны (опционально)
+    - **status**: Фильтр по статусу остатка (опционально)
+    - **location_id**: Только остатки в поддереве локации (опционально)
+
+    **Возвращает:**
+    - Поток CSV или NDJSON
+    """
+    stream = await service.export_inventory(export_format, zone_type, status, location_id)
+    media_type = NDJSON_MEDIA_TYPE if export_format == "ndjson" else CSV_MEDIA_TYPE
+    headers = {
+        "Content-Disposition": f'attachment; filename="inventory.{export_format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        stream = gzip_stream(stream)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
+
+@router.get("/changes", response_model=InventoryDeltaResponse)
+async def get_inventory_changes(
+    since: Optional[str] = Query(None, description="Watermark предыдущего запроса"),
+    limit: int = Query(1000, ge=1, le=10000, description="Максимум просматриваемых изменений"),
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Товары, остатки которых изменились после watermark (delta-sync)
+
+    Вместо периодической полной выгрузки сводки клиент хранит watermark
+    и забирает только изменившиеся товары с их текущими итогами.
+    Первый запрос без since возвращает текущий watermark; его нужно взять
+    до полной выгрузки. Изменения хранятся CHANGE_FEED_RETENTION; если
+    watermark старше, ответ приходит с resync_required=true - нужна полная
+    выгрузка и новый next_watermark. Если has_more=true, следующую порцию можно
+    запросить сразу.
+    Движения горячих товаров (wms.hot_inventory_keys) попадают в ленту
+    после переноса их счётчиков в inventory (HOT_COUNTER_COMPACT_INTERVAL).
+
+    **Параметры:**
+    - **since**: Watermark из next_watermark предыдущего ответа (опционально)
+    - **limit**: Максимум просматриваемых изменений за запрос (1-10000)
+
+    **Возвращает:**
+    - Итоги изменившихся товаров (нулевые - если товар закончился)
+    - next_watermark, has_more и resync_required
+    """
+    return await service.get_changes_since(since=since, limit=limit)
+
+
+@router.get("/changes/stream")
+async def stream_inventory_changes(
+    product_id: Optional[str] = Query(None, description="Фильтр по ID товара"),
+    location_id: Optional[int] = Query(None, description="Фильтр по поддереву локации"),
+    zone_type: Optional[str] = Query(None, description="Фильтр по типу зоны"),
+    after: Optional[str] = Query(None, description="Токен продолжения"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    service: InventoryService = Depends(get_inventory_service),
+):
+    """
+    Лента изменений остатков (Server-Sent Events)
+
+    Отдаёт изменения остатков в реальном времени вместо периодического
+    опроса. Каждое событие `inventory` содержит старое и новое количество
+    и delta. `id` события - токен продолжения: при переподключении клиент
+    передаёт его в заголовке Last-Event-ID (браузерный EventSource делает
+    это сам) или в параметре after и получает всё пропущенное. Если токен
+    старше срока хранения ленты, первым приходит событие `resync`: клиент
+    перечитывает остатки целиком, лента продолжается с текущей позиции.
+
+    **Параметры:**
+    - **product_id**: Только изменения товара (опционально)
+    - **location_id**: Только изменения в поддереве локации (опционально)
+    - **zone_type**: Только изменения в зонах типа (опционально)
+    - **after**: Токен продолжения (опционально, Last-Event-ID приоритетнее)
 
     **Возвращает:**
-    - Список найденных товаров с локациями (максимум 50 результатов)
+    - Поток text/event-stream
     """
-    return await service.search_inventory(query)
+    stream = await service.stream_changes(
+        after=last_event_id or after,
+        product_id=product_id,
+        location_id=location_id,
+        zone_type=zone_type,
+    )
+    return StreamingResponse(
+        stream,
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
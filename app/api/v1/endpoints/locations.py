@@ -1,8 +1,8 @@
 """API endpoints для локаций"""
 
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, Header, status, Query, Response
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
 
 from app.core.schemas.location import (
     LocationCreate,
@@ -12,13 +12,32 @@ from app.core.schemas.location import (
     LocationDeactivateResponse,
     ZoneResponse,
     LocationTreeNode,
+    LocationBreadcrumb,
+    LocationSuggestion,
+    LocationTemplate,
+    LocationTemplateResponse,
+    LocationSubtreeUpdate,
+    LocationSubtreeUpdateResponse,
+    PutawaySlot,
+    PutawayReservationCreate,
+    PutawayReservationResponse,
+    PutawayPlanRequest,
+    PutawayPlanResponse,
+    PickPathRequest,
+    PickPathResponse,
 )
-from app.core.services.location_service import LocationService
+from app.core.services.location_service import LocationService, zones_tree_etag
 from app.core.services.label_service import LabelService
 from app.api.v1.dependencies import get_location_service
+from app.core.enums import ZoneType
+from app.shared.constants import LTREE_PATH_PATTERN, MAX_LOCATION_LEVEL, MAX_PAGE_SIZE
+from app.shared.utils.streaming import NDJSON_MEDIA_TYPE
 
 router = APIRouter(prefix="/locations", tags=["Локации"])
 
+# Сколько свободных ячеек возвращать по умолчанию
+DEFAULT_SLOTS_LIMIT = 10
+
 
 @router.post("", response_model=LocationResponse, status_code=status.HTTP_201_CREATED)
 async def create_location(
@@ -47,6 +66,42 @@ async def create_location(
     return await service.create_location(data)
 
 
+@router.post(
+    "/generate", response_model=LocationTemplateResponse, status_code=status.HTTP_201_CREATED
+)
+async def generate_locations(
+        template: LocationTemplate,
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Сгенерировать поддерево локаций по шаблону
+
+    Создаёт всю структуру (например, ряды → секции → ярусы → ячейки) в одной
+    транзакции. Каждый уровень шаблона создаётся под каждой локацией
+    предыдущего уровня.
+
+    Пример: ряды 01–20, секции S01–S10, ярусы L01–L05, ячейки A–D:
+    ```
+    {"parent_location_id": 2, "levels": [
+      {"zone_type": "storage", "count": 20},
+      {"zone_type": "storage", "prefix": "S", "count": 10},
+      {"zone_type": "storage", "prefix": "L", "count": 5},
+      {"zone_type": "storage", "labels": ["A", "B", "C", "D"],
+       "max_weight": 500, "max_volume": 1.2, "is_pickable": true}
+    ]}
+    ```
+
+    **Параметры:**
+    - **parent_location_id**: ID локации, под которой строится поддерево
+    - **levels**: Уровни сверху вниз: zone_type, названия (prefix + count/start/width
+      или labels), max_weight, max_volume, is_pickable, metadata
+
+    **Возвращает:**
+    - Сводку: сколько локаций создано на каждом уровне, первый и последний код
+    """
+    return await service.generate_locations(template)
+
+
 @router.get("/zones", response_model=List[ZoneResponse])
 async def get_zones(
         service: LocationService = Depends(get_location_service)
@@ -65,6 +120,7 @@ async def get_zones(
 @router.get("/zones/tree", response_model=List[LocationTreeNode])
 async def get_zones_tree(
         max_level: int = Query(5, ge=0, le=5, description="Максимальный уровень вложенности (0-5)"),
+        if_none_match: Optional[str] = Header(None),
         service: LocationService = Depends(get_location_service)
 ):
     """
@@ -72,6 +128,10 @@ async def get_zones_tree(
 
     Возвращает вложенную структуру локаций с ограничением по уровню.
 
+    Дерево кэшируется до изменения локаций. Ответ содержит ETag:
+    если клиент передаёт его в If-None-Match и локации не менялись,
+    возвращается 304 Not Modified без тела.
+
     **Параметры:**
     - **max_level**:
       - 0 - только склады
@@ -84,7 +144,204 @@ async def get_zones_tree(
     **Возвращает:**
     - Дерево локаций с вложенными children
     """
-    return await service.get_zones_tree(max_level)
+    version = await service.get_location_version()
+    etag = zones_tree_etag(version, max_level)
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in [tag.strip() for tag in if_none_match.split(",")]
+    ):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+
+    body, version = await service.get_zones_tree_json(max_level, version)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": zones_tree_etag(version, max_level), "Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/free-slots", response_model=List[PutawaySlot])
+async def find_putaway_slots(
+        product_id: str = Query(..., description="ID товара"),
+        quantity: int = Query(..., ge=1, description="Количество товара"),
+        zone_type: ZoneType = Query(ZoneType.STORAGE, description="Тип зоны"),
+        limit: int = Query(
+            DEFAULT_SLOTS_LIMIT, ge=1, le=MAX_PAGE_SIZE, description="Сколько ячеек"
+        ),
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Найти свободные ячейки для размещения
+
+    Возвращает ячейки зоны, вмещающие товар по весу и объёму, в порядке
+    пригодности: сначала ячейки, где этот товар уже лежит, затем самые
+    заполненные после размещения. Занятость берётся из индекса загрузки
+    ячеек с учётом действующих удержаний.
+
+    **Параметры:**
+    - **product_id**: ID товара
+    - **quantity**: Количество товара
+    - **zone_type**: Тип зоны (по умолчанию: storage)
+    - **limit**: Сколько ячеек вернуть (по умолчанию 10)
+
+    **Возвращает:**
+    - Список ячеек со свободной вместимостью
+    """
+    return await service.find_putaway_slots(zone_type.value, product_id, quantity, limit)
+
+
+@router.post("/putaway-plan", response_model=PutawayPlanResponse)
+async def plan_putaway(
+        data: PutawayPlanRequest,
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Построить план размещения всей поставки
+
+    Распределяет все строки поставки по ячейкам зоны совместно: учитывает
+    вместимость ячеек с учётом уже распределённых строк и в первую очередь
+    кладёт товар рядом с его текущим остатком. План ничего не удерживает.
+
+    **Параметры:**
+    - **zone_type**: Тип зоны (по умолчанию: storage)
+    - **lines**: Строки поставки: product_id, quantity (до 1000)
+
+    **Возвращает:**
+    - Размещения по каждой строке и количество, для которого не хватило места
+    """
+    return await service.plan_putaway(data)
+
+
+@router.post("/pick-path", response_model=PickPathResponse)
+async def get_pick_path(
+        data: PickPathRequest, service: LocationService = Depends(get_location_service)
+):
+    """
+    Построить маршрут отбора
+
+    Упорядочивает локации так, чтобы сборщик проходил меньше. Локации
+    можно передать списком кодов или листом отбора (строки с кодом
+    локации, товаром и количеством) - тогда строки группируются по
+    остановкам. Иерархия берётся из индекса локаций в памяти.
+
+    **Параметры:**
+    - **location_codes**: Коды локаций
+    - **lines**: Строки листа отбора
+    - **strategy**:
+      - serpentine - змейкой: проходы по порядку кодов, каждый второй
+        в обратную сторону (по умолчанию)
+      - distance - по координатам x, y из metadata локации или её предка
+        (ближайший сосед + 2-opt); если координат нет, остаётся змейка
+    - **aisle_level**: Уровень проходов в иерархии (по умолчанию - на два
+      уровня выше ячейки)
+    - **start_location_code**: Откуда сборщик начинает маршрут (для distance)
+
+    **Возвращает:**
+    - Остановки по порядку обхода, применённый способ и длину маршрута
+      (если координаты есть у всех остановок)
+    """
+    return await service.get_pick_path(data)
+
+
+@router.post(
+    "/putaway-reservations",
+    response_model=PutawayReservationResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def reserve_putaway_slot(
+        data: PutawayReservationCreate,
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Удержать ячейку под размещение
+
+    Выбирает лучшую свободную ячейку и удерживает её вес и объём на
+    ttl_seconds, чтобы параллельные запросы не направили вторую паллету
+    в ту же ячейку. Любое движение товара в ячейку (в том числе распаковка
+    контейнера) уменьшает удержание на поступившее количество;
+    неиспользованное удержание снимается через DELETE или истекает само.
+    Товар без веса или объёма не размещается (PRODUCT_DIMENSIONS_MISSING).
+
+    **Параметры:**
+    - **product_id**: ID товара
+    - **quantity**: Количество товара
+    - **zone_type**: Тип зоны (по умолчанию: storage)
+    - **ttl_seconds**: Срок удержания (по умолчанию из настроек)
+
+    **Возвращает:**
+    - Удержание с кодом выбранной ячейки
+    """
+    return await service.reserve_putaway_slot(data)
+
+
+@router.delete(
+    "/putaway-reservations/{putaway_reservation_id}", status_code=status.HTTP_204_NO_CONTENT
+)
+async def release_putaway_reservation(
+        putaway_reservation_id: int,
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Снять удержание ячейки
+
+    **Параметры:**
+    - **putaway_reservation_id**: ID удержания
+    """
+    await service.release_putaway_reservation(putaway_reservation_id)
+
+
+@router.get("/find-available", response_model=dict)
+async def find_available_location(
+        product_id: str = Query(..., description="ID товара"),
+        quantity: int = Query(..., ge=1, description="Количество товара"),
+        zone_type: str = Query("storage", description="Тип зоны для поиска"),
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Найти свободную ячейку
+    
+    Находит оптимальную свободную ячейку для размещения товара с учётом
+    веса, объёма и текущей загруженности.
+    
+    Использует PostgreSQL функцию wms.find_available_location().
+    
+    **Параметры:**
+    - **product_id**: ID товара
+    - **quantity**: Количество товара
+    - **zone_type**: Тип зоны (по умолчанию: storage)
+    
+    **Возвращает:**
+    - Информацию о найденной свободной ячейке
+    """
+    return await service.find_available_location(product_id, quantity, zone_type)
+
+
+@router.get("/autocomplete", response_model=List[LocationSuggestion])
+async def autocomplete_locations(
+        prefix: str = Query(..., min_length=1, description="Начало кода локации"),
+        limit: int = Query(20, ge=1, le=200, description="Максимум результатов"),
+        include_inactive: bool = Query(False, description="Включать неактивные локации"),
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Автодополнение кода локации
+
+    Ищет локации, код которых начинается с введённой строки, без учёта
+    регистра (в том числе для кириллицы). Отвечает из индекса локаций
+    в памяти, который перестраивается при изменении справочника.
+
+    **Параметры:**
+    - **prefix**: Начало кода, например `PUSHKINO-ХРАНЕНИЕ-01-S0`
+    - **limit**: Максимум результатов (по умолчанию 20)
+    - **include_inactive**: Включать неактивные локации (по умолчанию нет)
+
+    **Возвращает:**
+    - Локации в порядке кода
+    """
+    return await service.autocomplete(prefix, limit, include_inactive)
 
 
 @router.get("/{location_id}", response_model=LocationResponse)
@@ -127,25 +384,86 @@ async def get_location_by_code(
 @router.get("/{location_id}/children", response_model=List[LocationChildResponse])
 async def get_location_children(
         location_id: int,
+        response: Response,
         recursive: bool = Query(
             True, description="Включить все уровни вложенности (рекурсивно через LTREE)"
         ),
+        max_depth: Optional[int] = Query(
+            None, ge=1, le=MAX_LOCATION_LEVEL, description="Максимальная глубина от родителя"
+        ),
+        after: Optional[str] = Query(
+            None, pattern=LTREE_PATH_PATTERN, description="Курсор из заголовка X-Next-Cursor"
+        ),
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
         service: LocationService = Depends(get_location_service),
 ):
     """
     Получить дочерние локации
     
-    Возвращает все дочерние локации (например, для стеллажа вернёт все секции,
-    ярусы и ячейки).
+    Возвращает дочерние локации в порядке path (например, для стеллажа вернёт
+    все секции, ярусы и ячейки). С limit выдача постраничная: если есть
+    следующая страница, её курсор возвращается в заголовке X-Next-Cursor.
     
     **Параметры:**
     - **location_id**: ID родительской локации
     - **recursive**: Если True - все потомки (через LTREE), если False - только прямые дети
+    - **max_depth**: Не глубже N уровней от родителя (ленивая загрузка дерева)
+    - **after**: Курсор предыдущей страницы (опционально; неверный курсор - 422)
+    - **limit**: Размер страницы (по умолчанию - все, максимум 1000)
     
     **Возвращает:**
     - Список дочерних локаций с указанием глубины вложенности
     """
-    return await service.get_children(location_id, recursive)
+    children, next_after = await service.get_children(
+        location_id, recursive, max_depth, after, limit
+    )
+    if next_after is not None:
+        response.headers["X-Next-Cursor"] = next_after
+    return children
+
+
+@router.get("/{location_id}/children/stream")
+async def stream_location_children(
+        location_id: int,
+        max_depth: Optional[int] = Query(
+            None, ge=1, le=MAX_LOCATION_LEVEL, description="Максимальная глубина от родителя"
+        ),
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Выгрузить дочерние локации потоком
+
+    Отдаёт всех потомков в порядке path в формате NDJSON (один JSON-объект
+    на строку) без сборки всего списка в памяти.
+
+    **Параметры:**
+    - **location_id**: ID родительской локации
+    - **max_depth**: Не глубже N уровней от родителя (опционально)
+
+    **Возвращает:**
+    - Поток NDJSON с локациями (формат как в /children)
+    """
+    stream = await service.stream_children(location_id, max_depth)
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/{location_id}/breadcrumbs", response_model=List[LocationBreadcrumb])
+async def get_location_breadcrumbs(
+        location_id: int, service: LocationService = Depends(get_location_service)
+):
+    """
+    Получить цепочку предков локации (хлебные крошки)
+
+    Отдаётся из индекса иерархии в памяти, без запроса к БД (пока индекс
+    не загружен или локация в него ещё не попала - из БД).
+
+    **Параметры:**
+    - **location_id**: ID локации
+
+    **Возвращает:**
+    - Локации от корня (склада) до запрошенной включительно
+    """
+    return await service.get_breadcrumbs(location_id)
 
 
 @router.put("/{location_id}", response_model=LocationResponse)
@@ -175,6 +493,37 @@ async def update_location(
     return await service.update_location(location_id, data)
 
 
+@router.patch("/{location_id}/subtree", response_model=LocationSubtreeUpdateResponse)
+async def update_location_subtree(
+        location_id: int,
+        data: LocationSubtreeUpdate,
+        dry_run: bool = Query(False, description="Только посчитать, ничего не менять"),
+        service: LocationService = Depends(get_location_service),
+):
+    """
+    Изменить всё поддерево локации
+
+    Одним запросом меняет локацию и всех её потомков (например, закрыть ряд
+    на обслуживание). Деактивация отклоняется, если в затрагиваемых
+    локациях есть товар.
+
+    **Параметры:**
+    - **location_id**: ID корня поддерева
+    - **dry_run**: Только посчитать затрагиваемые и занятые локации
+    - **level**: Менять только локации этого уровня (опционально)
+    - **include_root**: Менять ли саму корневую локацию (по умолчанию да)
+    - **is_active**: Новый статус активности (опционально)
+    - **is_pickable**: Можно ли комплектовать (опционально)
+    - **max_weight**: Новый максимальный вес (опционально)
+    - **max_volume**: Новый максимальный объём (опционально)
+    - **metadata**: Ключи, добавляемые к метаданным (опционально)
+
+    **Возвращает:**
+    - Количество подходящих и изменённых локаций, занятые товаром локации
+    """
+    return await service.update_subtree(location_id, data, dry_run)
+
+
 @router.patch("/{location_id}/deactivate", response_model=LocationDeactivateResponse)
 async def deactivate_location(
         location_id: int, service: LocationService = Depends(get_location_service)
@@ -194,32 +543,6 @@ async def deactivate_location(
     return await service.deactivate_location(location_id)
 
 
-@router.get("/find-available", response_model=dict)
-async def find_available_location(
-        product_id: str = Query(..., description="ID товара"),
-        quantity: int = Query(..., ge=1, description="Количество товара"),
-        zone_type: str = Query("storage", description="Тип зоны для поиска"),
-        service: LocationService = Depends(get_location_service),
-):
-    """
-    Найти свободную ячейку
-    
-    Находит оптимальную свободную ячейку для размещения товара с учётом
-    веса, объёма и текущей загруженности.
-    
-    Использует PostgreSQL функцию wms.find_available_location().
-    
-    **Параметры:**
-    - **product_id**: ID товара
-    - **quantity**: Количество товара
-    - **zone_type**: Тип зоны (по умолчанию: storage)
-    
-    **Возвращает:**
-    - Информацию о найденной свободной ячейке
-    """
-    return await service.find_available_location(product_id, quantity, zone_type)
-
-
 @router.get("/{location_id}/qr-code")
 async def generate_location_qr_code(
         location_id: int,
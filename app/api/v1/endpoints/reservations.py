@@ -0,0 +1,149 @@
+"""API endpoints для резервирования остатков"""
+
+from fastapi import APIRouter, Body, Depends, status, Query, Path
+from typing import List, Optional
+
+from app.core.schemas.reservation import (
+    ReservationCreate,
+    ReservationFulfil,
+    ReservationResponse,
+    ReservationExpireResponse,
+    AvailableToPromise,
+)
+from app.core.services.reservation_service import ReservationService
+from app.api.v1.dependencies import get_reservation_service
+from app.shared.constants import MAX_ATP_PRODUCT_IDS
+
+router = APIRouter(prefix="/reservations", tags=["Резервы"])
+
+
+@router.post("", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
+async def create_reservation(
+    data: ReservationCreate,
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Зарезервировать остатки
+
+    Удерживает доступный товар под заказ на ttl_seconds. Резерв
+    создаётся целиком или не создаётся: если хотя бы одной позиции
+    не хватает, возвращается ошибка INSUFFICIENT_INVENTORY.
+
+    Резерв учитывается при резервировании и в ATP, но не блокирует
+    движения: POST /movements списывает остаток без проверки
+    reserved_quantity. Отгрузку по заказу выполняют через
+    POST /reservations/{reservation_id}/fulfil - резерв снимается
+    и отгружается в одной транзакции.
+
+    **Параметры:**
+    - **order_ref**: Ссылка на заказ (опционально)
+    - **ttl_seconds**: Срок резерва в секундах (по умолчанию из настроек)
+    - **lines**: Позиции: product_id, quantity, batch_number (опционально)
+
+    **Возвращает:**
+    - Резерв с зарезервированными строками остатков
+    """
+    return await service.create_reservation(data)
+
+
+@router.get("/atp", response_model=List[AvailableToPromise])
+async def get_available_to_promise(
+    product_ids: List[str] = Query(
+        ..., min_length=1, max_length=MAX_ATP_PRODUCT_IDS, description="ID товаров"
+    ),
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Доступно к резервированию (available-to-promise)
+
+    Доступный остаток товаров за вычетом действующих резервов.
+
+    **Параметры:**
+    - **product_ids**: ID товаров (параметр повторяется, до 1000)
+
+    **Возвращает:**
+    - on_hand, reserved и available по каждому товару
+    """
+    return await service.get_available_to_promise(product_ids)
+
+
+@router.post("/expire", response_model=ReservationExpireResponse)
+async def expire_reservations(
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Максимум резервов"),
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Снять истёкшие резервы
+
+    Обычно выполняется фоновой задачей (RESERVATION_EXPIRE_INTERVAL);
+    endpoint нужен для ручного запуска или внешнего планировщика.
+
+    **Параметры:**
+    - **limit**: Максимум резервов за вызов (по умолчанию из настроек)
+
+    **Возвращает:**
+    - Количество и ID снятых резервов
+    """
+    return await service.expire_reservations(limit)
+
+
+@router.get("/{reservation_id}", response_model=ReservationResponse)
+async def get_reservation(
+    reservation_id: int = Path(..., description="ID резерва"),
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Получить резерв
+
+    **Параметры:**
+    - **reservation_id**: ID резерва
+
+    **Возвращает:**
+    - Резерв со строками
+    """
+    return await service.get_reservation(reservation_id)
+
+
+@router.post("/{reservation_id}/release", response_model=ReservationResponse)
+async def release_reservation(
+    reservation_id: int = Path(..., description="ID резерва"),
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Снять резерв
+
+    Возвращает товар в доступный остаток. Повторный вызов безопасен.
+
+    **Параметры:**
+    - **reservation_id**: ID резерва
+
+    **Возвращает:**
+    - Резерв в статусе released (или в текущем, если он уже не активен)
+    """
+    return await service.release_reservation(reservation_id)
+
+
+@router.post("/{reservation_id}/fulfil", response_model=ReservationResponse)
+async def fulfil_reservation(
+    reservation_id: int = Path(..., description="ID резерва"),
+    data: ReservationFulfil = Body(default_factory=ReservationFulfil),
+    service: ReservationService = Depends(get_reservation_service),
+):
+    """
+    Отгрузить по резерву
+
+    Снимает резерв и записывает движение ship по каждой его строке
+    (локация, партия, контейнер) в одной транзакции: между снятием
+    резерва и отгрузкой товар не может занять другой заказ. Повторный
+    вызов безопасен.
+
+    **Параметры:**
+    - **reservation_id**: ID резерва
+    - **user_name**: Имя пользователя (опционально)
+    - **reason**: Причина/комментарий (по умолчанию - номер резерва)
+
+    **Возвращает:**
+    - Резерв в статусе fulfilled
+    - 409 RESERVATION_NOT_ACTIVE, если резерв снят или истёк
+    """
+    return await service.fulfil_reservation(reservation_id, data)
@@ -1,6 +1,6 @@
 """API endpoints для системных операций"""
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, status, Query
 from typing import List
 
 from app.core.schemas.system import (
@@ -10,6 +10,10 @@ from app.core.schemas.system import (
     CreateSnapshotResponse,
     RefreshViewsResponse,
     IntegrityCheckResult,
+    ContainerSnapshotDrift,
+    HotInventoryKeyCreate,
+    HotInventoryKey,
+    CompactCountersResponse,
 )
 from app.core.services.system_service import SystemService
 from app.api.v1.dependencies import get_system_service
@@ -33,6 +37,23 @@ async def validate_integrity(
     return await service.validate_integrity()
 
 
+@router.post("/validate-container-snapshots", response_model=List[ContainerSnapshotDrift])
+async def validate_container_snapshots(
+    service: SystemService = Depends(get_system_service),
+):
+    """
+    Проверить снимки содержимого контейнеров
+
+    Сравнивает денормализованный снимок содержимого (contents_snapshot),
+    из которого отдаётся скан контейнера, с таблицей container_contents.
+    Пустой список = снимки согласованы.
+
+    **Возвращает:**
+    - Список контейнеров со снимком и фактическим содержимым
+    """
+    return await service.validate_container_snapshots()
+
+
 @router.post(
     "/recalculate-inventory",
     response_model=RecalculateInventoryResponse,
@@ -101,3 +122,90 @@ async def refresh_materialized_views(
     - Статистику обновлённого представления
     """
     return await service.refresh_materialized_views()
+
+
+@router.get("/hot-inventory-keys", response_model=List[HotInventoryKey])
+async def get_hot_inventory_keys(
+    service: SystemService = Depends(get_system_service),
+):
+    """
+    Получить товары в режиме счётчиков
+
+    Ключ со stuck = true не удалось перенести в inventory (last_error):
+    его delta остаются в шардах, пока причина не будет устранена.
+
+    **Возвращает:**
+    - Пары (товар, локация), ещё не перенесённые в inventory delta,
+      оставшиеся квоты и признак неудачного переноса
+    """
+    return await service.get_hot_inventory_keys()
+
+
+@router.post(
+    "/hot-inventory-keys",
+    response_model=HotInventoryKey,
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_hot_inventory_key(
+    data: HotInventoryKeyCreate,
+    service: SystemService = Depends(get_system_service),
+):
+    """
+    Включить режим счётчиков для товара в локации
+
+    Для самых ходовых товаров в зоне отбора: доступный остаток делится
+    на квоты по шардам, и движения (receive, ship, transfer, write_off)
+    между горячими локациями не обновляют строку inventory, а списывают
+    квоту одного шарда или добавляют в него delta - параллельные движения
+    не ждут друг друга. Списать больше квоты нельзя; если квоты не хватает
+    (или это первая приёмка в локацию), движение идёт обычным путём
+    с проверками триггера inventory. Чтения остатков товара учитывают
+    неперенесённые delta.
+
+    **Параметры:**
+    - **product_id**: ID товара
+    - **location_code**: Код локации
+
+    **Возвращает:**
+    - Добавленный ключ
+    """
+    return await service.add_hot_inventory_key(data)
+
+
+@router.delete("/hot-inventory-keys", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_hot_inventory_key(
+    product_id: str = Query(..., description="ID товара"),
+    location_code: str = Query(..., description="Код локации"),
+    service: SystemService = Depends(get_system_service),
+):
+    """
+    Выключить режим счётчиков для товара в локации
+
+    Накопленные delta сразу переносятся в inventory.
+
+    **Параметры:**
+    - **product_id**: ID товара
+    - **location_code**: Код локации
+
+    **Возвращает:**
+    - 204 без тела; 404 HOT_INVENTORY_KEY_NOT_FOUND, если товар в локации
+      не в режиме счётчиков
+    """
+    await service.remove_hot_inventory_key(product_id, location_code)
+
+
+@router.post("/compact-inventory-counters", response_model=CompactCountersResponse)
+async def compact_inventory_counters(
+    service: SystemService = Depends(get_system_service),
+):
+    """
+    Перенести счётчики горячих товаров в inventory
+
+    Обычно выполняется фоновой задачей (HOT_COUNTER_COMPACT_INTERVAL).
+    Каждый ключ переносится в своей транзакции; квоты раздаются заново.
+
+    **Возвращает:**
+    - Количество обновлённых строк inventory и ключей, перенос которых
+      не удался (см. stuck в GET /system/hot-inventory-keys)
+    """
+    return await service.compact_inventory_counters()
@@ -50,3 +50,26 @@ class InventoryStatus(str, Enum):
     RESERVED = "reserved"  # Зарезервирован
     QUARANTINE = "quarantine"  # На карантине
     DAMAGED = "damaged"  # Повреждён
+
+
+class AllocationPolicy(str, Enum):
+    """Порядок списания партий при аллокации"""
+
+    FIFO = "fifo"  # Первым принят - первым отгружен
+    FEFO = "fefo"  # Первым истекает - первым отгружен
+
+
+class ReservationStatus(str, Enum):
+    """Статусы резерва"""
+
+    ACTIVE = "active"  # Действует
+    RELEASED = "released"  # Снят
+    EXPIRED = "expired"  # Истёк
+    FULFILLED = "fulfilled"  # Отгружен
+
+
+class PickPathStrategy(str, Enum):
+    """Способ упорядочивания маршрута отбора"""
+
+    SERPENTINE = "serpentine"  # Змейкой по проходам
+    DISTANCE = "distance"  # По координатам из metadata
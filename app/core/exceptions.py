@@ -28,6 +28,18 @@ class LocationNotActiveError(DomainException):
     pass
 
 
+class LocationAlreadyExistsError(DomainException):
+    """Локация с таким названием у этого родителя уже существует"""
+
+    pass
+
+
+class LocationHasInventoryError(DomainException):
+    """В локации есть товар"""
+
+    pass
+
+
 # === Containers ===
 
 
@@ -70,6 +82,42 @@ class InventoryNotFoundError(DomainException):
     pass
 
 
+class InvalidChangeTokenError(DomainException):
+    """Некорректный токен продолжения ленты изменений"""
+
+    pass
+
+
+class HotInventoryKeyNotFoundError(DomainException):
+    """Товар в локации не в режиме счётчиков"""
+
+    pass
+
+
+# === Reservations ===
+
+
+class ReservationNotFoundError(DomainException):
+    """Резерв не найден"""
+
+    pass
+
+
+class ReservationNotActiveError(DomainException):
+    """Резерв снят или истёк"""
+
+    pass
+
+
+# === Putaway ===
+
+
+class PutawayReservationNotFoundError(DomainException):
+    """Удержание ячейки под размещение не найдено"""
+
+    pass
+
+
 # === Movements ===
 
 
@@ -92,3 +140,9 @@ class ProductNotFoundError(DomainException):
     """Товар не найден"""
 
     pass
+
+
+class ProductDimensionsMissingError(DomainException):
+    """У товара не заданы вес или объём"""
+
+    pass
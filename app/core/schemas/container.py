@@ -1,9 +1,14 @@
 """Pydantic схемы для контейнеров"""
 
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 from app.core.enums import ContainerStatus, ContainerType
+from app.shared.constants import (
+    MAX_BULK_STATUS_CONTAINERS,
+    MAX_CONTAINER_LOOKUP_CODES,
+    MAX_UNPACK_LINES,
+)
 
 
 class ContainerContent(BaseModel):
@@ -65,6 +70,23 @@ class ContainerResponse(BaseModel):
         from_attributes = True
 
 
+class ContainerBatchLookup(BaseModel):
+    """Схема для поиска контейнеров по списку QR-кодов"""
+
+    qr_codes: List[str] = Field(
+        ..., min_length=1, max_length=MAX_CONTAINER_LOOKUP_CODES, description="Список QR-кодов"
+    )
+
+
+class ContainerBatchLookupResponse(BaseModel):
+    """Ответ на поиск контейнеров по списку QR-кодов"""
+
+    found: List[ContainerResponse] = Field(
+        default_factory=list, description="Найденные контейнеры (в порядке запроса)"
+    )
+    missing: List[str] = Field(default_factory=list, description="Ненайденные QR-коды")
+
+
 class ContainerLocationUpdate(BaseModel):
     """Схема для обновления локации контейнера"""
 
@@ -101,6 +123,39 @@ class ContainerUnpackResponse(BaseModel):
         from_attributes = True
 
 
+class ContainerUnpackLine(BaseModel):
+    """Позиция для вскрытия контейнера"""
+
+    product_id: str = Field(..., description="ID товара для извлечения")
+    quantity: int = Field(..., ge=1, description="Количество для извлечения")
+
+
+class ContainerUnpackBatch(BaseModel):
+    """Схема для вскрытия контейнера по нескольким позициям"""
+
+    qr_code: str = Field(..., description="QR-код контейнера")
+    lines: List[ContainerUnpackLine] = Field(
+        ..., min_length=1, max_length=MAX_UNPACK_LINES, description="Позиции для извлечения"
+    )
+
+
+class ContainerUnpackLineResult(BaseModel):
+    """Результат вскрытия по одной позиции"""
+
+    product_id: str
+    quantity: int = Field(..., description="Извлечено")
+    remaining_in_container: int = Field(..., description="Осталось в контейнере")
+    loose_quantity: int = Field(..., description="Количество россыпью")
+
+
+class ContainerUnpackBatchResponse(BaseModel):
+    """Ответ при вскрытии контейнера по нескольким позициям"""
+
+    container_id: int
+    qr_code: str
+    lines: List[ContainerUnpackLineResult] = Field(..., description="Результат по позициям")
+
+
 class ContainerStatusUpdate(BaseModel):
     """Схема для обновления статуса контейнера"""
 
@@ -119,6 +174,63 @@ class ContainerStatusUpdateResponse(BaseModel):
         from_attributes = True
 
 
+class ContainerBulkStatusUpdate(BaseModel):
+    """Схема для массового обновления статуса контейнеров"""
+
+    status: ContainerStatus = Field(..., description="Новый статус")
+    container_ids: Optional[List[int]] = Field(
+        None,
+        min_length=1,
+        max_length=MAX_BULK_STATUS_CONTAINERS,
+        description="Список ID контейнеров",
+    )
+    location_id: Optional[int] = Field(
+        None, description="ID локации: все контейнеры в её поддереве"
+    )
+    batch_number: Optional[str] = Field(
+        None, description="Номер партии в активном содержимом контейнера"
+    )
+    container_type: Optional[ContainerType] = Field(None, description="Тип контейнера")
+
+    @model_validator(mode="after")
+    def check_selector(self) -> "ContainerBulkStatusUpdate":
+        """Без списка ID и фильтров запрос затронул бы все контейнеры склада"""
+        if (
+            self.container_ids is None
+            and self.location_id is None
+            and self.batch_number is None
+            and self.container_type is None
+        ):
+            raise ValueError(
+                "Нужно указать container_ids или хотя бы один фильтр "
+                "(location_id, batch_number, container_type)"
+            )
+        return self
+
+
+class ContainerBulkStatusItem(BaseModel):
+    """Контейнер в результате массового обновления статуса"""
+
+    container_id: int
+    qr_code: str
+
+
+class ContainerBulkStatusUpdateResponse(BaseModel):
+    """Ответ при массовом обновлении статуса контейнеров"""
+
+    status: ContainerStatus = Field(..., description="Установленный статус")
+    updated_count: int = Field(..., description="Количество обновлённых контейнеров")
+    updated: List[ContainerBulkStatusItem] = Field(
+        default_factory=list, description="Обновлённые контейнеры"
+    )
+    skipped_blocked: List[ContainerBulkStatusItem] = Field(
+        default_factory=list, description="Пропущенные заблокированные контейнеры"
+    )
+    not_found_ids: List[int] = Field(
+        default_factory=list, description="ID из запроса, которые не найдены"
+    )
+
+
 class ContainerHistoryItem(BaseModel):
     """Элемент истории контейнера"""
 
@@ -151,3 +263,19 @@ class ContainerInLocation(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ContainerInSubtree(ContainerInLocation):
+    """Контейнер в поддереве локации (краткая информация)"""
+
+    location_id: int = Field(..., description="ID локации контейнера")
+    location_code: str = Field(..., description="Код локации контейнера")
+
+
+class ContainerSubtreePage(BaseModel):
+    """Страница контейнеров в поддереве локации"""
+
+    items: List[ContainerInSubtree] = Field(default_factory=list)
+    next_after_id: Optional[int] = Field(
+        None, description="Передать в after_id для следующей страницы (None - страниц больше нет)"
+    )
@@ -1,9 +1,10 @@
 """Pydantic схемы для инвентаря (остатков)"""
 
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field
-from datetime import datetime
-from app.core.enums import InventoryStatus
+from datetime import datetime, date
+from app.core.enums import InventoryStatus, AllocationPolicy
+from app.shared.constants import MAX_ALLOCATION_LINES, MAX_BATCH_PRODUCT_IDS
 
 
 class InventoryItemResponse(BaseModel):
@@ -24,6 +25,25 @@ class InventoryItemResponse(BaseModel):
         from_attributes = True
 
 
+class ProductStockBatchRequest(BaseModel):
+    """Запрос остатков для списка товаров"""
+
+    product_ids: List[str] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_PRODUCT_IDS, description="Список ID товаров"
+    )
+
+
+class ProductStockResponse(BaseModel):
+    """Остатки одного товара по локациям"""
+
+    product_id: str
+    product_name: Optional[str] = None
+    total_quantity: int = Field(default=0, description="Общее количество")
+    items: List[InventoryItemResponse] = Field(
+        default_factory=list, description="Остатки по локациям"
+    )
+
+
 class InventoryInLocationResponse(BaseModel):
     """Остаток в локации"""
 
@@ -41,6 +61,28 @@ class InventoryInLocationResponse(BaseModel):
         from_attributes = True
 
 
+class InventorySubtreeAggregate(BaseModel):
+    """Агрегированный остаток в поддереве локации"""
+
+    child_location_id: Optional[int] = Field(
+        None, description="Дочерняя локация (при разбивке по дочерним)"
+    )
+    child_location_code: Optional[str] = None
+    product_id: str
+    product_name: Optional[str] = None
+    batch_number: Optional[str] = Field(None, description="Партия (при группировке по партиям)")
+    status: Optional[InventoryStatus] = Field(
+        None, description="Статус (при группировке по статусам)"
+    )
+    total_quantity: int = Field(default=0, description="Общее количество")
+    locations_count: int = Field(default=0, description="Количество локаций")
+    in_containers: int = Field(default=0, description="Количество в контейнерах")
+    loose: int = Field(default=0, description="Количество россыпью")
+
+    class Config:
+        from_attributes = True
+
+
 class InventorySummaryResponse(BaseModel):
     """Агрегированный остаток товара"""
 
@@ -98,3 +140,134 @@ class InventorySearchResult(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class InventoryExportRow(BaseModel):
+    """Строка выгрузки остатков"""
+
+    inventory_id: int
+    product_id: str
+    product_name: Optional[str] = None
+    category: Optional[str] = None
+    location_id: int
+    location_code: str
+    zone_type: Optional[str] = None
+    quantity: int
+    status: InventoryStatus
+    batch_number: Optional[str] = None
+    container_code: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class InventoryChangeEvent(BaseModel):
+    """Изменение остатка в ленте изменений"""
+
+    token: str = Field(..., description="Токен продолжения (txid:change_id)")
+    change_id: int
+    product_id: str
+    location_id: int
+    location_code: str
+    zone_type: Optional[str] = None
+    status: Optional[InventoryStatus] = None
+    batch_number: Optional[str] = None
+    container_code: Optional[str] = None
+    old_quantity: int = Field(..., description="Количество до изменения")
+    new_quantity: int = Field(..., description="Количество после изменения")
+    delta: int = Field(..., description="Изменение количества")
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class InventoryDeltaResponse(BaseModel):
+    """Товары, остатки которых изменились после watermark"""
+
+    items: List[InventorySummaryResponse] = Field(
+        default_factory=list, description="Текущие итоги изменившихся товаров"
+    )
+    next_watermark: str = Field(..., description="Watermark для следующего запроса")
+    has_more: bool = Field(
+        default=False, description="Есть ещё изменения - запросить сразу с next_watermark"
+    )
+    resync_required: bool = Field(
+        default=False,
+        description=(
+            "Watermark старше срока хранения ленты: нужна полная выгрузка, "
+            "дальше - синхронизация с next_watermark"
+        ),
+    )
+
+
+class AllocationLine(BaseModel):
+    """Строка заказа для аллокации"""
+
+    product_id: str = Field(..., description="ID товара")
+    quantity: int = Field(..., ge=1, description="Количество")
+
+
+class AllocationRequest(BaseModel):
+    """Запрос на аллокацию (план отбора)"""
+
+    policy: AllocationPolicy = Field(
+        default=AllocationPolicy.FIFO, description="Порядок списания партий"
+    )
+    lines: List[AllocationLine] = Field(
+        ..., min_length=1, max_length=MAX_ALLOCATION_LINES, description="Строки заказа"
+    )
+    reservation_id: Optional[int] = Field(
+        None, description="Резерв заказа: его товар считается доступным плану"
+    )
+
+
+class AllocationPick(BaseModel):
+    """Откуда отобрать товар"""
+
+    location_id: int
+    location_code: str
+    container_code: Optional[str] = None
+    batch_number: Optional[str] = None
+    first_received_at: Optional[datetime] = None
+    expires_at: Optional[date] = None
+    quantity: int
+
+
+class AllocationLineResult(BaseModel):
+    """Результат аллокации строки заказа"""
+
+    product_id: str
+    requested: int = Field(..., description="Запрошено")
+    allocated: int = Field(default=0, description="Распределено")
+    shortage: int = Field(default=0, description="Не хватило")
+    picks: List[AllocationPick] = Field(default_factory=list)
+
+
+class AllocationResponse(BaseModel):
+    """План отбора заказа"""
+
+    policy: AllocationPolicy
+    fully_allocated: bool = Field(..., description="Все строки распределены полностью")
+    lines: List[AllocationLineResult] = Field(default_factory=list)
+
+
+class BatchExpiryUpdate(BaseModel):
+    """Срок годности партии"""
+
+    product_id: str = Field(..., description="ID товара")
+    batch_number: str = Field(..., description="Номер партии")
+    expires_at: Optional[date] = Field(None, description="Срок годности (null - сбросить)")
+
+
+class BatchAgeResponse(BaseModel):
+    """Возраст и срок годности партии"""
+
+    product_id: str
+    batch_number: str
+    first_received_at: datetime
+    expires_at: Optional[date] = None
+
+    class Config:
+        from_attributes = True
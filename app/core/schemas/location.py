@@ -2,9 +2,15 @@
 
 from typing import Optional, List
 from decimal import Decimal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from app.core.enums import ZoneType
+from app.core.enums import PickPathStrategy, ZoneType
+from app.shared.constants import (
+    MAX_LOCATION_LEVEL,
+    MAX_PICK_PATH_STOPS,
+    MAX_PUTAWAY_PLAN_LINES,
+    MAX_TEMPLATE_LOCATIONS,
+)
 
 class ZoneResponse(BaseModel):
     """Схема для ответа - список зон"""
@@ -89,6 +95,77 @@ class LocationChildResponse(BaseModel):
         from_attributes = True
 
 
+class LocationBreadcrumb(BaseModel):
+    """Элемент цепочки предков (хлебные крошки)"""
+
+    location_id: int
+    location_code: str
+    name: str
+    zone_type: ZoneType
+    level: int
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
+
+class LocationSuggestion(BaseModel):
+    """Вариант автодополнения кода локации"""
+
+    location_id: int
+    location_code: str
+    name: str
+    zone_type: ZoneType
+    level: int
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
+
+class LocationSubtreeUpdate(BaseModel):
+    """Схема для массового изменения поддерева локаций"""
+
+    level: Optional[int] = Field(
+        None, ge=0, le=MAX_LOCATION_LEVEL, description="Только локации этого уровня"
+    )
+    include_root: bool = Field(True, description="Изменять ли саму корневую локацию")
+    is_active: Optional[bool] = None
+    is_pickable: Optional[bool] = None
+    max_weight: Optional[Decimal] = Field(None, ge=0)
+    max_volume: Optional[Decimal] = Field(None, ge=0)
+    metadata: Optional[dict] = Field(None, description="Ключи, добавляемые к метаданным")
+
+    @model_validator(mode="after")
+    def check_changes(self) -> "LocationSubtreeUpdate":
+        """Запрос без изменяемых полей ничего бы не сделал"""
+        if (
+            self.is_active is None
+            and self.is_pickable is None
+            and self.max_weight is None
+            and self.max_volume is None
+            and self.metadata is None
+        ):
+            raise ValueError(
+                "Нужно указать хотя бы одно поле: is_active, is_pickable, "
+                "max_weight, max_volume, metadata"
+            )
+        return self
+
+
+class LocationSubtreeUpdateResponse(BaseModel):
+    """Ответ при массовом изменении поддерева"""
+
+    location_id: int = Field(..., description="ID корня поддерева")
+    dry_run: bool
+    matched: int = Field(..., description="Локаций под условием")
+    updated: int = Field(..., description="Изменено локаций (0 при dry_run)")
+    blocked_count: int = Field(0, description="Деактивируемых локаций с товаром")
+    blocked_location_codes: List[str] = Field(
+        default_factory=list, description="Коды локаций с товаром (первые 50)"
+    )
+
+
 class LocationDeactivateResponse(BaseModel):
     """Схема для ответа деактивации"""
 
@@ -121,4 +198,234 @@ class LocationTreeNode(BaseModel):
 
 
 # обновить forward reference для рекурсии
-LocationTreeNode.model_rebuild()
\ No newline at end of file
+LocationTreeNode.model_rebuild()
+
+class LocationTemplateLevel(BaseModel):
+    """Уровень шаблона: какие дочерние локации создать под каждой локацией уровня выше"""
+
+    zone_type: ZoneType = Field(..., description="Тип зоны")
+    prefix: str = Field("", max_length=20, description="Префикс названия (например, S для секций)")
+    start: int = Field(1, ge=0, description="Первый номер")
+    count: Optional[int] = Field(None, ge=1, le=1000, description="Количество номеров")
+    width: int = Field(2, ge=1, le=6, description="Ширина номера с ведущими нулями")
+    labels: Optional[List[str]] = Field(
+        None, min_length=1, max_length=1000, description="Явные названия (например, A, B, C, D)"
+    )
+    max_weight: Decimal = Field(default=Decimal("0"), ge=0, description="Максимальный вес (кг)")
+    max_volume: Decimal = Field(default=Decimal("0"), ge=0, description="Максимальный объём (м³)")
+    is_pickable: bool = Field(default=False, description="Можно ли комплектовать")
+    metadata: Optional[dict] = Field(None, description="Дополнительные данные (JSON)")
+
+    @model_validator(mode="after")
+    def check_names(self) -> "LocationTemplateLevel":
+        """Названия задаются либо диапазоном номеров, либо списком"""
+        if (self.count is None) == (self.labels is None):
+            raise ValueError("Нужно указать либо count, либо labels")
+        names = self.names()
+        if len(set(names)) != len(names):
+            raise ValueError("Названия на уровне шаблона повторяются")
+        if any(not name or len(name) > 100 for name in names):
+            raise ValueError("Название локации должно быть длиной от 1 до 100 символов")
+        return self
+
+    def names(self) -> List[str]:
+        """Названия локаций уровня (одинаковые под каждым родителем)"""
+        if self.labels is not None:
+            return [self.prefix + label for label in self.labels]
+        return [
+            f"{self.prefix}{number:0{self.width}d}"
+            for number in range(self.start, self.start + self.count)
+        ]
+
+
+class LocationTemplate(BaseModel):
+    """Шаблон для массовой генерации поддерева локаций"""
+
+    parent_location_id: int = Field(..., description="ID локации, под которой строится поддерево")
+    levels: List[LocationTemplateLevel] = Field(
+        ..., min_length=1, max_length=MAX_LOCATION_LEVEL, description="Уровни сверху вниз"
+    )
+
+    @model_validator(mode="after")
+    def check_size(self) -> "LocationTemplate":
+        """Ограничение на общее число создаваемых локаций"""
+        total = 0
+        per_parent = 1
+        for level in self.levels:
+            per_parent *= len(level.names())
+            total += per_parent
+        if total > MAX_TEMPLATE_LOCATIONS:
+            raise ValueError(
+                f"Шаблон создаёт {total} локаций, максимум {MAX_TEMPLATE_LOCATIONS}"
+            )
+        return self
+
+
+class LocationTemplateLevelSummary(BaseModel):
+    """Итог по уровню сгенерированного поддерева"""
+
+    level: int = Field(..., description="Уровень в иерархии")
+    zone_type: ZoneType
+    created: int = Field(..., description="Создано локаций")
+    first_location_code: str
+    last_location_code: str
+
+
+class LocationTemplateResponse(BaseModel):
+    """Итог массовой генерации локаций"""
+
+    parent_location_id: int
+    parent_location_code: str
+    created: int = Field(..., description="Всего создано локаций")
+    levels: List[LocationTemplateLevelSummary]
+
+
+class PutawaySlot(BaseModel):
+    """Свободная ячейка для размещения"""
+
+    location_id: int
+    location_code: str
+    zone_type: ZoneType
+    max_weight: Decimal = Field(..., description="Максимальный вес (0 - не ограничен)")
+    max_volume: Decimal = Field(..., description="Максимальный объём (0 - не ограничен)")
+    used_weight: Decimal = Field(..., description="Занятый вес с учётом удержаний")
+    used_volume: Decimal = Field(..., description="Занятый объём с учётом удержаний")
+    free_weight: Optional[Decimal] = Field(None, description="Свободный вес (None - без предела)")
+    free_volume: Optional[Decimal] = Field(None, description="Свободный объём (None - без предела)")
+    is_empty: bool = Field(..., description="В ячейке нет остатков")
+    active_holds: int = Field(..., description="Действующих удержаний под размещение")
+    has_product: bool = Field(..., description="В ячейке уже лежит этот товар")
+
+    class Config:
+        from_attributes = True
+
+
+class PutawayReservationCreate(BaseModel):
+    """Схема для удержания ячейки под размещение"""
+
+    product_id: str = Field(..., description="ID товара")
+    quantity: int = Field(..., ge=1, description="Количество товара")
+    zone_type: ZoneType = Field(ZoneType.STORAGE, description="Тип зоны")
+    ttl_seconds: Optional[int] = Field(
+        None, ge=1, le=3600, description="Срок удержания (по умолчанию из настроек)"
+    )
+
+
+class PutawayReservationResponse(BaseModel):
+    """Удержание ячейки под размещение"""
+
+    putaway_reservation_id: int
+    location_id: int
+    location_code: str
+    product_id: str
+    quantity: int
+    weight: Decimal = Field(..., description="Удерживаемый вес")
+    volume: Decimal = Field(..., description="Удерживаемый объём")
+    expires_at: datetime
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PutawayPlanLine(BaseModel):
+    """Строка поставки для плана размещения"""
+
+    product_id: str = Field(..., description="ID товара")
+    quantity: int = Field(..., ge=1, description="Количество товара")
+
+
+class PutawayPlanRequest(BaseModel):
+    """Запрос плана размещения всей поставки"""
+
+    zone_type: ZoneType = Field(ZoneType.STORAGE, description="Тип зоны")
+    lines: List[PutawayPlanLine] = Field(
+        ..., min_length=1, max_length=MAX_PUTAWAY_PLAN_LINES, description="Строки поставки"
+    )
+
+
+class PutawayPlacement(BaseModel):
+    """Размещение части строки в ячейку"""
+
+    location_id: int
+    location_code: str
+    quantity: int = Field(..., description="Количество в эту ячейку")
+    co_located: bool = Field(..., description="Рядом с остатком этого товара (или его частью)")
+
+
+class PutawayPlanLineResult(BaseModel):
+    """План размещения строки поставки"""
+
+    product_id: str
+    requested: int = Field(..., description="Количество в строке")
+    planned: int = Field(..., description="Размещено по плану")
+    unplaced: int = Field(..., description="Не хватило места")
+    placements: List[PutawayPlacement]
+
+
+class PutawayPlanResponse(BaseModel):
+    """План размещения поставки"""
+
+    zone_type: ZoneType
+    fully_planned: bool = Field(..., description="Все строки размещены полностью")
+    lines: List[PutawayPlanLineResult]
+
+
+class PickListLine(BaseModel):
+    """Строка листа отбора"""
+
+    location_code: str = Field(..., description="Код локации отбора")
+    product_id: Optional[str] = Field(None, description="ID товара")
+    quantity: Optional[int] = Field(None, ge=1, description="Количество")
+
+
+class PickPathRequest(BaseModel):
+    """Запрос порядка обхода локаций отбора"""
+
+    location_codes: List[str] = Field(
+        default_factory=list, max_length=MAX_PICK_PATH_STOPS, description="Коды локаций"
+    )
+    lines: List[PickListLine] = Field(
+        default_factory=list, max_length=MAX_PICK_PATH_STOPS, description="Лист отбора"
+    )
+    strategy: PickPathStrategy = Field(
+        PickPathStrategy.SERPENTINE, description="Способ упорядочивания"
+    )
+    aisle_level: Optional[int] = Field(
+        None,
+        ge=0,
+        le=MAX_LOCATION_LEVEL,
+        description="Уровень проходов в иерархии (по умолчанию - через уровень над ячейкой)",
+    )
+    start_location_code: Optional[str] = Field(
+        None, description="Откуда начинается маршрут (для distance)"
+    )
+
+    @model_validator(mode="after")
+    def check_stops(self):
+        """Нужны коды локаций или строки листа отбора"""
+        if not self.location_codes and not self.lines:
+            raise ValueError("Укажите location_codes или lines")
+        return self
+
+
+class PickPathStop(BaseModel):
+    """Остановка маршрута отбора"""
+
+    sequence: int = Field(..., description="Номер остановки, с 1")
+    location_id: int
+    location_code: str
+    name: str
+    x: Optional[float] = Field(None, description="Координата X (своя или ближайшего предка)")
+    y: Optional[float] = Field(None, description="Координата Y (своя или ближайшего предка)")
+    lines: List[PickListLine] = Field(default_factory=list, description="Строки листа отбора")
+
+
+class PickPathResponse(BaseModel):
+    """Маршрут отбора"""
+
+    strategy: PickPathStrategy = Field(..., description="Применённый способ")
+    distance: Optional[float] = Field(
+        None, description="Длина маршрута по координатам (если они есть у всех остановок)"
+    )
+    stops: List[PickPathStop]
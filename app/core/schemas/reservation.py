@@ -0,0 +1,83 @@
+"""Pydantic схемы для резервирования остатков"""
+
+from typing import Optional, List
+from pydantic import BaseModel, Field
+from datetime import datetime
+from app.core.enums import ReservationStatus
+from app.shared.constants import MAX_RESERVATION_LINES
+
+
+class ReservationLineCreate(BaseModel):
+    """Позиция резерва"""
+
+    product_id: str = Field(..., description="ID товара")
+    quantity: int = Field(..., ge=1, description="Количество")
+    batch_number: Optional[str] = Field(None, description="Номер партии (опционально)")
+
+
+class ReservationCreate(BaseModel):
+    """Схема для создания резерва"""
+
+    order_ref: Optional[str] = Field(None, max_length=100, description="Ссылка на заказ")
+    ttl_seconds: Optional[int] = Field(
+        None, ge=1, le=7 * 24 * 3600, description="Срок резерва в секундах"
+    )
+    lines: List[ReservationLineCreate] = Field(
+        ..., min_length=1, max_length=MAX_RESERVATION_LINES, description="Позиции"
+    )
+
+
+class ReservationFulfil(BaseModel):
+    """Схема для отгрузки по резерву"""
+
+    user_name: Optional[str] = Field(None, description="Имя пользователя")
+    reason: Optional[str] = Field(None, description="Причина/комментарий")
+
+
+class ReservationLineResponse(BaseModel):
+    """Зарезервированный остаток"""
+
+    line_id: int
+    product_id: str
+    location_id: int
+    location_code: str
+    batch_number: Optional[str] = None
+    container_code: Optional[str] = None
+    quantity: int
+
+    class Config:
+        from_attributes = True
+
+
+class ReservationResponse(BaseModel):
+    """Резерв в ответе API"""
+
+    reservation_id: int
+    order_ref: Optional[str] = None
+    status: ReservationStatus
+    expires_at: datetime
+    created_at: datetime
+    released_at: Optional[datetime] = None
+    lines: List[ReservationLineResponse] = Field(default_factory=list)
+
+    class Config:
+        from_attributes = True
+
+
+class ReservationExpireResponse(BaseModel):
+    """Результат снятия истёкших резервов"""
+
+    expired_count: int = Field(..., description="Количество снятых резервов")
+    reservation_ids: List[int] = Field(default_factory=list)
+
+
+class AvailableToPromise(BaseModel):
+    """Доступное к резервированию количество товара"""
+
+    product_id: str
+    on_hand: int = Field(default=0, description="Доступный остаток")
+    reserved: int = Field(default=0, description="Зарезервировано")
+    available: int = Field(default=0, description="Можно зарезервировать")
+
+    class Config:
+        from_attributes = True
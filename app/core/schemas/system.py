@@ -1,6 +1,6 @@
 """Pydantic схемы для системных операций"""
 
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import date, datetime
 
@@ -66,3 +66,50 @@ class IntegrityCheckResult(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ContainerSnapshotDrift(BaseModel):
+    """Расхождение снимка содержимого контейнера с container_contents"""
+
+    container_id: int
+    qr_code: str
+    snapshot: Optional[List[dict]] = Field(None, description="Содержимое в снимке контейнера")
+    actual: Optional[List[dict]] = Field(None, description="Фактическое содержимое")
+
+    class Config:
+        from_attributes = True
+
+
+class HotInventoryKeyCreate(BaseModel):
+    """Товар в локации для режима счётчиков"""
+
+    product_id: str = Field(..., description="ID товара")
+    location_code: str = Field(..., description="Код локации")
+
+
+class HotInventoryKey(BaseModel):
+    """Горячий ключ: движения товара в локации идут в шардированные счётчики"""
+
+    product_id: str
+    location_id: int
+    location_code: str
+    pending_delta: int = Field(default=0, description="Ещё не перенесено в inventory")
+    quota: int = Field(default=0, description="Можно списать через шарды до переноса")
+    stuck: bool = Field(default=False, description="Последний перенос ключа не удался")
+    stuck_since: Optional[datetime] = Field(None, description="С какого момента перенос не удаётся")
+    last_error: Optional[str] = Field(None, description="Ошибка последнего переноса")
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CompactCountersResponse(BaseModel):
+    """Результат переноса счётчиков в inventory"""
+
+    compacted_keys: int = Field(..., description="Обновлено строк inventory")
+    stuck_keys: int = Field(default=0, description="Ключей, перенос которых не удался")
+    compacted_at: datetime = Field(..., description="Время переноса")
+
+    class Config:
+        from_attributes = True
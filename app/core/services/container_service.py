@@ -1,21 +1,32 @@
 """Сервис для работы с контейнерами (бизнес-логика)"""
 
-from typing import List
+from typing import AsyncIterator, List, Optional
 from app.core.schemas.container import (
     ContainerRegister,
     ContainerRegisterResponse,
     ContainerResponse,
+    ContainerBatchLookup,
+    ContainerBatchLookupResponse,
     ContainerLocationUpdate,
     ContainerLocationUpdateResponse,
     ContainerUnpack,
     ContainerUnpackResponse,
+    ContainerUnpackBatch,
+    ContainerUnpackBatchResponse,
+    ContainerUnpackLineResult,
     ContainerStatusUpdate,
     ContainerStatusUpdateResponse,
+    ContainerBulkStatusUpdate,
+    ContainerBulkStatusUpdateResponse,
+    ContainerBulkStatusItem,
     ContainerHistoryItem,
     ContainerInLocation,
+    ContainerInSubtree,
+    ContainerSubtreePage,
 )
 from app.infrastructure.database.repositories.container_repository import ContainerRepository
 from app.infrastructure.database.repositories.location_repository import LocationRepository
+from app.shared.utils.streaming import ndjson_stream
 from app.core.exceptions import (
     ContainerNotFoundError,
     ContainerAlreadyExistsError,
@@ -75,6 +86,21 @@ class ContainerService:
             raise ContainerNotFoundError(f"Контейнер с QR-кодом '{qr_code}' не найден")
         return ContainerResponse.model_validate(dict(container))
 
+    async def lookup_containers(self, data: ContainerBatchLookup) -> ContainerBatchLookupResponse:
+        """
+        Получить контейнеры по списку QR-кодов
+
+        Все коды разрешаются одним запросом; ненайденные возвращаются в missing.
+        """
+        qr_codes = list(dict.fromkeys(data.qr_codes))
+        containers = await self.container_repo.get_by_qr_codes(qr_codes)
+        by_qr = {c["qr_code"]: c for c in containers}
+
+        return ContainerBatchLookupResponse(
+            found=[ContainerResponse.model_validate(by_qr[qr]) for qr in qr_codes if qr in by_qr],
+            missing=[qr for qr in qr_codes if qr not in by_qr],
+        )
+
     async def update_container_location(
         self, container_id: int, data: ContainerLocationUpdate
     ) -> ContainerLocationUpdateResponse:
@@ -144,6 +170,58 @@ class ContainerService:
 
         return ContainerUnpackResponse.model_validate(dict(result))
 
+    async def unpack_container_lines(
+        self, container_id: int, data: ContainerUnpackBatch
+    ) -> ContainerUnpackBatchResponse:
+        """
+        Вскрыть контейнер и извлечь несколько товаров за один вызов
+
+        Все позиции применяются в одной транзакции: если какой-то позиции
+        не хватает, ни одна из них не применяется.
+        """
+        # Проверка: контейнер существует?
+        container = await self.container_repo.get_by_id(container_id)
+        if not container:
+            raise ContainerNotFoundError(f"Контейнер с ID {container_id} не найден")
+
+        # Проверка: QR код совпадает?
+        if container["qr_code"] != data.qr_code:
+            raise ContainerNotFoundError(
+                f"QR-код '{data.qr_code}' не соответствует контейнеру ID {container_id}"
+            )
+
+        # Проверка: контейнер не заблокирован?
+        if container["status"] == "blocked":
+            raise ContainerBlockedError(
+                f"Контейнер '{data.qr_code}' заблокирован"
+            )
+
+        # Вскрытие всех позиций в одной транзакции
+        lines = [(line.product_id, line.quantity) for line in data.lines]
+        results = await self.container_repo.unpack_many(data.qr_code, lines)
+
+        # Репозиторий обрывает результат на первой невыполненной позиции
+        if not results[-1] or not results[-1]["success"]:
+            failed = data.lines[len(results) - 1]
+            raise InsufficientContainerQuantityError(
+                f"Недостаточно товара '{failed.product_id}' в контейнере "
+                f"(позиция {len(results)}), вскрытие отменено"
+            )
+
+        return ContainerUnpackBatchResponse(
+            container_id=container_id,
+            qr_code=data.qr_code,
+            lines=[
+                ContainerUnpackLineResult(
+                    product_id=line.product_id,
+                    quantity=line.quantity,
+                    remaining_in_container=result["remaining_in_container"],
+                    loose_quantity=result["loose_quantity"],
+                )
+                for line, result in zip(data.lines, results)
+            ],
+        )
+
     async def update_container_status(
         self, container_id: int, data: ContainerStatusUpdate
     ) -> ContainerStatusUpdateResponse:
@@ -162,6 +240,49 @@ class ContainerService:
 
         return ContainerStatusUpdateResponse.model_validate(dict(result))
 
+    async def bulk_update_container_status(
+        self, data: ContainerBulkStatusUpdate
+    ) -> ContainerBulkStatusUpdateResponse:
+        """
+        Обновить статус группы контейнеров
+
+        Контейнеры выбираются по списку ID и/или фильтрам и обновляются
+        одним запросом. Заблокированные контейнеры пропускаются.
+        """
+        # Проверка: локация существует?
+        if data.location_id is not None:
+            location = await self.location_repo.get_by_id(data.location_id)
+            if not location:
+                raise LocationNotFoundError(f"Локация с ID {data.location_id} не найдена")
+
+        results = await self.container_repo.bulk_update_status(
+            status=data.status.value,
+            container_ids=data.container_ids,
+            location_id=data.location_id,
+            batch_number=data.batch_number,
+            container_type=data.container_type.value if data.container_type else None,
+        )
+
+        updated = [ContainerBulkStatusItem.model_validate(dict(r)) for r in results if r["updated"]]
+        skipped = [
+            ContainerBulkStatusItem.model_validate(dict(r)) for r in results if not r["updated"]
+        ]
+
+        not_found_ids = []
+        if data.container_ids:
+            selected_ids = {r["container_id"] for r in results}
+            not_found_ids = [
+                cid for cid in dict.fromkeys(data.container_ids) if cid not in selected_ids
+            ]
+
+        return ContainerBulkStatusUpdateResponse(
+            status=data.status,
+            updated_count=len(updated),
+            updated=updated,
+            skipped_blocked=skipped,
+            not_found_ids=not_found_ids,
+        )
+
     async def get_container_history(self, qr_code: str) -> List[ContainerHistoryItem]:
         """Получить историю контейнера"""
         # Проверка: контейнер существует?
@@ -189,3 +310,53 @@ class ContainerService:
             location_id, status, container_type
         )
         return [ContainerInLocation.model_validate(dict(c)) for c in containers]
+
+    async def get_containers_in_subtree(
+        self,
+        location_id: int,
+        status: Optional[str] = None,
+        container_type: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> ContainerSubtreePage:
+        """
+        Получить контейнеры во всём поддереве локации
+
+        Keyset-пагинация по container_id: следующая страница запрашивается
+        с after_id = next_after_id предыдущей.
+        """
+        # Проверка: локация существует?
+        location = await self.location_repo.get_by_id(location_id)
+        if not location:
+            raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        containers = await self.container_repo.get_containers_in_subtree(
+            location_id, status, container_type, after_id, limit
+        )
+        items = [ContainerInSubtree.model_validate(dict(c)) for c in containers]
+        next_after_id = items[-1].container_id if len(items) == limit else None
+        return ContainerSubtreePage(items=items, next_after_id=next_after_id)
+
+    async def stream_containers_in_subtree(
+        self,
+        location_id: int,
+        status: Optional[str] = None,
+        container_type: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Выгрузить контейнеры поддерева локации потоком NDJSON
+
+        Существование локации проверяется до начала выдачи,
+        чтобы ошибка вернулась обычным 404.
+        """
+        location = await self.location_repo.get_by_id(location_id)
+        if not location:
+            raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        async def items():
+            async for record in self.container_repo.iter_containers_in_subtree(
+                location_id, status, container_type
+            ):
+                yield ContainerInSubtree.model_validate(dict(record))
+
+        return ndjson_stream(items())
@@ -1,21 +1,50 @@
 """Сервис для работы с инвентарём (остатками)"""
 
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from app.core.schemas.inventory import (
     InventoryItemResponse,
+    ProductStockResponse,
     InventoryInLocationResponse,
     InventorySummaryResponse,
     InventoryInContainerResponse,
     LooseInventoryResponse,
     InventorySearchResult,
+    InventoryExportRow,
+    InventoryChangeEvent,
+    InventoryDeltaResponse,
+    InventorySubtreeAggregate,
+    AllocationRequest,
+    AllocationResponse,
+    AllocationLineResult,
+    AllocationPick,
+    BatchExpiryUpdate,
+    BatchAgeResponse,
 )
 from app.infrastructure.database.repositories.inventory_repository import InventoryRepository
 from app.infrastructure.database.repositories.location_repository import LocationRepository
 from app.infrastructure.database.repositories.container_repository import ContainerRepository
+from app.infrastructure.database.location_index import location_index
+from app.infrastructure.database.change_feed import (
+    inventory_change_feed,
+    change_token,
+    format_change_token,
+    parse_change_token,
+    FETCH_LIMIT as CHANGE_FEED_FETCH_LIMIT,
+    RESYNC,
+)
+from app.shared.config import settings
+from app.shared.utils.streaming import (
+    ndjson_stream,
+    csv_stream,
+    sse_event,
+    SSE_KEEPALIVE,
+)
 from app.core.exceptions import (
     InventoryNotFoundError,
     LocationNotFoundError,
     ContainerNotFoundError,
+    InvalidChangeTokenError,
 )
 
 
@@ -44,6 +73,38 @@ class InventoryService:
             raise InventoryNotFoundError(f"Остатки товара '{product_id}' не найдены")
         return [InventoryItemResponse.model_validate(dict(r)) for r in results]
 
+    async def stream_stock_by_products(self, product_ids: List[str]) -> AsyncIterator[bytes]:
+        """
+        Выгрузить остатки списка товаров потоком NDJSON
+
+        Одна строка на товар в порядке product_id. Товары без остатков
+        выдаются в конце с нулевым количеством и пустым списком.
+        """
+        requested = list(dict.fromkeys(product_ids))
+
+        async def products():
+            seen = set()
+            current: Optional[ProductStockResponse] = None
+            async for record in self.inventory_repo.iter_by_products(requested):
+                item = InventoryItemResponse.model_validate(dict(record))
+                if current is None or current.product_id != item.product_id:
+                    if current is not None:
+                        yield current
+                    seen.add(item.product_id)
+                    current = ProductStockResponse(
+                        product_id=item.product_id, product_name=item.product_name
+                    )
+                current.items.append(item)
+                current.total_quantity += item.quantity
+            if current is not None:
+                yield current
+
+            for product_id in requested:
+                if product_id not in seen:
+                    yield ProductStockResponse(product_id=product_id)
+
+        return ndjson_stream(products())
+
     async def get_inventory_by_location(self, location_id: int) -> List[InventoryInLocationResponse]:
         """
         Получить все остатки в локации
@@ -58,6 +119,108 @@ class InventoryService:
         results = await self.inventory_repo.get_by_location(location_id)
         return [InventoryInLocationResponse.model_validate(dict(r)) for r in results]
 
+    async def get_subtree_inventory(
+        self,
+        location_id: int,
+        group_by: str = "product",
+        breakdown: bool = False,
+        product_id: Optional[str] = None,
+        loose_only: bool = False,
+    ) -> List[InventorySubtreeAggregate]:
+        """
+        Получить остатки поддерева локации
+
+        Суммирует остатки локации и всех её потомков по товарам
+        (group_by="product"), партиям ("batch") или статусам ("status").
+        При breakdown итоги разбиваются по прямым дочерним локациям;
+        остатки в самой локации попадают в строку с самой локацией.
+
+        Поддерево и строки разбивки берутся из индекса иерархии в памяти;
+        пока локации в нём нет - обходом ltree в БД.
+        """
+        root = location_index.get(location_id)
+        if root is not None:
+            nodes = location_index.subtree(location_id)
+            child_ids = [None] * len(nodes)
+            if breakdown:
+                for position, node in enumerate(nodes):
+                    child = location_index.ancestor_at_level(node.location_id, root.level + 1)
+                    child_ids[position] = child.location_id if child else None
+            results = await self.inventory_repo.get_locations_aggregate(
+                [node.location_id for node in nodes], child_ids, group_by, product_id, loose_only
+            )
+            return [InventorySubtreeAggregate.model_validate(dict(r)) for r in results]
+
+        # Проверка существования локации
+        location = await self.location_repo.get_by_id(location_id)
+        if not location:
+            raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        results = await self.inventory_repo.get_subtree_aggregate(
+            location_id, group_by, breakdown, product_id, loose_only
+        )
+        return [InventorySubtreeAggregate.model_validate(dict(r)) for r in results]
+
+    async def allocate(self, data: AllocationRequest) -> AllocationResponse:
+        """
+        Построить план отбора заказа по политике FIFO/FEFO
+
+        Остатки всех товаров заказа читаются одним запросом уже в порядке
+        списания; строки распределяются по очереди, несколько строк одного
+        товара расходуют общий остаток. Действующие резервы вычитаются,
+        кроме резерва самого заказа (reservation_id); сам план ничего
+        не резервирует.
+        """
+        product_ids = list(dict.fromkeys(line.product_id for line in data.lines))
+        candidates = await self.inventory_repo.get_allocation_candidates(
+            product_ids, data.policy.value, data.reservation_id
+        )
+
+        stock: Dict[str, List[dict]] = {}
+        for r in candidates:
+            stock.setdefault(r["product_id"], []).append(dict(r))
+
+        lines = []
+        for line in data.lines:
+            need = line.quantity
+            picks = []
+            for row in stock.get(line.product_id, []):
+                if need == 0:
+                    break
+                take = min(row["available"], need)
+                if take <= 0:
+                    continue
+                row["available"] -= take
+                need -= take
+                picks.append(AllocationPick(**row, quantity=take))
+
+            lines.append(
+                AllocationLineResult(
+                    product_id=line.product_id,
+                    requested=line.quantity,
+                    allocated=line.quantity - need,
+                    shortage=need,
+                    picks=picks,
+                )
+            )
+
+        return AllocationResponse(
+            policy=data.policy,
+            fully_allocated=all(line.shortage == 0 for line in lines),
+            lines=lines,
+        )
+
+    async def update_batch_expiry(self, data: BatchExpiryUpdate) -> BatchAgeResponse:
+        """Задать срок годности партии (используется политикой FEFO)"""
+        result = await self.inventory_repo.update_batch_expiry(
+            data.product_id, data.batch_number, data.expires_at
+        )
+        if not result:
+            raise InventoryNotFoundError(
+                f"Партия '{data.batch_number}' товара '{data.product_id}' не принималась"
+            )
+        return BatchAgeResponse.model_validate(dict(result))
+
     async def get_inventory_summary(
         self, category: Optional[str] = None
     ) -> List[InventorySummaryResponse]:
@@ -70,6 +233,21 @@ class InventoryService:
         results = await self.inventory_repo.get_summary(category)
         return [InventorySummaryResponse.model_validate(dict(r)) for r in results]
 
+    async def get_inventory_summary_cached(
+        self, category: Optional[str], max_staleness: float
+    ) -> Tuple[List[InventorySummaryResponse], float]:
+        """
+        Получить агрегированные остатки с допустимой задержкой
+
+        Читает материализованное представление mv_product_stock. Если оно
+        старше max_staleness секунд, представление обновляется перед чтением.
+
+        Returns:
+            Остатки и возраст данных в секундах
+        """
+        results, age = await self.inventory_repo.get_summary_from_view(category, max_staleness)
+        return [InventorySummaryResponse.model_validate(dict(r)) for r in results], age
+
     async def get_inventory_in_container(
         self, qr_code: str
     ) -> List[InventoryInContainerResponse]:
@@ -99,14 +277,194 @@ class InventoryService:
         results = await self.inventory_repo.get_loose(location_id)
         return [LooseInventoryResponse.model_validate(dict(r)) for r in results]
 
-    async def search_inventory(self, query: str) -> List[InventorySearchResult]:
+    async def search_inventory(
+        self, query: str, mode: str = "full", limit: int = 50
+    ) -> List[InventorySearchResult]:
         """
         Поиск товара на складе
 
         Ищет по product_id, названию товара, номеру партии или коду контейнера.
+        В режиме typeahead выше ранжируются совпадения по началу строки.
         """
         if not query or len(query) < 2:
             raise ValueError("Поисковый запрос должен содержать минимум 2 символа")
 
-        results = await self.inventory_repo.search(query)
+        results = await self.inventory_repo.search(
+            query, typeahead=(mode == "typeahead"), limit=limit
+        )
         return [InventorySearchResult.model_validate(dict(r)) for r in results]
+
+    async def export_inventory(
+        self,
+        export_format: str = "csv",
+        zone_type: Optional[str] = None,
+        status: Optional[str] = None,
+        location_id: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Выгрузить остатки потоком в CSV или NDJSON
+
+        Строки читаются из server-side cursor и сериализуются по одной,
+        поэтому память не растёт с объёмом склада.
+        """
+        # Проверка существования локации
+        if location_id is not None:
+            location = await self.location_repo.get_by_id(location_id)
+            if not location:
+                raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        async def rows():
+            async for record in self.inventory_repo.iter_export(zone_type, status, location_id):
+                yield InventoryExportRow.model_validate(dict(record))
+
+        if export_format == "ndjson":
+            return ndjson_stream(rows())
+        return csv_stream(rows(), InventoryExportRow)
+
+    async def get_changes_since(
+        self, since: Optional[str] = None, limit: int = CHANGE_FEED_FETCH_LIMIT
+    ) -> InventoryDeltaResponse:
+        """
+        Получить товары, остатки которых изменились после watermark
+
+        Без since возвращает текущий watermark без товаров: клиент берёт его
+        до полной выгрузки остатков и дальше синхронизирует только изменения.
+        Итоги читаются после изменений, поэтому могут включать и более поздние
+        изменения - такие товары придут повторно в следующей порции.
+
+        Args:
+            since: Watermark предыдущего запроса
+            limit: Максимум просматриваемых изменений за запрос
+        """
+        if not since:
+            head = await self.inventory_repo.get_changes_head()
+            return InventoryDeltaResponse(next_watermark=format_change_token(head))
+
+        position = parse_change_token(since)
+        if position is None:
+            raise InvalidChangeTokenError(f"Некорректный watermark '{since}'")
+        if position < await self.inventory_repo.get_changes_horizon():
+            # Часть изменений после watermark уже удалена по сроку хранения
+            head = await self.inventory_repo.get_changes_head()
+            return InventoryDeltaResponse(
+                next_watermark=format_change_token(head), resync_required=True
+            )
+
+        totals, position, has_more = await self.inventory_repo.get_changed_products(
+            position, limit
+        )
+        return InventoryDeltaResponse(
+            items=[InventorySummaryResponse.model_validate(dict(r)) for r in totals],
+            next_watermark=format_change_token(position),
+            has_more=has_more,
+        )
+
+    async def stream_changes(
+        self,
+        after: Optional[str] = None,
+        product_id: Optional[str] = None,
+        location_id: Optional[int] = None,
+        zone_type: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Лента изменений остатков в формате Server-Sent Events
+
+        Сначала дочитывает из БД изменения после токена after, затем отдаёт
+        изменения в реальном времени. id каждого события - токен продолжения:
+        при переподключении он передаётся в Last-Event-ID. Если токен старше
+        срока хранения ленты, первым идёт событие resync (клиент перечитывает
+        остатки целиком), и лента продолжается с текущей позиции.
+
+        Args:
+            after: Токен продолжения (если не указан - только новые изменения)
+            product_id: Только изменения товара
+            location_id: Только изменения в поддереве локации
+            zone_type: Только изменения в зонах типа
+        """
+        position = None
+        if after:
+            position = parse_change_token(after)
+            if position is None:
+                raise InvalidChangeTokenError(f"Некорректный токен продолжения '{after}'")
+
+        # Путь локации для фильтра по поддереву
+        location_path = None
+        if location_id is not None:
+            location = await self.location_repo.get_by_id(location_id)
+            if not location:
+                raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+            location_path = location["path"]
+
+        resync = (
+            position is not None and position < await self.inventory_repo.get_changes_horizon()
+        )
+        if position is None or resync:
+            position = await self.inventory_repo.get_changes_head()
+
+        def matches(change) -> bool:
+            if product_id is not None and change["product_id"] != product_id:
+                return False
+            if zone_type is not None and change["zone_type"] != zone_type:
+                return False
+            if location_path is not None:
+                path = change["location_path"]
+                if path != location_path and not path.startswith(location_path + "."):
+                    return False
+            return True
+
+        def to_event(change) -> bytes:
+            token = format_change_token(change_token(change))
+            item = InventoryChangeEvent.model_validate({**dict(change), "token": token})
+            return sse_event(item.model_dump_json(), event_id=token, event="inventory")
+
+        async def catch_up():
+            nonlocal position
+            while True:
+                changes = await self.inventory_repo.get_changes_after(
+                    position, CHANGE_FEED_FETCH_LIMIT
+                )
+                for change in changes:
+                    position = change_token(change)
+                    yield change
+                if len(changes) < CHANGE_FEED_FETCH_LIMIT:
+                    return
+
+        async def events():
+            nonlocal position
+            # Подписка до чтения из БД: ничего не теряется между этапами,
+            # дубликаты отсекаются по позиции
+            queue = inventory_change_feed.subscribe()
+            try:
+                if resync:
+                    token = format_change_token(position)
+                    yield sse_event(token, event_id=token, event="resync")
+
+                async for change in catch_up():
+                    if matches(change):
+                        yield to_event(change)
+
+                while True:
+                    try:
+                        change = await asyncio.wait_for(
+                            queue.get(), timeout=settings.CHANGE_FEED_KEEPALIVE
+                        )
+                    except asyncio.TimeoutError:
+                        yield SSE_KEEPALIVE
+                        continue
+
+                    if change is RESYNC:
+                        async for missed in catch_up():
+                            if matches(missed):
+                                yield to_event(missed)
+                        continue
+
+                    token = change_token(change)
+                    if token <= position:
+                        continue
+                    position = token
+                    if matches(change):
+                        yield to_event(change)
+            finally:
+                inventory_change_feed.unsubscribe(queue)
+
+        return events()
@@ -1,6 +1,10 @@
 """Сервис для работы с локациями (бизнес-логика)"""
 
-from typing import List
+import json
+from decimal import Decimal
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterable, List, Mapping, Optional, Tuple
+from pydantic_core import to_json
 from app.core.schemas.location import (
     LocationCreate,
     LocationUpdate,
@@ -9,9 +13,121 @@ from app.core.schemas.location import (
     LocationDeactivateResponse,
     ZoneResponse,
     LocationTreeNode,
+    LocationBreadcrumb,
+    LocationSuggestion,
+    LocationTemplate,
+    LocationTemplateResponse,
+    LocationTemplateLevelSummary,
+    LocationSubtreeUpdate,
+    LocationSubtreeUpdateResponse,
+    PutawaySlot,
+    PutawayReservationCreate,
+    PutawayReservationResponse,
+    PutawayPlanRequest,
+    PutawayPlanResponse,
+    PickPathRequest,
+    PickPathResponse,
+    PickPathStop,
+)
+from app.core.services.pick_path import (
+    PickStop,
+    distance_pick_path,
+    pick_path_length,
+    serpentine_pick_path,
+)
+from app.core.services.putaway_planner import (
+    PUTAWAY_PLAN_SPARE_VOLUME,
+    PUTAWAY_SCAN_LIMIT,
+    plan_putaway,
 )
 from app.infrastructure.database.repositories.location_repository import LocationRepository
-from app.core.exceptions import LocationNotFoundError, ParentLocationInactiveError
+from app.infrastructure.database.location_index import code_key, location_index
+from app.core.enums import PickPathStrategy, ZoneType
+from app.core.exceptions import (
+    DomainException,
+    LocationNotFoundError,
+    ParentLocationInactiveError,
+    LocationAlreadyExistsError,
+    LocationHasInventoryError,
+    ProductNotFoundError,
+    ProductDimensionsMissingError,
+    PutawayReservationNotFoundError,
+)
+from app.shared.constants import MAX_LOCATION_LEVEL
+from app.shared.config import settings
+from app.shared.utils.cache import VersionedCache
+from app.shared.utils.streaming import ndjson_stream
+
+# Сериализованное дерево зон по max_level, действительное для версии локаций
+_zones_tree_cache = VersionedCache()
+
+
+def zones_tree_etag(version: int, max_level: int) -> str:
+    """ETag дерева зон для версии справочника локаций"""
+    return f'"zones-tree-v{version}-l{max_level}"'
+
+
+# Поля узла дерева в порядке схемы (без children)
+_TREE_NODE_FIELDS = tuple(field for field in LocationTreeNode.model_fields if field != "children")
+_ZONE_TYPES = {zone_type.value: zone_type for zone_type in ZoneType}
+
+
+def location_tree_json(locations: Iterable[Mapping]) -> bytes:
+    """
+    Сериализовать дерево локаций в JSON за один проход
+
+    Список должен быть упорядочен по path - это обход дерева в глубину:
+    родитель идёт раньше потомков, поддерево идёт подряд. Поэтому JSON
+    пишется сразу, со стеком открытых узлов, без построения дерева
+    объектов и без валидации (данные уже проверены ограничениями БД).
+    Результат совпадает с сериализацией List[LocationTreeNode].
+    Локации, родителя которых нет в списке (неактивная ветка),
+    отбрасываются вместе с потомками.
+    """
+    parts = [b"["]
+    stack = []  # ID открытых узлов от корня
+    emitted = set()
+    list_opened = True  # последним записан "[" - запятая не нужна
+    for loc in locations:
+        parent_id = loc["parent_location_id"]
+        if parent_id is not None and parent_id not in emitted:
+            continue
+
+        # Закрываем узлы, пока на вершине стека не окажется родитель
+        while stack and stack[-1] != parent_id:
+            stack.pop()
+            parts.append(b"]}")
+            list_opened = False
+        if not list_opened:
+            parts.append(b",")
+
+        node = {field: loc[field] for field in _TREE_NODE_FIELDS}
+        node["zone_type"] = _ZONE_TYPES[node["zone_type"]]
+        if isinstance(node["metadata"], str):
+            node["metadata"] = json.loads(node["metadata"])
+        parts.append(to_json(node)[:-1])
+        parts.append(b',"children":[')
+        list_opened = True
+
+        stack.append(loc["location_id"])
+        emitted.add(loc["location_id"])
+
+    parts.append(b"]}" * len(stack))
+    parts.append(b"]")
+    return b"".join(parts)
+
+
+def _index_row(node) -> dict:
+    """Поля локации из индекса иерархии"""
+    return {
+        "location_id": node.location_id,
+        "location_code": node.location_code,
+        "name": node.name,
+        "zone_type": node.zone_type,
+        "level": node.level,
+        "path": node.path,
+        "is_active": node.is_active,
+    }
 
 
 class LocationService:
@@ -20,37 +136,35 @@ class LocationService:
     def __init__(self, repository: LocationRepository):
         self.repo = repository
 
-    async def get_zones_tree(self, max_level: int = 5) -> List[LocationTreeNode]:
-        """
-        Получить иерархическое дерево зон
+    async def get_location_version(self) -> int:
+        """Получить текущую версию справочника локаций"""
+        return await self.repo.get_version()
 
-        Args:
-            max_level: Максимальный уровень вложенности (0-5)
+    async def get_zones_tree_json(
+        self, max_level: int = 5, version: Optional[int] = None
+    ) -> Tuple[bytes, int]:
         """
-        # Получаем плоский список
-        locations = await self.repo.get_zones_hierarchy(max_level)
+        Получить сериализованное дерево зон из кэша
 
-        # Конвертируем в dict для быстрого доступа
-        locations_dict = {loc["location_id"]: dict(loc) for loc in locations}
+        Дерево строится заново только после изменения локаций (версия
+        справочника увеличивается триггером в БД).
 
-        # Добавляем поле children в каждую локацию
-        for loc in locations_dict.values():
-            loc["children"] = []
+        Args:
+            max_level: Максимальный уровень вложенности (0-5)
+            version: Уже известная текущая версия (чтобы не читать её повторно)
 
-        # Строим дерево
-        roots = []
-        for loc in locations_dict.values():
-            if loc["parent_location_id"] is None:
-                # Корневой элемент
-                roots.append(loc)
-            else:
-                # Добавляем к родителю
-                parent = locations_dict.get(loc["parent_location_id"])
-                if parent:
-                    parent["children"].append(loc)
+        Returns:
+            JSON дерева и версия, для которой оно построено
+        """
+        if version is None:
+            version = await self.repo.get_version()
 
-        # Конвертируем в Pydantic модели (рекурсивно)
-        return [LocationTreeNode.model_validate(root) for root in roots]
+        body = _zones_tree_cache.get(max_level, version)
+        if body is None:
+            version, locations = await self.repo.get_zones_hierarchy_versioned(max_level)
+            body = location_tree_json(locations)
+            _zones_tree_cache.set(max_level, version, body)
+        return body, version
 
     async def get_zones(self) -> List[ZoneResponse]:
         """Получить список всех активных зон склада"""
@@ -64,6 +178,7 @@ class LocationService:
         Проверяет:
         - Если указан parent_location_id, то родитель должен существовать и быть активным
         """
+        parent = None
         # Бизнес-правило: если есть родитель, проверяем что он активен
         if data.parent_location_id:
             parent = await self.repo.get_by_id(data.parent_location_id)
@@ -81,7 +196,67 @@ class LocationService:
         location = await self.repo.create(data.model_dump())
 
         # Конвертация asyncpg.Record → Pydantic
-        return LocationResponse.model_validate(dict(location))
+        return LocationResponse.model_validate(self._with_parent(location, parent))
+
+    async def generate_locations(self, template: LocationTemplate) -> LocationTemplateResponse:
+        """
+        Сгенерировать поддерево локаций по шаблону
+
+        Все уровни создаются в одной транзакции, по одному INSERT на уровень:
+        либо создаётся всё поддерево, либо ничего.
+        """
+        parent = await self.repo.get_by_id(template.parent_location_id)
+        if not parent:
+            raise LocationNotFoundError(
+                f"Родительская локация с ID {template.parent_location_id} не найдена"
+            )
+        if not parent["is_active"]:
+            raise ParentLocationInactiveError(
+                f"Родительская локация '{parent['location_code']}' неактивна. "
+                f"Нельзя создать дочерние локации."
+            )
+        if parent["level"] + len(template.levels) > MAX_LOCATION_LEVEL:
+            raise DomainException(
+                f"Шаблон из {len(template.levels)} уровней под локацией уровня "
+                f"{parent['level']} превышает максимальный уровень {MAX_LOCATION_LEVEL}"
+            )
+
+        levels = [
+            {
+                "names": level.names(),
+                "zone_type": level.zone_type.value,
+                "level": parent["level"] + depth,
+                "max_weight": level.max_weight,
+                "max_volume": level.max_volume,
+                "is_pickable": level.is_pickable,
+                "metadata": level.metadata,
+            }
+            for depth, level in enumerate(template.levels, start=1)
+        ]
+        # Ниже первого уровня всё создаётся заново, конфликт возможен только с соседями
+        taken, created = await self.repo.bulk_create(template.parent_location_id, levels)
+        if taken:
+            raise LocationAlreadyExistsError(
+                f"У локации '{parent['location_code']}' уже есть дочерние локации: "
+                f"{', '.join(taken[:10])}"
+            )
+
+        summaries = [
+            LocationTemplateLevelSummary(
+                level=level["level"],
+                zone_type=level["zone_type"],
+                created=len(rows),
+                first_location_code=rows[0]["location_code"],
+                last_location_code=rows[-1]["location_code"],
+            )
+            for level, rows in zip(levels, created)
+        ]
+        return LocationTemplateResponse(
+            parent_location_id=template.parent_location_id,
+            parent_location_code=parent["location_code"],
+            created=sum(summary.created for summary in summaries),
+            levels=summaries,
+        )
 
     async def get_location_by_id(self, location_id: int) -> LocationResponse:
         """Получить локацию по ID"""
@@ -97,24 +272,219 @@ class LocationService:
             raise LocationNotFoundError(f"Локация с кодом '{location_code}' не найдена")
         return LocationResponse.model_validate(dict(location))
 
+    async def autocomplete(
+        self, prefix: str, limit: int, include_inactive: bool = False
+    ) -> List[LocationSuggestion]:
+        """
+        Автодополнение кода локации по началу
+
+        Отвечает из индекса иерархии в памяти; пока он не загружен - из БД.
+        """
+        if location_index.loaded:
+            nodes = location_index.autocomplete(prefix, limit, include_inactive)
+            return [LocationSuggestion.model_validate(_index_row(node)) for node in nodes]
+
+        # БД сравнивает lower(NFC), индекс - code_key: лишнее отсеиваем,
+        # чтобы ответ не зависел от того, загружен ли индекс
+        key = code_key(prefix)
+        rows = await self.repo.autocomplete(prefix, limit, include_inactive)
+        rows = [row for row in rows if code_key(row["location_code"]).startswith(key)]
+        rows.sort(key=lambda row: (code_key(row["location_code"]), row["location_code"]))
+        return [LocationSuggestion.model_validate(dict(row)) for row in rows]
+
+    async def get_pick_path(self, data: PickPathRequest) -> PickPathResponse:
+        """
+        Упорядочить локации отбора в маршрут
+
+        По умолчанию - змейкой по проходам иерархии. Для distance нужны
+        координаты x, y в metadata (своей локации или предка) у всех
+        остановок; если их нет, маршрут остаётся змейкой и в ответе
+        указан применённый способ.
+        """
+        codes = list(
+            dict.fromkeys([*data.location_codes, *(line.location_code for line in data.lines)])
+        )
+        lookup = codes + [data.start_location_code] if data.start_location_code else codes
+        stops = await self._pick_stops(lookup)
+        missing = [code for code in dict.fromkeys(lookup) if code not in stops]
+        if missing:
+            raise LocationNotFoundError(f"Локации не найдены: {', '.join(missing[:10])}")
+        for line in data.lines:
+            stops[line.location_code].lines.append(line)
+
+        start = stops[data.start_location_code] if data.start_location_code else None
+        origin = (start.x, start.y) if start is not None and start.has_point else None
+        route = serpentine_pick_path((stops[code] for code in codes), data.aisle_level)
+        strategy = PickPathStrategy.SERPENTINE
+        if data.strategy == PickPathStrategy.DISTANCE and all(stop.has_point for stop in route):
+            route = distance_pick_path(route, origin)
+            strategy = PickPathStrategy.DISTANCE
+
+        return PickPathResponse(
+            strategy=strategy,
+            distance=pick_path_length(route, origin),
+            stops=[
+                PickPathStop(
+                    sequence=sequence,
+                    location_id=stop.location_id,
+                    location_code=stop.location_code,
+                    name=stop.name,
+                    x=stop.x,
+                    y=stop.y,
+                    lines=stop.lines,
+                )
+                for sequence, stop in enumerate(route, start=1)
+            ],
+        )
+
+    async def _pick_stops(self, location_codes: List[str]) -> Dict[str, PickStop]:
+        """Остановки маршрута по кодам: из индекса иерархии, пока он не загружен - из БД"""
+        stops = {}
+        if location_index.loaded:
+            for code in location_codes:
+                node = location_index.get_by_code(code)
+                if node is None:
+                    continue
+                chain = location_index.ancestors(node.location_id)
+                located = next((n for n in reversed(chain) if n.x is not None), None)
+                stops[code] = PickStop(
+                    node.location_id,
+                    node.location_code,
+                    node.name,
+                    [(n.level, n.location_code) for n in chain],
+                    located.x if located else None,
+                    located.y if located else None,
+                )
+            return stops
+
+        for row in await self.repo.get_pick_path_locations(location_codes):
+            stops[row["location_code"]] = PickStop(
+                row["location_id"],
+                row["location_code"],
+                row["name"],
+                list(zip(row["chain_levels"], row["chain_codes"])),
+                row["x"],
+                row["y"],
+            )
+        return stops
+
     async def get_children(
-            self, location_id: int, recursive: bool = True
-    ) -> List[LocationChildResponse]:
+            self,
+            location_id: int,
+            recursive: bool = True,
+            max_depth: Optional[int] = None,
+            after: Optional[str] = None,
+            limit: Optional[int] = None,
+    ) -> Tuple[List[LocationChildResponse], Optional[str]]:
         """
-        Получить дочерние локации
-        
+        Получить дочерние локации в порядке path
+
+        Keyset-пагинация по path: следующая страница запрашивается
+        с after = курсору, возвращённому для предыдущей.
+
         Args:
             location_id: ID родительской локации
             recursive: Если True - все потомки (через LTREE), если False - только прямые дети
+            max_depth: Максимальная глубина от родителя (для ленивой загрузки дерева)
+            after: Курсор - path последней полученной локации
+            limit: Размер страницы (None - все)
+
+        Returns:
+            Локации и курсор следующей страницы (None - страниц больше нет)
         """
-        # Проверяем что родитель существует
-        parent = await self.repo.get_by_id(location_id)
-        if not parent:
+        if not recursive:
+            max_depth = 1
+
+        # Сначала индекс в памяти; локации, которой в нём ещё нет, ищем в БД
+        node = location_index.get(location_id)
+        if node is not None:
+            nodes = location_index.iter_descendants(location_id, max_depth, after)
+            if limit is not None:
+                nodes = islice(nodes, limit)
+            children = [
+                LocationChildResponse.model_validate(
+                    {**_index_row(child), "depth": child.depth - node.depth}
+                )
+                for child in nodes
+            ]
+        else:
+            # Проверяем что родитель существует
+            parent = await self.repo.get_by_id(location_id)
+            if not parent:
+                raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+            # Получаем дочерние локации
+            records = await self.repo.get_children(location_id, max_depth, after, limit)
+            children = [LocationChildResponse.model_validate(dict(child)) for child in records]
+
+        next_after = children[-1].path if limit is not None and len(children) == limit else None
+        return children, next_after
+
+    async def stream_children(
+            self, location_id: int, max_depth: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Выгрузить потомков локации потоком NDJSON в порядке path
+
+        Существование локации проверяется до начала выдачи,
+        чтобы ошибка вернулась обычным 404.
+        """
+        node = location_index.get(location_id)
+        if node is not None:
+            async def items():
+                for child in location_index.iter_descendants(location_id, max_depth):
+                    yield LocationChildResponse.model_validate(
+                        {**_index_row(child), "depth": child.depth - node.depth}
+                    )
+
+            return ndjson_stream(items())
+
+        location = await self.repo.get_by_id(location_id)
+        if not location:
+            raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        async def records():
+            async for record in self.repo.iter_children(location_id, max_depth):
+                yield LocationChildResponse.model_validate(dict(record))
+
+        return ndjson_stream(records())
+
+    async def get_breadcrumbs(self, location_id: int) -> List[LocationBreadcrumb]:
+        """
+        Получить цепочку предков локации от корня до неё самой
+
+        Берётся из индекса в памяти без запроса к БД; пока индекс
+        не загружен или локации в нём ещё нет - из БД.
+        """
+        chain = location_index.ancestors(location_id)
+        if chain:
+            return [LocationBreadcrumb.model_validate(_index_row(node)) for node in chain]
+
+        rows = await self.repo.get_ancestors(location_id)
+        if not rows:
             raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+        return [LocationBreadcrumb.model_validate(dict(row)) for row in rows]
 
-        # Получаем дочерние локации
-        children = await self.repo.get_children(location_id, recursive)
-        return [LocationChildResponse.model_validate(dict(child)) for child in children]
+    @staticmethod
+    def _with_parent(location: Mapping, parent: Optional[Mapping] = None) -> dict:
+        """
+        Заполнить код и название родителя из индекса иерархии
+
+        Если родителя в индексе ещё нет - из уже прочитанной строки
+        родителя (parent), иначе поля остаются как в location.
+        """
+        location = dict(location)
+        parent_id = location.get("parent_location_id")
+        if parent_id is None:
+            return location
+        node = location_index.get(parent_id)
+        if node is not None:
+            location["parent_location_code"] = node.location_code
+            location["parent_name"] = node.name
+        elif parent is not None:
+            location["parent_location_code"] = parent["location_code"]
+            location["parent_name"] = parent["name"]
+        return location
 
     async def update_location(self, location_id: int, data: LocationUpdate) -> LocationResponse:
         """Обновить локацию"""
@@ -125,7 +495,10 @@ class LocationService:
 
         # Обновление (только переданные поля)
         updated = await self.repo.update(location_id, data.model_dump(exclude_unset=True))
-        return LocationResponse.model_validate(dict(updated))
+        location = dict(updated)
+        location["parent_location_code"] = existing["parent_location_code"]
+        location["parent_name"] = existing["parent_name"]
+        return LocationResponse.model_validate(self._with_parent(location))
 
     async def deactivate_location(self, location_id: int) -> LocationDeactivateResponse:
         """Деактивировать локацию"""
@@ -138,6 +511,41 @@ class LocationService:
         deactivated = await self.repo.deactivate(location_id)
         return LocationDeactivateResponse.model_validate(dict(deactivated))
 
+    async def update_subtree(
+            self, location_id: int, data: LocationSubtreeUpdate, dry_run: bool = False
+    ) -> LocationSubtreeUpdateResponse:
+        """
+        Изменить все локации поддерева одним запросом
+
+        Деактивация не выполняется, если в какой-либо из деактивируемых
+        локаций есть товар. При dry_run ничего не меняется, а ответ
+        показывает, сколько локаций затронет запрос и какие из них заняты.
+
+        Локации поддерева берутся из индекса иерархии в памяти; пока
+        корня в нём нет - ищутся в БД по ltree.
+        """
+        nodes = location_index.subtree(location_id, data.level, data.include_root)
+        result = await self.repo.update_subtree(
+            location_id,
+            data.model_dump(exclude_unset=True),
+            dry_run,
+            [node.location_id for node in nodes] if nodes is not None else None,
+        )
+        if not result["matched"] and nodes is None:
+            # Пустой результат: нет такой локации или под фильтр level ничего не попало
+            if not await self.repo.get_by_id(location_id):
+                raise LocationNotFoundError(f"Локация с ID {location_id} не найдена")
+
+        response = LocationSubtreeUpdateResponse(
+            location_id=location_id, dry_run=dry_run, **dict(result)
+        )
+        if response.blocked_count and not dry_run:
+            raise LocationHasInventoryError(
+                f"Нельзя деактивировать поддерево: товар есть в {response.blocked_count} "
+                f"локациях ({', '.join(response.blocked_location_codes[:10])})"
+            )
+        return response
+
     async def find_available_location(
             self, product_id: str, quantity: int, zone_type: str = "storage"
     ) -> dict:
@@ -154,3 +562,107 @@ class LocationService:
                 f"(кол-во: {quantity}, зона: {zone_type})"
             )
         return dict(result)
+
+    async def _putaway_need(self, product_id: str, quantity: int) -> Tuple[Decimal, Decimal]:
+        """Вес и объём размещаемого количества товара"""
+        product = await self.repo.get_product_dimensions(product_id)
+        if not product:
+            raise ProductNotFoundError(f"Товар '{product_id}' не найден")
+        if product["weight"] is None or product["volume"] is None:
+            raise ProductDimensionsMissingError(
+                f"У товара '{product_id}' не заданы вес или объём"
+            )
+        return product["weight"] * quantity, product["volume"] * quantity
+
+    async def find_putaway_slots(
+            self, zone_type: str, product_id: str, quantity: int, limit: int
+    ) -> List[PutawaySlot]:
+        """
+        Получить свободные ячейки для размещения товара
+
+        Занятость читается из поддерживаемого триггерами индекса
+        wms.location_occupancy_current с учётом действующих удержаний.
+        """
+        weight, volume = await self._putaway_need(product_id, quantity)
+        slots = await self.repo.find_putaway_slots(zone_type, weight, volume, product_id, limit)
+        return [PutawaySlot.model_validate(dict(slot)) for slot in slots]
+
+    async def reserve_putaway_slot(
+            self, data: PutawayReservationCreate
+    ) -> PutawayReservationResponse:
+        """
+        Удержать лучшую свободную ячейку под размещение
+
+        Пока удержание действует, его вес и объём считаются занятыми,
+        и параллельные запросы получают другие ячейки.
+        """
+        weight, volume = await self._putaway_need(data.product_id, data.quantity)
+        hold = await self.repo.reserve_putaway_slot(
+            zone_type=data.zone_type.value,
+            product_id=data.product_id,
+            quantity=data.quantity,
+            weight=weight,
+            volume=volume,
+            ttl_seconds=data.ttl_seconds or settings.PUTAWAY_HOLD_TTL,
+        )
+        if not hold:
+            raise LocationNotFoundError(
+                f"Не найдена свободная ячейка для товара '{data.product_id}' "
+                f"(кол-во: {data.quantity}, зона: {data.zone_type.value})"
+            )
+        return PutawayReservationResponse.model_validate(dict(hold))
+
+    async def release_putaway_reservation(self, putaway_reservation_id: int) -> None:
+        """Снять удержание ячейки"""
+        if not await self.repo.release_putaway_reservation(putaway_reservation_id):
+            raise PutawayReservationNotFoundError(
+                f"Удержание ячейки с ID {putaway_reservation_id} не найдено"
+            )
+
+    async def plan_putaway(self, data: PutawayPlanRequest) -> PutawayPlanResponse:
+        """
+        Построить совместный план размещения поставки
+
+        Вместимость ячеек читается одним запросом, план строится в памяти
+        (plan_putaway). Запрос отдаёт не всю зону, а только ячейки, которые
+        может выбрать планировщик: ближайшие по объёму к строкам поставки,
+        самые просторные (с запасом в PUTAWAY_PLAN_SPARE_VOLUME объёмов
+        поставки) и уже занятые товарами поставки. Сам план ничего
+        не удерживает: для фиксации ячеек используются удержания под размещение.
+        """
+        product_ids = list(dict.fromkeys(line.product_id for line in data.lines))
+        dimensions = {
+            r["product_id"]: (r["weight"], r["volume"])
+            for r in await self.repo.get_products_dimensions(product_ids)
+        }
+        missing = [product_id for product_id in product_ids if product_id not in dimensions]
+        if missing:
+            raise ProductNotFoundError(f"Товары не найдены: {', '.join(missing[:10])}")
+        no_dimensions = [
+            product_id
+            for product_id, (weight, volume) in dimensions.items()
+            if weight is None or volume is None
+        ]
+        if no_dimensions:
+            raise ProductDimensionsMissingError(
+                f"У товаров не заданы вес или объём: {', '.join(no_dimensions[:10])}"
+            )
+
+        shipment = [(line.product_id, line.quantity) for line in data.lines]
+        line_volumes = [
+            float(dimensions[product_id][1] * quantity) for product_id, quantity in shipment
+        ]
+        cells = await self.repo.get_putaway_capacities(
+            data.zone_type.value,
+            product_ids,
+            line_volumes,
+            PUTAWAY_SCAN_LIMIT,
+            sum(line_volumes) * PUTAWAY_PLAN_SPARE_VOLUME,
+        )
+        lines = plan_putaway(cells, dimensions, shipment)
+        return PutawayPlanResponse(
+            zone_type=data.zone_type,
+            fully_planned=all(line.unplaced == 0 for line in lines),
+            lines=lines,
+        )
+
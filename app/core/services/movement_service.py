@@ -32,6 +32,8 @@ class MovementService:
 
         Валидирует бизнес-правила и создаёт движение.
         Триггер в БД автоматически обновит inventory.
+        Резервы (reserved_quantity) движение не ограничивают: отгрузка
+        по резерву идёт через ReservationService.fulfil_reservation.
         """
         # Валидация: должна быть указана хотя бы одна локация
         if not data.from_location_code and not data.to_location_code:
@@ -0,0 +1,269 @@
+"""Маршрут отбора по локациям: змейкой по проходам или по координатам"""
+
+import math
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.schemas.location import PickListLine
+from app.infrastructure.database.location_index import code_key
+
+# Соседей на точку для улучшения маршрута 2-opt
+_PICK_PATH_NEIGHBOURS = 8
+_CODE_NUMBERS = re.compile(r"(\d+)")
+
+
+class PickStop:
+    """
+    Остановка маршрута отбора
+
+    chain - (уровень, код) локаций от корня до самой остановки;
+    x, y - координаты её самой или ближайшего предка (None, если нет).
+    """
+
+    __slots__ = ("location_id", "location_code", "name", "chain", "x", "y", "lines")
+
+    def __init__(
+        self,
+        location_id: int,
+        location_code: str,
+        name: str,
+        chain: List[Tuple[int, str]],
+        x: Optional[float] = None,
+        y: Optional[float] = None,
+    ):
+        self.location_id = location_id
+        self.location_code = location_code
+        self.name = name
+        self.chain = chain
+        self.x = x
+        self.y = y
+        self.lines: List[PickListLine] = []
+
+    @property
+    def has_point(self) -> bool:
+        return self.x is not None and self.y is not None
+
+
+@lru_cache(maxsize=65536)
+def _natural_key(location_code: str) -> tuple:
+    """Ключ сортировки кода, где числа сравниваются по значению (S2 раньше S10)"""
+    parts = _CODE_NUMBERS.split(code_key(location_code))
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
+
+
+def serpentine_pick_path(
+    stops: Iterable[PickStop], aisle_level: Optional[int] = None
+) -> List[PickStop]:
+    """
+    Порядок обхода змейкой по проходам
+
+    Проход остановки - её предок уровня aisle_level (по умолчанию - на два
+    уровня выше: ячейка -> секция -> проход). Проходы идут по порядку
+    кодов, внутри прохода остановки упорядочены по кодам секций и ячеек;
+    каждый второй проход с остановками проходится в обратную сторону,
+    поэтому сборщик не возвращается к началу прохода. Пустые проходы
+    чётность не сдвигают.
+    """
+    keyed = []
+    for stop in stops:
+        if aisle_level is None:
+            split = max(len(stop.chain) - 2, 1)
+        else:
+            split = sum(1 for level, _ in stop.chain if level <= aisle_level)
+        aisle = tuple(_natural_key(code) for _, code in stop.chain[:split])
+        within = tuple(_natural_key(code) for _, code in stop.chain[split:])
+        keyed.append((aisle, within, stop))
+    keyed.sort(key=lambda entry: entry[:2])
+
+    route: List[PickStop] = []
+    forward = True
+    for _, group in groupby(keyed, key=itemgetter(0)):
+        aisle_stops = [stop for _, _, stop in group]
+        route.extend(aisle_stops if forward else reversed(aisle_stops))
+        forward = not forward
+    return route
+
+
+@lru_cache(maxsize=None)
+def _ring(r: int) -> Tuple[Tuple[int, int], ...]:
+    """Смещения клеток на расстоянии r по Чебышёву"""
+    if r == 0:
+        return ((0, 0),)
+    return tuple(
+        (dx, dy)
+        for dx in range(-r, r + 1)
+        for dy in range(-r, r + 1)
+        if max(abs(dx), abs(dy)) == r
+    )
+
+
+class _PointGrid:
+    """Равномерная сетка точек для поиска ближайших соседей"""
+
+    def __init__(self, points: List[Tuple[float, float]]):
+        self.points = points
+        self.count = len(points)
+        self.min_x = min(x for x, _ in points)
+        self.min_y = min(y for _, y in points)
+        self.max_x = max(x for x, _ in points)
+        self.max_y = max(y for _, y in points)
+        span = max(self.max_x - self.min_x, self.max_y - self.min_y)
+        # В среднем около двух точек на клетку
+        self.size = span / max(1, int(math.sqrt(self.count / 2))) or 1.0
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, point in enumerate(points):
+            self.cells.setdefault(self._cell(point), []).append(i)
+
+    def _cell(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        return (
+            math.floor((point[0] - self.min_x) / self.size),
+            math.floor((point[1] - self.min_y) / self.size),
+        )
+
+    def remove(self, i: int):
+        self.cells[self._cell(self.points[i])].remove(i)
+        self.count -= 1
+
+    def nearest(self, point: Tuple[float, float], k: int) -> List[Tuple[float, int]]:
+        """
+        k ближайших точек (расстояние, номер) по возрастанию расстояния
+
+        Точка вне сетки сначала проецируется на её границу (d0 - расстояние
+        до проекции), клетки просматриваются кольцами вокруг клетки
+        проекции. После кольца r все непросмотренные точки не ближе
+        hypot(d0, r * size), поэтому поиск останавливается, как только k-я
+        найденная ближе этой границы. Колец не больше, чем клеток по
+        стороне сетки, как бы далеко ни была точка.
+        """
+        k = min(k, self.count)
+        if k == 0:
+            return []
+        projection = (
+            min(max(point[0], self.min_x), self.max_x),
+            min(max(point[1], self.min_y), self.max_y),
+        )
+        d0 = math.dist(point, projection)
+        cx, cy = self._cell(projection)
+        points, cells, dist = self.points, self.cells, math.dist
+        found: List[Tuple[float, int]] = []
+        r = 0
+        while True:
+            for dx, dy in _ring(r):
+                for i in cells.get((cx + dx, cy + dy), ()):
+                    found.append((dist(point, points[i]), i))
+            if len(found) >= k:
+                found.sort()
+                if len(found) == self.count or found[k - 1][0] <= math.hypot(d0, r * self.size):
+                    return found[:k]
+            r += 1
+
+
+def distance_pick_path(
+    stops: List[PickStop], origin: Optional[Tuple[float, float]] = None
+) -> List[PickStop]:
+    """
+    Порядок обхода по координатам
+
+    Маршрут строится ближайшим соседом от origin (по умолчанию - от первой
+    остановки в переданном порядке) и улучшается 2-opt: разворот отрезка
+    маршрута, если это его укорачивает. Кандидаты на разворот - только
+    ближайшие соседи каждой точки (по сетке), поэтому 500 остановок
+    упорядочиваются за миллисекунды. Остановки с одинаковыми координатами
+    остаются в переданном порядке. Если переданный порядок (змейка)
+    короче найденного, возвращается он. У всех остановок должны быть
+    координаты.
+    """
+    if len(stops) < 3:
+        return list(stops)
+    points = [(stop.x, stop.y) for stop in stops]
+    start = len(points)
+    points.append(origin if origin is not None else points[0])
+
+    # Ближайший сосед; при равных расстояниях - меньший номер, то есть
+    # более ранняя остановка в переданном порядке
+    grid = _PointGrid(points[:start])
+    path = [start]
+    for _ in range(start):
+        _, i = grid.nearest(points[path[-1]], 1)[0]
+        grid.remove(i)
+        path.append(i)
+
+    grid = _PointGrid(points[:start])
+    neighbours = [
+        [(j, d) for d, j in grid.nearest(points[i], _PICK_PATH_NEIGHBOURS + 1) if j != i]
+        for i in range(start)
+    ]
+    _two_opt(path, points, neighbours)
+    route = [stops[i] for i in path[1:]]
+    if pick_path_length(route, origin) > pick_path_length(stops, origin):
+        return list(stops)
+    return route
+
+
+def _two_opt(
+    path: List[int], points: List[Tuple[float, float]], neighbours: List[List[Tuple[int, float]]]
+):
+    """
+    Улучшить незамкнутый маршрут 2-opt по спискам соседей (на месте)
+
+    Разворот path[s+1..e] заменяет рёбра (s, s+1) и (e, e+1) на (s, e) и
+    (s+1, e+1); path[0] (начало маршрута) не двигается. Для точки a
+    пробуются только соседи b ближе, чем текущее ребро a к следующей
+    или предыдущей точке: иначе разворот с новым ребром (a, b) маршрут
+    не укоротит. Точки, у которых поменялись рёбра, проверяются заново.
+    """
+    dist = math.dist
+    n = len(path)
+    position = [0] * len(points)
+    for p, i in enumerate(path):
+        position[i] = p
+    queue = deque(path[1:])
+    queued = set(queue)
+
+    while queue:
+        a = queue.popleft()
+        queued.discard(a)
+        i = position[a]
+        d_next = dist(points[a], points[path[i + 1]]) if i + 1 < n else 0.0
+        d_prev = dist(points[a], points[path[i - 1]])
+        touched = None
+        for b, d_ab in neighbours[a]:
+            if d_ab >= d_next and d_ab >= d_prev:
+                break
+            lo, hi = sorted((i, position[b]))
+            # Новое ребро (a, b) вместо ребра к следующей или к предыдущей точке
+            for s, e, gain in ((lo, hi, d_next), (lo - 1, hi - 1, d_prev)):
+                if d_ab >= gain or e - s < 2:
+                    continue
+                p, q, r = path[s], path[s + 1], path[e]
+                t = path[e + 1] if e + 1 < n else None
+                delta = dist(points[p], points[r]) - dist(points[p], points[q])
+                if t is not None:
+                    delta += dist(points[q], points[t]) - dist(points[r], points[t])
+                if delta < -1e-9:
+                    path[s + 1 : e + 1] = path[e:s:-1]
+                    for k in range(s + 1, e + 1):
+                        position[path[k]] = k
+                    touched = (p, q, r, t, a)
+                    break
+            if touched:
+                break
+        for j in touched or ():
+            if j is not None and position[j] > 0 and j not in queued:
+                queue.append(j)
+                queued.add(j)
+
+
+def pick_path_length(
+    stops: List[PickStop], origin: Optional[Tuple[float, float]] = None
+) -> Optional[float]:
+    """Длина маршрута по координатам (None, если у кого-то их нет)"""
+    if not all(stop.has_point for stop in stops):
+        return None
+    points = [(stop.x, stop.y) for stop in stops]
+    if origin is not None:
+        points.insert(0, origin)
+    return sum(math.dist(a, b) for a, b in zip(points, points[1:]))
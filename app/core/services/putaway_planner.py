@@ -0,0 +1,222 @@
+"""План размещения поставки по ячейкам (в памяти)"""
+
+from bisect import bisect_left, insort
+from decimal import Decimal
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from app.core.schemas.location import PutawayPlanLineResult, PutawayPlacement
+
+# Сколько свободных ячеек просматривать от найденной позиции
+PUTAWAY_SCAN_LIMIT = 64
+# Самые просторные ячейки для плана: суммарно во столько раз больше объёма поставки
+PUTAWAY_PLAN_SPARE_VOLUME = 2
+_UNLIMITED = float("inf")
+# Порядок записей свободных ячеек: свободный объём, код
+_FREE_CELL_ORDER = itemgetter(0, 1)
+
+
+class _PutawayCell:
+    """Ячейка в плане размещения; None в free_* - измерение не ограничено"""
+
+    __slots__ = ("location_id", "location_code", "free_weight", "free_volume", "version")
+
+    def __init__(self, row: Mapping):
+        self.location_id = row["location_id"]
+        self.location_code = row["location_code"]
+        self.free_weight = row["free_weight"]
+        self.free_volume = row["free_volume"]
+        self.version = 0
+
+    def entry(self) -> tuple:
+        """Запись для сортированного списка свободных ячеек (по свободному объёму)"""
+        free_volume = _UNLIMITED if self.free_volume is None else float(self.free_volume)
+        return free_volume, self.location_code, self.version, self
+
+    def fits(self, weight: Decimal, volume: Decimal) -> bool:
+        """Помещается ли груз целиком"""
+        return (self.free_weight is None or self.free_weight >= weight) and (
+            self.free_volume is None or self.free_volume >= volume
+        )
+
+    def units_fit(self, unit_weight: Decimal, unit_volume: Decimal) -> Optional[int]:
+        """Сколько единиц товара помещается (None - без ограничения)"""
+        limits = []
+        if self.free_weight is not None and unit_weight > 0:
+            limits.append(self.free_weight // unit_weight)
+        if self.free_volume is not None and unit_volume > 0:
+            limits.append(self.free_volume // unit_volume)
+        return max(int(min(limits)), 0) if limits else None
+
+    def take(self, quantity: int, unit_weight: Decimal, unit_volume: Decimal) -> bool:
+        """Занять место; возвращает False, если ячейка заполнилась"""
+        if self.free_weight is not None:
+            self.free_weight -= unit_weight * quantity
+        if self.free_volume is not None:
+            self.free_volume -= unit_volume * quantity
+        self.version += 1
+        return (self.free_weight is None or self.free_weight > 0) and (
+            self.free_volume is None or self.free_volume > 0
+        )
+
+
+class _FreeCells:
+    """
+    Свободные ячейки, упорядоченные по свободному объёму
+
+    Исходный список сортируется один раз. Ячейка, в которую что-то
+    положили, не переставляется в большом списке (вставка в середину
+    стоит O(n)), а добавляется новой записью в малый список изменённых;
+    старая запись распознаётся по version и пропускается.
+    """
+
+    def __init__(self, entries: List[tuple]):
+        # Запрос уже отдаёт ячейки по объёму, сортировка почти бесплатна
+        entries.sort()
+        self._lists = (entries, [])
+
+    def update(self, cell: _PutawayCell, has_space: bool):
+        if has_space:
+            insort(self._lists[1], cell.entry())
+
+    @staticmethod
+    def _valid(entries: List[tuple], start: int, step: int) -> Iterator[tuple]:
+        position = start
+        while 0 <= position < len(entries):
+            entry = entries[position]
+            if entry[2] == entry[3].version:
+                yield entry
+            position += step
+
+    def smallest_fitting(self, volume: Decimal) -> Iterator[_PutawayCell]:
+        """Ячейки по возрастанию свободного объёма, начиная с не меньшего volume"""
+        probe = (float(volume), "")
+        merged = merge(
+            *(self._valid(entries, bisect_left(entries, probe), 1) for entries in self._lists),
+            key=_FREE_CELL_ORDER,
+        )
+        return (entry[3] for entry in islice(merged, PUTAWAY_SCAN_LIMIT))
+
+    def largest(self) -> Iterator[_PutawayCell]:
+        """Ячейки по убыванию свободного объёма"""
+        for sorted_entries in self._lists:
+            # Самые просторные ячейки заполняются первыми - их устаревшие
+            # записи копятся в конце списка и снимаются за O(1)
+            while sorted_entries and sorted_entries[-1][2] != sorted_entries[-1][3].version:
+                sorted_entries.pop()
+        merged = merge(
+            *(self._valid(entries, len(entries) - 1, -1) for entries in self._lists),
+            key=_FREE_CELL_ORDER,
+            reverse=True,
+        )
+        return (entry[3] for entry in islice(merged, PUTAWAY_SCAN_LIMIT))
+
+
+def plan_putaway(
+    cells: Iterable[Mapping],
+    dimensions: Mapping[str, Tuple[Decimal, Decimal]],
+    lines: List[Tuple[str, int]],
+) -> List[PutawayPlanLineResult]:
+    """
+    Совместный план размещения строк поставки по ячейкам
+
+    Жадный алгоритм в памяти по уже прочитанной вместимости зоны.
+    Строки обрабатываются от самых объёмных к мелким; каждая сначала
+    докладывается в ячейки, где товар уже лежит (или куда его положила
+    предыдущая строка), затем в самую тесную ячейку, вмещающую весь
+    остаток. Если целиком не влезает никуда, заполняется самая
+    просторная ячейка и поиск повторяется. Результат - в порядке строк запроса.
+
+    Args:
+        cells: Ячейки зоны (GET_PUTAWAY_CAPACITIES)
+        dimensions: product_id -> (вес, объём) единицы
+        lines: Строки поставки (product_id, quantity)
+    """
+    entries = []
+    co_located: Dict[str, List[_PutawayCell]] = {}
+    for row in cells:
+        cell = _PutawayCell(row)
+        entries.append((row["volume_key"], cell.location_code, 0, cell))
+        for product_id in row["stocked_product_ids"]:
+            co_located.setdefault(product_id, []).append(cell)
+    free = _FreeCells(entries)
+
+    def best_fit(need: int, unit_weight: Decimal, unit_volume: Decimal):
+        """Самая тесная ячейка под весь остаток, иначе самая просторная"""
+        need_weight, need_volume = unit_weight * need, unit_volume * need
+        for cell in free.smallest_fitting(need_volume):
+            if cell.fits(need_weight, need_volume):
+                return cell, need
+        best, best_units = None, 0
+        for cell in free.largest():
+            if cell.fits(need_weight, need_volume):
+                return cell, need
+            # Объём дальше только убывает: больше единиц уже не поместится
+            if (
+                best_units
+                and cell.free_volume is not None
+                and unit_volume > 0
+                and cell.free_volume // unit_volume <= best_units
+            ):
+                break
+            fit = cell.units_fit(unit_weight, unit_volume)
+            if fit > best_units:
+                best, best_units = cell, fit
+        return best, best_units
+
+    order = sorted(
+        range(len(lines)),
+        key=lambda i: (
+            -dimensions[lines[i][0]][1] * lines[i][1],
+            -dimensions[lines[i][0]][0] * lines[i][1],
+        ),
+    )
+    results: List[Optional[PutawayPlanLineResult]] = [None] * len(lines)
+    for i in order:
+        product_id, quantity = lines[i]
+        unit_weight, unit_volume = dimensions[product_id]
+        need = quantity
+        placements = []
+        targets = co_located.setdefault(product_id, [])
+
+        # Ячейка, где товару не осталось места, для него уже не освободится
+        kept = []
+        for cell in targets:
+            if need > 0:
+                fit = cell.units_fit(unit_weight, unit_volume)
+                if fit == 0:
+                    continue
+                take = need if fit is None else min(fit, need)
+                free.update(cell, cell.take(take, unit_weight, unit_volume))
+                placements.append((cell, take, True))
+                need -= take
+            kept.append(cell)
+        targets[:] = kept
+
+        while need > 0:
+            cell, take = best_fit(need, unit_weight, unit_volume)
+            if cell is None:
+                break
+            free.update(cell, cell.take(take, unit_weight, unit_volume))
+            placements.append((cell, take, False))
+            if cell not in targets:
+                targets.append(cell)
+            need -= take
+
+        results[i] = PutawayPlanLineResult(
+            product_id=product_id,
+            requested=quantity,
+            planned=quantity - need,
+            unplaced=need,
+            placements=[
+                PutawayPlacement(
+                    location_id=cell.location_id,
+                    location_code=cell.location_code,
+                    quantity=take,
+                    co_located=is_co_located,
+                )
+                for cell, take, is_co_located in placements
+            ],
+        )
+    return results
@@ -0,0 +1,138 @@
+"""Сервис для резервирования остатков (бизнес-логика)"""
+
+from typing import Dict, List, Optional, Tuple
+from app.core.schemas.reservation import (
+    ReservationCreate,
+    ReservationFulfil,
+    ReservationResponse,
+    ReservationLineResponse,
+    ReservationExpireResponse,
+    AvailableToPromise,
+)
+from app.core.enums import ReservationStatus
+from app.infrastructure.database.repositories.reservation_repository import (
+    ReservationRepository,
+)
+from app.shared.config import settings
+from app.core.exceptions import (
+    ReservationNotFoundError,
+    ReservationNotActiveError,
+    InsufficientInventoryError,
+)
+
+
+class ReservationService:
+    """Сервис для резервирования остатков"""
+
+    def __init__(self, reservation_repository: ReservationRepository):
+        self.reservation_repo = reservation_repository
+
+    async def create_reservation(self, data: ReservationCreate) -> ReservationResponse:
+        """
+        Зарезервировать остатки
+
+        Резерв создаётся целиком или не создаётся вовсе. Одинаковые
+        позиции (товар + партия) объединяются, позиции обрабатываются
+        в порядке товара - параллельные резервы блокируют строки
+        в одном порядке и не взаимоблокируются.
+        """
+        quantities: Dict[Tuple[str, Optional[str]], int] = {}
+        for line in data.lines:
+            key = (line.product_id, line.batch_number)
+            quantities[key] = quantities.get(key, 0) + line.quantity
+
+        lines = [
+            (product_id, quantity, batch_number)
+            for (product_id, batch_number), quantity in sorted(
+                quantities.items(), key=lambda item: (item[0][0], item[0][1] or "")
+            )
+        ]
+        ttl_seconds = data.ttl_seconds or settings.RESERVATION_DEFAULT_TTL
+
+        reservation, reserved_lines, failed_product_id = await self.reservation_repo.create(
+            data.order_ref, ttl_seconds, lines
+        )
+        if not reservation:
+            raise InsufficientInventoryError(
+                f"Недостаточно доступного товара '{failed_product_id}' для резерва"
+            )
+
+        return ReservationResponse(
+            **dict(reservation),
+            lines=[ReservationLineResponse.model_validate(dict(r)) for r in reserved_lines],
+        )
+
+    async def get_reservation(self, reservation_id: int) -> ReservationResponse:
+        """Получить резерв со строками"""
+        reservation = await self.reservation_repo.get_by_id(reservation_id)
+        if not reservation:
+            raise ReservationNotFoundError(f"Резерв с ID {reservation_id} не найден")
+
+        lines = await self.reservation_repo.get_lines(reservation_id)
+        return ReservationResponse(
+            **dict(reservation),
+            lines=[ReservationLineResponse.model_validate(dict(r)) for r in lines],
+        )
+
+    async def release_reservation(self, reservation_id: int) -> ReservationResponse:
+        """
+        Снять резерв
+
+        Повторное снятие (или снятие истёкшего резерва) ничего не меняет
+        и возвращает резерв в текущем статусе.
+        """
+        released = await self.reservation_repo.release(reservation_id)
+        if not released:
+            return await self.get_reservation(reservation_id)
+
+        lines = await self.reservation_repo.get_lines(reservation_id)
+        return ReservationResponse(
+            **dict(released),
+            lines=[ReservationLineResponse.model_validate(dict(r)) for r in lines],
+        )
+
+    async def fulfil_reservation(
+        self, reservation_id: int, data: ReservationFulfil
+    ) -> ReservationResponse:
+        """
+        Отгрузить по резерву
+
+        Снимает резерв и пишет движение ship по каждой его строке в одной
+        транзакции. Повторный вызов для отгруженного резерва ничего
+        не меняет; снятый или истёкший резерв отгрузить нельзя.
+        """
+        fulfilled = await self.reservation_repo.fulfil(
+            reservation_id, data.user_name, data.reason
+        )
+        if not fulfilled:
+            reservation = await self.get_reservation(reservation_id)
+            if reservation.status != ReservationStatus.FULFILLED:
+                raise ReservationNotActiveError(
+                    f"Резерв {reservation_id} в статусе {reservation.status.value}"
+                )
+            return reservation
+
+        lines = await self.reservation_repo.get_lines(reservation_id)
+        return ReservationResponse(
+            **dict(fulfilled),
+            lines=[ReservationLineResponse.model_validate(dict(r)) for r in lines],
+        )
+
+    async def expire_reservations(self, limit: Optional[int] = None) -> ReservationExpireResponse:
+        """Снять истёкшие резервы"""
+        reservation_ids = await self.reservation_repo.expire(
+            limit or settings.RESERVATION_EXPIRE_BATCH
+        )
+        return ReservationExpireResponse(
+            expired_count=len(reservation_ids), reservation_ids=reservation_ids
+        )
+
+    async def get_available_to_promise(self, product_ids: List[str]) -> List[AvailableToPromise]:
+        """
+        Получить доступное к резервированию количество
+
+        Для товаров без остатков возвращаются нули.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        results = await self.reservation_repo.get_available_to_promise(product_ids)
+        return [AvailableToPromise.model_validate(dict(r)) for r in results]
@@ -9,8 +9,13 @@ from app.core.schemas.system import (
     CreateSnapshotResponse,
     RefreshViewsResponse,
     IntegrityCheckResult,
+    ContainerSnapshotDrift,
+    HotInventoryKeyCreate,
+    HotInventoryKey,
+    CompactCountersResponse,
 )
 from app.infrastructure.database.repositories.system_repository import SystemRepository
+from app.core.exceptions import LocationNotFoundError, HotInventoryKeyNotFoundError
 
 
 class SystemService:
@@ -29,6 +34,16 @@ class SystemService:
         results = await self.system_repo.validate_integrity()
         return [IntegrityCheckResult.model_validate(dict(r)) for r in results]
 
+    async def validate_container_snapshots(self) -> List[ContainerSnapshotDrift]:
+        """
+        Проверить снимки содержимого контейнеров
+
+        Сравнивает contents_snapshot каждого контейнера с активными строками
+        container_contents. Возвращает список расхождений (если есть).
+        """
+        results = await self.system_repo.validate_container_snapshots()
+        return [ContainerSnapshotDrift.model_validate(r) for r in results]
+
     async def recalculate_inventory(
         self, data: RecalculateInventoryRequest
     ) -> RecalculateInventoryResponse:
@@ -67,3 +82,40 @@ class SystemService:
         """
         result = await self.system_repo.refresh_materialized_views()
         return RefreshViewsResponse.model_validate(dict(result))
+
+    async def get_hot_inventory_keys(self) -> List[HotInventoryKey]:
+        """Получить товары в локациях, работающие в режиме счётчиков"""
+        results = await self.system_repo.get_hot_inventory_keys()
+        return [HotInventoryKey.model_validate(dict(r)) for r in results]
+
+    async def add_hot_inventory_key(self, data: HotInventoryKeyCreate) -> HotInventoryKey:
+        """
+        Включить режим счётчиков для товара в локации
+
+        Остаток раздаётся квотами по шардам при следующем переносе;
+        после этого движения товара из/в локацию перестают блокировать
+        строку inventory и накапливаются в шардах до переноса.
+        """
+        result = await self.system_repo.add_hot_inventory_key(
+            data.product_id, data.location_code
+        )
+        if not result:
+            raise LocationNotFoundError(f"Локация '{data.location_code}' не найдена")
+        return HotInventoryKey.model_validate(dict(result))
+
+    async def remove_hot_inventory_key(self, product_id: str, location_code: str) -> None:
+        """Выключить режим счётчиков для товара в локации"""
+        removed = await self.system_repo.remove_hot_inventory_key(product_id, location_code)
+        if not removed:
+            raise HotInventoryKeyNotFoundError(
+                f"Товар '{product_id}' в локации '{location_code}' не в режиме счётчиков"
+            )
+
+    async def compact_inventory_counters(self) -> CompactCountersResponse:
+        """
+        Перенести накопленные delta горячих счётчиков в inventory
+
+        Обычно выполняется фоновой задачей (HOT_COUNTER_COMPACT_INTERVAL).
+        """
+        result = await self.system_repo.compact_inventory_counters()
+        return CompactCountersResponse.model_validate(result)
@@ -0,0 +1,130 @@
+"""Рассылка изменений остатков подписчикам ленты"""
+
+import asyncio
+import logging
+from typing import Optional, Set, Tuple
+
+from asyncpg import Pool, Record
+from app.shared.config import settings
+from app.infrastructure.database.listener import DatabaseListener
+from app.infrastructure.database.repositories.inventory_repository import InventoryRepository
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "wms_inventory_changes"
+
+# Размер пачки изменений за один запрос к БД
+FETCH_LIMIT = 1000
+
+# Очередь подписчика; при переполнении подписчик дочитывает пропущенное из БД
+SUBSCRIBER_QUEUE_SIZE = 10000
+
+# Сигнал подписчику: очередь была переполнена, нужно дочитать из БД
+RESYNC = object()
+
+ChangeToken = Tuple[int, int]
+
+
+def change_token(record: Record) -> ChangeToken:
+    """Позиция изменения в ленте: (txid, change_id)"""
+    return int(record["txid"]), record["change_id"]
+
+
+def format_change_token(token: ChangeToken) -> str:
+    """Токен продолжения для клиента: "txid:change_id" """
+    return f"{token[0]}:{token[1]}"
+
+
+def parse_change_token(value: str) -> Optional[ChangeToken]:
+    """Разобрать токен продолжения (None - некорректный токен)"""
+    txid, sep, change_id = value.partition(":")
+    if not sep or not txid.isdigit() or not change_id.isdigit():
+        return None
+    return int(txid), int(change_id)
+
+
+class InventoryChangeFeed:
+    """
+    Единый читатель wms.inventory_changes для всех подписчиков процесса
+
+    Просыпается по NOTIFY (или раз в CHANGE_FEED_POLL_INTERVAL), читает
+    новые завершённые изменения одним запросом и раскладывает их по очередям
+    подписчиков. Фильтрация по товару/локации - на стороне подписчика.
+    """
+
+    def __init__(self):
+        self._repo: Optional[InventoryRepository] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._position: ChangeToken = (0, 0)
+
+    async def start(self, pool: Pool, listener: DatabaseListener):
+        """Запустить рассылку с текущей позиции ленты"""
+        self._repo = InventoryRepository(pool)
+        self._position = await self._repo.get_changes_head()
+        await listener.add_listener(CHANNEL, lambda payload: self._wakeup.set())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить рассылку"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Подписаться на изменения (очередь записей wms.inventory_changes)"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Отписаться от изменений"""
+        self._subscribers.discard(queue)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=settings.CHANGE_FEED_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                if self._subscribers:
+                    await self._poll()
+                else:
+                    # Без подписчиков только сдвигаем позицию, ничего не читая
+                    self._position = await self._repo.get_changes_head()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка чтения ленты изменений остатков")
+
+    async def _poll(self):
+        while True:
+            changes = await self._repo.get_changes_after(self._position, FETCH_LIMIT)
+            for change in changes:
+                self._position = change_token(change)
+                for queue in list(self._subscribers):
+                    self._publish(queue, change)
+            if len(changes) < FETCH_LIMIT:
+                return
+
+    def _publish(self, queue: asyncio.Queue, change: Record):
+        try:
+            queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Подписчик не успевает: очищаем очередь, он дочитает из БД сам
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+
+inventory_change_feed = InventoryChangeFeed()
@@ -0,0 +1,55 @@
+"""Фоновое удаление старых изменений из ленты остатков"""
+
+import logging
+from typing import Optional
+
+from asyncpg import Pool
+from app.shared.config import settings
+from app.shared.utils.periodic import PeriodicTask
+from app.infrastructure.database.repositories.system_repository import SystemRepository
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryChangePruning:
+    """
+    Периодически удаляет изменения старше CHANGE_FEED_RETENTION
+
+    Раз в CHANGE_FEED_PRUNE_INTERVAL вызывает wms.prune_inventory_changes()
+    пачками по CHANGE_FEED_PRUNE_BATCH, пока есть что удалять. Клиенты
+    с токеном раньше удалённых изменений получают сигнал пересинхронизации.
+    """
+
+    def __init__(self):
+        self._repo: Optional[SystemRepository] = None
+        self._task: Optional[PeriodicTask] = None
+
+    def start(self, pool: Pool):
+        """Запустить фоновую задачу (если интервал задан)"""
+        self._repo = SystemRepository(pool)
+        self._task = PeriodicTask(
+            settings.CHANGE_FEED_PRUNE_INTERVAL,
+            self._prune,
+            "Ошибка удаления старых изменений остатков",
+        )
+        self._task.start()
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task:
+            await self._task.stop()
+            self._task = None
+
+    async def _prune(self):
+        """Удалить старые изменения пачками, пока есть что удалять"""
+        while True:
+            deleted = await self._repo.prune_inventory_changes(
+                settings.CHANGE_FEED_RETENTION, settings.CHANGE_FEED_PRUNE_BATCH
+            )
+            if deleted:
+                logger.info(f"Удалено старых изменений остатков: {deleted}")
+            if deleted < settings.CHANGE_FEED_PRUNE_BATCH:
+                return
+
+
+inventory_change_pruning = InventoryChangePruning()
@@ -0,0 +1,47 @@
+"""Фоновый перенос счётчиков горячих товаров в inventory"""
+
+from typing import Optional
+
+from asyncpg import Pool
+from app.shared.config import settings
+from app.shared.utils.periodic import PeriodicTask
+from app.infrastructure.database.repositories.system_repository import SystemRepository
+
+
+class InventoryCounterCompaction:
+    """
+    Периодически переносит delta из wms.inventory_counter_shards в inventory
+
+    Раз в HOT_COUNTER_COMPACT_INTERVAL переносит ключи по одному, каждый
+    в своей транзакции, и заново раздаёт квоты. Проход берёт advisory-
+    блокировку, поэтому несколько экземпляров сервиса выполняют перенос
+    по очереди. Ключ, перенос которого не удался, помечается stuck
+    и не мешает остальным.
+    """
+
+    def __init__(self):
+        self._repo: Optional[SystemRepository] = None
+        self._task: Optional[PeriodicTask] = None
+
+    def start(self, pool: Pool):
+        """Запустить фоновую задачу (если интервал задан)"""
+        self._repo = SystemRepository(pool)
+        self._task = PeriodicTask(
+            settings.HOT_COUNTER_COMPACT_INTERVAL,
+            self._compact,
+            "Ошибка переноса счётчиков горячих товаров",
+        )
+        self._task.start()
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task:
+            await self._task.stop()
+            self._task = None
+
+    async def _compact(self):
+        """Перенести счётчики всех горячих ключей"""
+        await self._repo.compact_inventory_counters()
+
+
+inventory_counter_compaction = InventoryCounterCompaction()
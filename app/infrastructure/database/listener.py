@@ -0,0 +1,102 @@
+"""Подписка на уведомления PostgreSQL (LISTEN/NOTIFY)"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from app.shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторным подключением после обрыва соединения (секунды)
+RECONNECT_DELAY = 5.0
+
+NotificationCallback = Callable[[str], None]
+
+
+class DatabaseListener:
+    """
+    Выделенное соединение для LISTEN
+
+    Соединение не берётся из pool: LISTEN живёт всё время работы сервиса.
+    После обрыва соединение восстанавливается, и каждый обработчик
+    вызывается с пустым payload, чтобы подписчики перечитали состояние.
+    """
+
+    def __init__(self):
+        self._conn: Optional[asyncpg.Connection] = None
+        self._callbacks: Dict[str, List[NotificationCallback]] = {}
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = True
+
+    async def start(self):
+        """Подключиться и подписаться на все зарегистрированные каналы"""
+        self._stopped = False
+        await self._connect()
+
+    async def stop(self):
+        """Закрыть соединение"""
+        self._stopped = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def add_listener(self, channel: str, callback: NotificationCallback):
+        """
+        Подписать обработчик на канал
+
+        Обработчик вызывается синхронно в event loop и должен быть быстрым
+        (например, взвести asyncio.Event).
+        """
+        is_new_channel = channel not in self._callbacks
+        self._callbacks.setdefault(channel, []).append(callback)
+        if is_new_channel and self._conn and not self._conn.is_closed():
+            await self._conn.add_listener(channel, self._dispatch)
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str):
+        """Передать уведомление обработчикам канала"""
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception(f"Ошибка обработчика уведомления '{channel}'")
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            database=settings.DB_NAME,
+        )
+        self._conn.add_termination_listener(self._on_termination)
+        for channel in self._callbacks:
+            await self._conn.add_listener(channel, self._dispatch)
+
+    def _on_termination(self, connection):
+        if self._stopped:
+            return
+        logger.warning("Соединение LISTEN потеряно, переподключение...")
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._stopped:
+            await asyncio.sleep(RECONNECT_DELAY)
+            try:
+                await self._connect()
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning(f"Не удалось переподключить LISTEN: {exc}")
+                continue
+
+            logger.info("Соединение LISTEN восстановлено")
+            # Уведомления за время обрыва потеряны - просим подписчиков перечитать
+            for channel in self._callbacks:
+                self._dispatch(self._conn, 0, channel, "")
+            return
+
+
+db_listener = DatabaseListener()
@@ -0,0 +1,325 @@
+"""In-process индекс иерархии локаций"""
+
+import asyncio
+import logging
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from asyncpg import Pool
+from app.infrastructure.database.listener import DatabaseListener
+from app.infrastructure.database.repositories.location_repository import LocationRepository
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "wms_locations_changed"
+
+# Пауза перед повтором неудачной перезагрузки (удваивается до максимума), секунды
+RELOAD_RETRY_MIN_DELAY = 1.0
+RELOAD_RETRY_MAX_DELAY = 60.0
+
+
+def path_key(path: str) -> Tuple[str, ...]:
+    """Ключ сортировки, совпадающий с порядком ltree (по меткам слева направо)"""
+    return tuple(path.split("."))
+
+
+def code_key(location_code: str) -> str:
+    """
+    Ключ сравнения кодов локаций без учёта регистра
+
+    NFC до и после casefold: код, набранный на терминале составными
+    символами (Й как И + бреве), совпадает с кодом из БД, а
+    "хранение" и "ХРАНЕНИЕ" дают один ключ.
+    """
+    return unicodedata.normalize("NFC", unicodedata.normalize("NFC", location_code).casefold())
+
+
+class IndexedLocation:
+    """
+    Локация в индексе
+
+    tin/tout - интервальная метка: позиция в обходе дерева в глубину
+    и позиция, где заканчивается поддерево. Y лежит в поддереве X,
+    если X.tin <= Y.tin < X.tout. x, y - координаты из metadata
+    (None, если не заданы числами).
+    """
+
+    __slots__ = (
+        "location_id",
+        "parent_location_id",
+        "location_code",
+        "name",
+        "zone_type",
+        "level",
+        "path",
+        "is_active",
+        "x",
+        "y",
+        "depth",
+        "tin",
+        "tout",
+    )
+
+    def __init__(self, row: Mapping, depth: int, tin: int):
+        self.location_id: int = row["location_id"]
+        self.parent_location_id: Optional[int] = row["parent_location_id"]
+        self.location_code: str = row["location_code"]
+        self.name: str = row["name"]
+        self.zone_type: str = row["zone_type"]
+        self.level: int = row["level"]
+        self.path: str = row["path"]
+        self.is_active: bool = row["is_active"]
+        self.x: Optional[float] = row["x"]
+        self.y: Optional[float] = row["y"]
+        self.depth = depth
+        self.tin = tin
+        self.tout = tin + 1
+
+
+class LocationIndex:
+    """
+    Индекс иерархии локаций в памяти процесса
+
+    Отвечает на вопросы "лежит ли X в поддереве Y", "предок уровня N",
+    "потомки", "глубина" без обращения к БД: проверка поддерева - O(1)
+    по интервальным меткам, цепочка предков - O(глубины). Коды локаций
+    дополнительно хранятся отсортированными для поиска по префиксу.
+
+    Загружается при старте и перестраивается целиком по NOTIFY
+    wms_locations_changed (локации меняются редко); неудачная
+    перезагрузка повторяется с нарастающей паузой. После переподключения
+    LISTEN слушатель вызывает обработчик с пустым payload, и индекс
+    перечитывается: уведомления за время обрыва не теряются. Версия
+    в БД на каждом запросе не сверяется - индекс отстаёт от БД только
+    на время доставки NOTIFY. Пока индекс не загружен, loaded = False
+    и вызывающий код идёт в БД.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[int, IndexedLocation] = {}
+        self._by_code: Dict[str, IndexedLocation] = {}
+        self._order: List[IndexedLocation] = []
+        self._code_keys: List[str] = []
+        self._code_nodes: List[IndexedLocation] = []
+        self._active_code_keys: List[str] = []
+        self._active_code_nodes: List[IndexedLocation] = []
+        self.version: Optional[int] = None
+        self._repo: Optional[LocationRepository] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reload_pending = False
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    # === Загрузка ===
+
+    async def start(self, pool: Pool, listener: DatabaseListener):
+        """Загрузить индекс и подписаться на изменения локаций"""
+        self._repo = LocationRepository(pool)
+        await listener.add_listener(CHANNEL, lambda payload: self._schedule_reload())
+        await self.reload()
+
+    async def stop(self):
+        """Остановить перезагрузку индекса"""
+        if self._reload_task:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    async def reload(self):
+        """Перечитать локации из БД и перестроить индекс"""
+        version, rows = await self._repo.get_index_rows()
+        self.build(rows, version)
+        logger.info(f"Индекс локаций загружен: {len(self._nodes)} локаций, версия {version}")
+
+    def build(self, rows: Iterable[Mapping], version: int):
+        """
+        Построить индекс из строк, упорядоченных по path
+
+        Порядок по path - это обход в глубину, поэтому tin - просто номер
+        строки, а tout считается одним обратным проходом по размерам поддеревьев.
+        """
+        nodes: Dict[int, IndexedLocation] = {}
+        order: List[IndexedLocation] = []
+        for row in rows:
+            parent = nodes.get(row["parent_location_id"])
+            node = IndexedLocation(row, parent.depth + 1 if parent else 0, len(order))
+            nodes[node.location_id] = node
+            order.append(node)
+
+        for node in reversed(order):
+            parent = nodes.get(node.parent_location_id)
+            if parent and node.tout > parent.tout:
+                parent.tout = node.tout
+
+        # Коды, отсортированные по code_key, для поиска по префиксу
+        # (tin уникален, поэтому кортежи не доходят до сравнения узлов)
+        by_key = sorted(
+            (code_key(node.location_code), node.location_code, node.tin) for node in order
+        )
+        # Отдельный список активных: иначе автодополнение проходило бы
+        # по всем неактивным кодам с тем же префиксом
+        active = [entry for entry in by_key if order[entry[2]].is_active]
+
+        # Атомарная замена: читатели видят либо старый, либо новый индекс
+        self._nodes, self._order = nodes, order
+        self._by_code = {node.location_code: node for node in order}
+        self._code_keys = [key for key, _, _ in by_key]
+        self._code_nodes = [order[tin] for _, _, tin in by_key]
+        self._active_code_keys = [key for key, _, _ in active]
+        self._active_code_nodes = [order[tin] for _, _, tin in active]
+        self.version = version
+
+    def _schedule_reload(self):
+        if self._reload_task and not self._reload_task.done():
+            # Перезагрузка уже идёт - повторим после неё
+            self._reload_pending = True
+            return
+        self._reload_task = asyncio.get_running_loop().create_task(self._reload_loop())
+
+    async def _reload_loop(self):
+        delay = RELOAD_RETRY_MIN_DELAY
+        while True:
+            self._reload_pending = False
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    f"Ошибка перезагрузки индекса локаций, повтор через {delay:g} с"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RELOAD_RETRY_MAX_DELAY)
+                continue
+            delay = RELOAD_RETRY_MIN_DELAY
+            if not self._reload_pending:
+                return
+
+    # === Запросы ===
+
+    def get(self, location_id: int) -> Optional[IndexedLocation]:
+        """Локация по ID"""
+        return self._nodes.get(location_id)
+
+    def get_by_code(self, location_code: str) -> Optional[IndexedLocation]:
+        """Локация по коду"""
+        return self._by_code.get(location_code)
+
+    def autocomplete(
+        self, prefix: str, limit: int, include_inactive: bool = False
+    ) -> List[IndexedLocation]:
+        """
+        Первые limit локаций, код которых начинается с prefix
+
+        Без учёта регистра (code_key), в порядке кодов: бинарный поиск
+        начала диапазона в отсортированном списке, затем проход до
+        первого несовпадения - O(log n + limit).
+        """
+        key = code_key(prefix)
+        if include_inactive:
+            keys, nodes = self._code_keys, self._code_nodes
+        else:
+            keys, nodes = self._active_code_keys, self._active_code_nodes
+        matches = []
+        for position in range(bisect_left(keys, key), len(keys)):
+            if not keys[position].startswith(key) or len(matches) == limit:
+                break
+            matches.append(nodes[position])
+        return matches
+
+    def is_in_subtree(self, location_id: int, root_id: int) -> bool:
+        """Лежит ли локация в поддереве root (включая сам root) - O(1)"""
+        node = self._nodes.get(location_id)
+        root = self._nodes.get(root_id)
+        if node is None or root is None:
+            return False
+        return root.tin <= node.tin < root.tout
+
+    def depth(self, location_id: int) -> Optional[int]:
+        """Глубина от корня (корень - 0)"""
+        node = self._nodes.get(location_id)
+        return node.depth if node else None
+
+    def ancestors(self, location_id: int) -> List[IndexedLocation]:
+        """Цепочка от корня до самой локации (хлебные крошки)"""
+        chain = []
+        node = self._nodes.get(location_id)
+        while node is not None:
+            chain.append(node)
+            node = self._nodes.get(node.parent_location_id)
+        chain.reverse()
+        return chain
+
+    def ancestor_at_level(self, location_id: int, level: int) -> Optional[IndexedLocation]:
+        """Предок (или сама локация) указанного уровня, например зона ячейки"""
+        node = self._nodes.get(location_id)
+        while node is not None and node.level > level:
+            node = self._nodes.get(node.parent_location_id)
+        if node is not None and node.level == level:
+            return node
+        return None
+
+    def subtree(
+        self, location_id: int, level: Optional[int] = None, include_root: bool = True
+    ) -> Optional[List[IndexedLocation]]:
+        """
+        Локации поддерева в порядке path (None - локации нет в индексе)
+
+        level - только локации этого уровня: глубже него поддеревья
+        не обходятся. include_root - включая саму локацию.
+        """
+        root = self._nodes.get(location_id)
+        if root is None:
+            return None
+        max_depth = None
+        if level is not None:
+            if level < root.level:
+                return []
+            max_depth = level - root.level
+        nodes = [root] if include_root else []
+        nodes.extend(self.iter_descendants(location_id, max_depth))
+        if level is not None:
+            nodes = [node for node in nodes if node.level == level]
+        return nodes
+
+    def iter_descendants(
+        self, location_id: int, max_depth: Optional[int] = None, after: Optional[str] = None
+    ) -> Iterator[IndexedLocation]:
+        """
+        Потомки в порядке path, не глубже max_depth от локации
+
+        after - path последней уже выданной локации (курсор): выдача
+        продолжается со следующей. Поддеревья глубже max_depth
+        перепрыгиваются целиком по tout, поэтому стоимость - O(log n + выдача).
+        """
+        root = self._nodes.get(location_id)
+        if root is None:
+            return
+        order = self._order
+        position, end = root.tin + 1, root.tout
+        if after is not None:
+            position = max(
+                position,
+                bisect_right(order, path_key(after), position, end, key=lambda n: path_key(n.path)),
+            )
+        while position < end:
+            node = order[position]
+            depth = node.depth - root.depth
+            if max_depth is not None and depth > max_depth:
+                # Курсор указал внутрь слишком глубокого поддерева - выходим из него
+                position = self._nodes[node.parent_location_id].tout
+                continue
+            yield node
+            if max_depth is not None and depth == max_depth:
+                position = node.tout
+            else:
+                position += 1
+
+
+location_index = LocationIndex()
@@ -0,0 +1,54 @@
+"""Фоновая свёртка журнала занятости ячеек"""
+
+import logging
+from typing import Optional
+
+from asyncpg import Pool
+from app.shared.config import settings
+from app.shared.utils.periodic import PeriodicTask
+from app.infrastructure.database.repositories.location_repository import LocationRepository
+
+logger = logging.getLogger(__name__)
+
+
+class LocationOccupancyFold:
+    """
+    Периодически сворачивает wms.location_occupancy_deltas в location_occupancy
+
+    Триггеры остатков только дописывают delta в журнал. Раз в
+    OCCUPANCY_FOLD_INTERVAL журнал сворачивается пачками по
+    OCCUPANCY_FOLD_BATCH, пока есть что сворачивать, чтобы чтение
+    занятости (location_occupancy_current) суммировало мало delta.
+    """
+
+    def __init__(self):
+        self._repo: Optional[LocationRepository] = None
+        self._task: Optional[PeriodicTask] = None
+
+    def start(self, pool: Pool):
+        """Запустить фоновую задачу (если интервал задан)"""
+        self._repo = LocationRepository(pool)
+        self._task = PeriodicTask(
+            settings.OCCUPANCY_FOLD_INTERVAL,
+            self._fold,
+            "Ошибка свёртки журнала занятости ячеек",
+        )
+        self._task.start()
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task:
+            await self._task.stop()
+            self._task = None
+
+    async def _fold(self):
+        """Свернуть журнал пачками, пока есть что сворачивать"""
+        while True:
+            folded = await self._repo.fold_location_occupancy(settings.OCCUPANCY_FOLD_BATCH)
+            if folded:
+                logger.debug(f"Свёрнуто delta занятости ячеек: {folded}")
+            if folded < settings.OCCUPANCY_FOLD_BATCH:
+                return
+
+
+location_occupancy_fold = LocationOccupancyFold()
@@ -0,0 +1,55 @@
+"""Фоновое удаление истёкших удержаний ячеек под размещение"""
+
+import logging
+from typing import Optional
+
+from asyncpg import Pool
+from app.shared.config import settings
+from app.shared.utils.periodic import PeriodicTask
+from app.infrastructure.database.repositories.location_repository import LocationRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PutawayHoldPurge:
+    """
+    Периодически удаляет истёкшие удержания ячеек
+
+    Истёкшие удержания уже не учитываются в занятости, но копились бы
+    в wms.putaway_reservations. Раз в PUTAWAY_HOLD_PURGE_INTERVAL удаляет
+    их пачками по PUTAWAY_HOLD_PURGE_BATCH, пока есть что удалять.
+    """
+
+    def __init__(self):
+        self._repo: Optional[LocationRepository] = None
+        self._task: Optional[PeriodicTask] = None
+
+    def start(self, pool: Pool):
+        """Запустить фоновую задачу (если интервал задан)"""
+        self._repo = LocationRepository(pool)
+        self._task = PeriodicTask(
+            settings.PUTAWAY_HOLD_PURGE_INTERVAL,
+            self._purge,
+            "Ошибка удаления истёкших удержаний ячеек",
+        )
+        self._task.start()
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task:
+            await self._task.stop()
+            self._task = None
+
+    async def _purge(self):
+        """Удалить истёкшие удержания пачками, пока есть что удалять"""
+        while True:
+            deleted = await self._repo.purge_expired_putaway_reservations(
+                settings.PUTAWAY_HOLD_PURGE_BATCH
+            )
+            if deleted:
+                logger.info(f"Удалено истёкших удержаний ячеек: {deleted}")
+            if deleted < settings.PUTAWAY_HOLD_PURGE_BATCH:
+                return
+
+
+putaway_hold_purge = PutawayHoldPurge()
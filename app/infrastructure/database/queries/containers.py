@@ -8,6 +8,8 @@ SELECT * FROM wms.register_container($1, $2, $3, $4);
 
 # === READ ===
 
+# Содержимое берётся из денормализованного снимка contents_snapshot,
+# который поддерживают триггеры на wms.container_contents
 GET_CONTAINER_BY_QR = """
 SELECT
     c.container_id,
@@ -21,24 +23,31 @@ SELECT
     c.metadata,
     c.created_at,
     c.updated_at,
-    json_agg(
-        json_build_object(
-            'product_id', cc.product_id,
-            'product_name', p.name,
-            'quantity', cc.quantity,
-            'batch_number', cc.batch_number,
-            'is_scanned', cc.is_scanned
-        ) ORDER BY cc.product_id
-    ) FILTER (WHERE cc.status = 'active') as contents
+    c.contents_snapshot as contents
 FROM wms.containers c
 LEFT JOIN wms.locations l ON c.location_id = l.location_id
 LEFT JOIN wms.containers pc ON c.parent_container_id = pc.container_id
-LEFT JOIN wms.container_contents cc ON c.container_id = cc.container_id
-LEFT JOIN public.products p ON cc.product_id = p.id
-WHERE c.qr_code = $1
-GROUP BY c.container_id, c.qr_code, c.container_type, c.status,
-         l.location_code, l.zone_type, c.parent_container_id,
-         pc.qr_code, c.metadata, c.created_at, c.updated_at;
+WHERE c.qr_code = $1;
+"""
+
+GET_CONTAINERS_BY_QR_CODES = """
+SELECT
+    c.container_id,
+    c.qr_code,
+    c.container_type,
+    c.status,
+    l.location_code,
+    l.zone_type,
+    c.parent_container_id,
+    pc.qr_code as parent_qr_code,
+    c.metadata,
+    c.created_at,
+    c.updated_at,
+    c.contents_snapshot as contents
+FROM wms.containers c
+LEFT JOIN wms.locations l ON c.location_id = l.location_id
+LEFT JOIN wms.containers pc ON c.parent_container_id = pc.container_id
+WHERE c.qr_code = ANY($1::varchar[]);
 """
 
 GET_CONTAINER_BY_ID = """
@@ -91,6 +100,48 @@ WHERE container_id = $1
 RETURNING container_id, qr_code, status, updated_at;
 """
 
+# === BULK UPDATE STATUS ===
+
+# Выбор контейнеров по списку ID и/или фильтрам (поддерево локации по LTREE,
+# партия в активном содержимом, тип) и смена статуса одним запросом.
+# Заблокированные контейнеры не меняются и возвращаются с updated = false.
+BULK_UPDATE_CONTAINER_STATUS = """
+WITH targets AS (
+    SELECT c.container_id, c.qr_code, c.status
+    FROM wms.containers c
+    LEFT JOIN wms.locations l ON c.location_id = l.location_id
+    WHERE ($2::int[] IS NULL OR c.container_id = ANY($2::int[]))
+      AND ($3::int IS NULL OR l.path <@ (
+          SELECT path FROM wms.locations WHERE location_id = $3
+      ))
+      AND ($4::varchar IS NULL OR EXISTS (
+          SELECT 1
+          FROM wms.container_contents cc
+          WHERE cc.container_id = c.container_id
+            AND cc.batch_number = $4
+            AND cc.status = 'active'
+      ))
+      AND ($5::varchar IS NULL OR c.container_type = $5)
+    FOR UPDATE OF c
+),
+updated AS (
+    UPDATE wms.containers c
+    SET status = $1,
+        updated_at = NOW()
+    FROM targets t
+    WHERE c.container_id = t.container_id
+      AND t.status != 'blocked'
+    RETURNING c.container_id
+)
+SELECT
+    t.container_id,
+    t.qr_code,
+    (u.container_id IS NOT NULL) as updated
+FROM targets t
+LEFT JOIN updated u ON t.container_id = u.container_id
+ORDER BY t.container_id;
+"""
+
 # === HISTORY ===
 
 GET_CONTAINER_HISTORY = """
@@ -134,6 +185,40 @@ GROUP BY c.container_id, c.qr_code, c.container_type, c.status, c.created_at
 ORDER BY c.created_at DESC;
 """
 
+# === CONTAINERS IN LOCATION SUBTREE ===
+
+# Все контейнеры в поддереве локации (LTREE path <@) с keyset-пагинацией
+# по container_id. LIMIT NULL - без ограничения (для потоковой выдачи).
+GET_CONTAINERS_IN_LOCATION_SUBTREE = """
+SELECT
+    c.container_id,
+    c.qr_code,
+    c.container_type,
+    c.status,
+    l.location_id,
+    l.location_code,
+    COALESCE(cc.products_count, 0) as products_count,
+    COALESCE(cc.total_units, 0) as total_units,
+    c.created_at
+FROM wms.locations root
+JOIN wms.locations l ON l.path <@ root.path
+JOIN wms.containers c ON c.location_id = l.location_id
+LEFT JOIN LATERAL (
+    SELECT
+        COUNT(DISTINCT product_id) as products_count,
+        SUM(quantity) as total_units
+    FROM wms.container_contents
+    WHERE container_id = c.container_id
+      AND status = 'active'
+) cc ON TRUE
+WHERE root.location_id = $1
+  AND ($2::varchar IS NULL OR c.status = $2)
+  AND ($3::varchar IS NULL OR c.container_type = $3)
+  AND ($4::int IS NULL OR c.container_id > $4)
+ORDER BY c.container_id
+LIMIT $5;
+"""
+
 # === CHECK EXISTS ===
 
 CHECK_CONTAINER_EXISTS = """
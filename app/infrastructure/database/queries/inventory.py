@@ -9,7 +9,7 @@ SELECT
     p.name as product_name,
     l.location_code,
     l.zone_type,
-    i.quantity,
+    i.quantity + COALESCE(pending.delta, 0) as quantity,
     i.status,
     i.batch_number,
     i.container_code,
@@ -17,11 +17,53 @@ SELECT
 FROM wms.inventory i
 JOIN public.products p ON i.product_id = p.id
 JOIN wms.locations l ON i.location_id = l.location_id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
 WHERE i.product_id = $1
-  AND i.quantity > 0
+  AND i.quantity + COALESCE(pending.delta, 0) > 0
 ORDER BY l.zone_type, l.location_code, i.container_code NULLS LAST;
 """
 
+# === Остатки списка товаров (пакетно) ===
+
+GET_INVENTORY_BY_PRODUCTS = """
+SELECT
+    i.inventory_id,
+    i.product_id,
+    p.name as product_name,
+    l.location_code,
+    l.zone_type,
+    i.quantity + COALESCE(pending.delta, 0) as quantity,
+    i.status,
+    i.batch_number,
+    i.container_code,
+    i.updated_at
+FROM wms.inventory i
+JOIN public.products p ON i.product_id = p.id
+JOIN wms.locations l ON i.location_id = l.location_id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
+WHERE i.product_id = ANY($1::varchar[])
+  AND i.quantity + COALESCE(pending.delta, 0) > 0
+ORDER BY i.product_id, l.zone_type, l.location_code, i.container_code NULLS LAST;
+"""
+
 # === Остатки в локации ===
 
 GET_INVENTORY_BY_LOCATION = """
@@ -30,20 +72,176 @@ SELECT
     i.product_id,
     p.name as product_name,
     p.category,
-    i.quantity,
+    i.quantity + COALESCE(pending.delta, 0) as quantity,
     i.status,
     i.batch_number,
     i.container_code,
     i.updated_at
 FROM wms.inventory i
 JOIN public.products p ON i.product_id = p.id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
 WHERE i.location_id = $1
-  AND i.quantity > 0
+  AND i.quantity + COALESCE(pending.delta, 0) > 0
 ORDER BY p.name, i.container_code NULLS LAST;
 """
 
 # === Агрегированные остатки (через view) ===
 
+GET_INVENTORY_IN_SUBTREE = """
+SELECT
+    CASE WHEN $3 THEN child.location_id END as child_location_id,
+    CASE WHEN $3 THEN child.location_code END as child_location_code,
+    i.product_id,
+    p.name as product_name,
+    CASE WHEN $2 = 'batch' THEN i.batch_number END as batch_number,
+    CASE WHEN $2 = 'status' THEN i.status END as status,
+    SUM(q.quantity) as total_quantity,
+    COUNT(DISTINCT i.location_id) as locations_count,
+    COALESCE(SUM(q.quantity) FILTER (WHERE i.container_code IS NOT NULL), 0) as in_containers,
+    COALESCE(SUM(q.quantity) FILTER (WHERE i.container_code IS NULL), 0) as loose
+FROM wms.locations root
+JOIN wms.locations l ON l.path <@ root.path
+JOIN wms.inventory i ON i.location_id = l.location_id
+JOIN public.products p ON i.product_id = p.id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
+CROSS JOIN LATERAL (
+    SELECT i.quantity + COALESCE(pending.delta, 0) as quantity
+) q
+LEFT JOIN wms.locations child
+    ON $3 AND child.path = subpath(l.path, 0, nlevel(root.path) + 1)
+WHERE root.location_id = $1
+  AND q.quantity > 0
+  AND ($4::varchar IS NULL OR i.product_id = $4)
+  AND (NOT $5 OR i.container_code IS NULL)
+GROUP BY 1, 2, 3, 4, 5, 6
+ORDER BY child_location_code NULLS FIRST, product_name, batch_number, status;
+"""
+
+# То же по локациям, уже найденным в индексе иерархии (без обхода ltree):
+# $1 - ID локаций поддерева, $2 - параллельно им ID прямого потомка корня,
+# под которым лежит локация (NULL - сам корень или итоги без разбивки)
+GET_INVENTORY_IN_LOCATIONS = """
+SELECT
+    child.location_id as child_location_id,
+    child.location_code as child_location_code,
+    i.product_id,
+    p.name as product_name,
+    CASE WHEN $3 = 'batch' THEN i.batch_number END as batch_number,
+    CASE WHEN $3 = 'status' THEN i.status END as status,
+    SUM(q.quantity) as total_quantity,
+    COUNT(DISTINCT i.location_id) as locations_count,
+    COALESCE(SUM(q.quantity) FILTER (WHERE i.container_code IS NOT NULL), 0) as in_containers,
+    COALESCE(SUM(q.quantity) FILTER (WHERE i.container_code IS NULL), 0) as loose
+FROM unnest($1::int[], $2::int[]) AS t(location_id, child_location_id)
+JOIN wms.inventory i ON i.location_id = t.location_id
+JOIN public.products p ON i.product_id = p.id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
+CROSS JOIN LATERAL (
+    SELECT i.quantity + COALESCE(pending.delta, 0) as quantity
+) q
+LEFT JOIN wms.locations child ON child.location_id = t.child_location_id
+WHERE q.quantity > 0
+  AND ($4::varchar IS NULL OR i.product_id = $4)
+  AND (NOT $5 OR i.container_code IS NULL)
+GROUP BY 1, 2, 3, 4, 5, 6
+ORDER BY child_location_code NULLS FIRST, product_name, batch_number, status;
+"""
+
+# Остатки для аллокации в порядке списания: сначала партия по политике
+# ($2 = 'fefo' - по сроку годности, затем по дате приёмки), внутри партии -
+# россыпь в pickable-локациях, затем остальные pickable, затем прочие.
+# $3 - активный резерв заказа (NULL - нет): его строки не вычитаются
+# из доступного, иначе заказ оказался бы в недостаче по своему же резерву
+GET_ALLOCATION_CANDIDATES = """
+SELECT
+    i.inventory_id,
+    i.product_id,
+    l.location_id,
+    l.location_code,
+    l.is_pickable,
+    i.container_code,
+    i.batch_number,
+    ba.first_received_at,
+    ba.expires_at,
+    q.available
+FROM wms.inventory i
+JOIN wms.locations l ON i.location_id = l.location_id
+LEFT JOIN wms.batch_ages ba
+    ON ba.product_id = i.product_id
+   AND ba.batch_number = i.batch_number
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
+LEFT JOIN LATERAL (
+    SELECT SUM(rl.quantity) as quantity
+    FROM wms.reservation_lines rl
+    JOIN wms.reservations r ON r.reservation_id = rl.reservation_id
+    WHERE rl.reservation_id = $3
+      AND rl.inventory_id = i.inventory_id
+      AND r.status = 'active'
+) own ON TRUE
+CROSS JOIN LATERAL (
+    SELECT
+        i.quantity + COALESCE(pending.delta, 0)
+            - i.reserved_quantity + COALESCE(own.quantity, 0) as available
+) q
+WHERE i.product_id = ANY($1::varchar[])
+  AND i.status = 'available'
+  AND q.available > 0
+  AND l.is_active = true
+ORDER BY
+    i.product_id,
+    CASE WHEN $2 = 'fefo' THEN ba.expires_at END NULLS LAST,
+    ba.first_received_at NULLS LAST,
+    i.batch_number NULLS LAST,
+    l.is_pickable DESC,
+    i.container_code IS NULL DESC,
+    q.available DESC,
+    l.location_code;
+"""
+
+UPDATE_BATCH_EXPIRY = """
+UPDATE wms.batch_ages
+SET expires_at = $3
+WHERE product_id = $1
+  AND batch_number = $2
+RETURNING product_id, batch_number, first_received_at, expires_at;
+"""
+
 GET_INVENTORY_SUMMARY = """
 SELECT
     v.product_id,
@@ -59,6 +257,45 @@ WHERE ($1::varchar IS NULL OR v.category = $1)
 ORDER BY v.product_name;
 """
 
+# === Агрегированные остатки (через материализованное представление) ===
+
+GET_INVENTORY_SUMMARY_FROM_VIEW = """
+SELECT
+    v.product_id,
+    v.product_name,
+    v.category,
+    v.total_quantity,
+    v.locations_count,
+    v.in_containers,
+    v.loose,
+    v.last_updated
+FROM wms.mv_product_stock v
+WHERE ($1::varchar IS NULL OR v.category = $1)
+ORDER BY v.product_name;
+"""
+
+# Возраст mv_product_stock в секундах (NULL - представление ещё не обновлялось)
+GET_PRODUCT_STOCK_VIEW_AGE = """
+SELECT EXTRACT(EPOCH FROM clock_timestamp() - refreshed_at)::float8 as age_seconds
+FROM wms.mv_refresh_log
+WHERE view_name = 'mv_product_stock';
+"""
+
+# Один обновляющий на весь кластер: остальные ждут и перепроверяют возраст
+LOCK_PRODUCT_STOCK_VIEW_REFRESH = """
+SELECT pg_advisory_xact_lock(hashtext('wms.mv_product_stock'));
+"""
+
+REFRESH_PRODUCT_STOCK_VIEW = """
+REFRESH MATERIALIZED VIEW CONCURRENTLY wms.mv_product_stock;
+"""
+
+LOG_PRODUCT_STOCK_VIEW_REFRESH = """
+INSERT INTO wms.mv_refresh_log (view_name, refreshed_at)
+VALUES ('mv_product_stock', NOW())
+ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+"""
+
 # === Остатки в контейнере ===
 
 GET_INVENTORY_IN_CONTAINER = """
@@ -96,7 +333,47 @@ ORDER BY p.name;
 
 # === Поиск товара ===
 
+# Каждое поле ищется отдельной веткой UNION ALL со своим триграммным
+# индексом (migrations/002_inventory_search_trgm.sql), затем совпадения
+# по одной записи inventory схлопываются с лучшим рангом.
+# Ранг: 1 - точный product_id, 2 - название начинается с запроса, 3 - остальное.
 SEARCH_INVENTORY = """
+WITH matches AS (
+    SELECT
+        i.inventory_id,
+        CASE WHEN i.product_id = $1 THEN 1 ELSE 3 END as rank
+    FROM wms.inventory i
+    WHERE i.product_id ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+
+    UNION ALL
+
+    SELECT
+        i.inventory_id,
+        CASE WHEN p.name ILIKE $1 || '%' THEN 2 ELSE 3 END as rank
+    FROM public.products p
+    JOIN wms.inventory i ON i.product_id = p.id AND i.quantity > 0
+    WHERE p.name ILIKE '%' || $1 || '%'
+
+    UNION ALL
+
+    SELECT i.inventory_id, 3 as rank
+    FROM wms.inventory i
+    WHERE i.batch_number ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+
+    UNION ALL
+
+    SELECT i.inventory_id, 3 as rank
+    FROM wms.inventory i
+    WHERE i.container_code ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+),
+ranked AS (
+    SELECT inventory_id, MIN(rank) as rank
+    FROM matches
+    GROUP BY inventory_id
+)
 SELECT
     i.product_id,
     p.name as product_name,
@@ -106,22 +383,192 @@ SELECT
     i.container_code,
     i.batch_number,
     i.status
-FROM wms.inventory i
+FROM ranked r
+JOIN wms.inventory i ON r.inventory_id = i.inventory_id
 JOIN public.products p ON i.product_id = p.id
 JOIN wms.locations l ON i.location_id = l.location_id
-WHERE (
-    i.product_id ILIKE '%' || $1 || '%'
-    OR p.name ILIKE '%' || $1 || '%'
-    OR i.batch_number ILIKE '%' || $1 || '%'
-    OR i.container_code ILIKE '%' || $1 || '%'
+ORDER BY r.rank, p.name
+LIMIT $2;
+"""
+
+# === Поиск товара (typeahead) ===
+
+# Те же индексированные ветки, но приоритет у совпадений по началу строки:
+# 1 - точный product_id, 2 - product_id с префиксом, 3 - название с префиксом,
+# 4 - слово в названии / партия / контейнер с префиксом, 5 - подстрока.
+SEARCH_INVENTORY_TYPEAHEAD = """
+WITH matches AS (
+    SELECT
+        i.inventory_id,
+        CASE
+            WHEN i.product_id = $1 THEN 1
+            WHEN i.product_id ILIKE $1 || '%' THEN 2
+            ELSE 5
+        END as rank
+    FROM wms.inventory i
+    WHERE i.product_id ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+
+    UNION ALL
+
+    SELECT
+        i.inventory_id,
+        CASE
+            WHEN p.name ILIKE $1 || '%' THEN 3
+            WHEN p.name ILIKE '% ' || $1 || '%' THEN 4
+            ELSE 5
+        END as rank
+    FROM public.products p
+    JOIN wms.inventory i ON i.product_id = p.id AND i.quantity > 0
+    WHERE p.name ILIKE '%' || $1 || '%'
+
+    UNION ALL
+
+    SELECT
+        i.inventory_id,
+        CASE WHEN i.batch_number ILIKE $1 || '%' THEN 4 ELSE 5 END as rank
+    FROM wms.inventory i
+    WHERE i.batch_number ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+
+    UNION ALL
+
+    SELECT
+        i.inventory_id,
+        CASE WHEN i.container_code ILIKE $1 || '%' THEN 4 ELSE 5 END as rank
+    FROM wms.inventory i
+    WHERE i.container_code ILIKE '%' || $1 || '%'
+      AND i.quantity > 0
+),
+ranked AS (
+    SELECT inventory_id, MIN(rank) as rank
+    FROM matches
+    GROUP BY inventory_id
 )
-AND i.quantity > 0
-ORDER BY
-    CASE
-        WHEN i.product_id = $1 THEN 1
-        WHEN p.name ILIKE $1 || '%' THEN 2
-        ELSE 3
-    END,
-    p.name
-LIMIT 50;
+SELECT
+    i.product_id,
+    p.name as product_name,
+    l.location_code,
+    l.zone_type,
+    i.quantity,
+    i.container_code,
+    i.batch_number,
+    i.status
+FROM ranked r
+JOIN wms.inventory i ON r.inventory_id = i.inventory_id
+JOIN public.products p ON i.product_id = p.id
+JOIN wms.locations l ON i.location_id = l.location_id
+ORDER BY r.rank, length(p.name), p.name
+LIMIT $2;
+"""
+
+# === Выгрузка остатков ===
+
+# Без ORDER BY: строки идут из server-side cursor по мере чтения,
+# без сортировки всего inventory на стороне БД
+EXPORT_INVENTORY = """
+SELECT
+    i.inventory_id,
+    i.product_id,
+    p.name as product_name,
+    p.category,
+    l.location_id,
+    l.location_code,
+    l.zone_type,
+    i.quantity,
+    i.status,
+    i.batch_number,
+    i.container_code,
+    i.updated_at
+FROM wms.inventory i
+JOIN wms.locations l ON i.location_id = l.location_id
+JOIN public.products p ON i.product_id = p.id
+WHERE i.quantity > 0
+  AND ($1::varchar IS NULL OR l.zone_type = $1)
+  AND ($2::varchar IS NULL OR i.status = $2)
+  AND ($3::int IS NULL OR l.path <@ (
+      SELECT path FROM wms.locations WHERE location_id = $3
+  ));
+"""
+
+# === Лента изменений остатков ===
+
+# Отдаются только изменения транзакций старше xmin текущего снимка
+# (гарантированно завершённых), в порядке (txid, change_id) -
+# см. migrations/004_inventory_change_feed.sql
+
+# Не раньше позиции удалённых по сроку хранения изменений (012):
+# иначе при пустой ленте клиент получил бы уже просроченный watermark
+GET_INVENTORY_CHANGES_HEAD = """
+SELECT h.txid::text as txid, h.change_id
+FROM (
+    (
+        SELECT ch.txid, ch.change_id
+        FROM wms.inventory_changes ch
+        WHERE ch.txid < pg_snapshot_xmin(pg_current_snapshot())
+        ORDER BY ch.txid DESC, ch.change_id DESC
+        LIMIT 1
+    )
+    UNION ALL
+    SELECT pruned_txid, pruned_change_id
+    FROM wms.inventory_changes_horizon
+) h
+ORDER BY h.txid DESC, h.change_id DESC
+LIMIT 1;
+"""
+
+# Позиция последнего удалённого по сроку хранения изменения (012):
+# токены раньше неё требуют пересинхронизации
+GET_INVENTORY_CHANGES_HORIZON = """
+SELECT pruned_txid::text as txid, pruned_change_id as change_id
+FROM wms.inventory_changes_horizon;
+"""
+
+GET_INVENTORY_CHANGES_AFTER = """
+SELECT
+    ch.txid::text as txid,
+    ch.change_id,
+    ch.product_id,
+    ch.location_id,
+    l.location_code,
+    l.path::text as location_path,
+    l.zone_type,
+    ch.status,
+    ch.batch_number,
+    ch.container_code,
+    ch.old_quantity,
+    ch.new_quantity,
+    ch.new_quantity - ch.old_quantity as delta,
+    ch.changed_at
+FROM wms.inventory_changes ch
+JOIN wms.locations l ON ch.location_id = l.location_id
+WHERE (ch.txid, ch.change_id) > ($1::text::xid8, $2::bigint)
+  AND ch.txid < pg_snapshot_xmin(pg_current_snapshot())
+ORDER BY ch.txid, ch.change_id
+LIMIT $3;
+"""
+
+GET_CHANGED_PRODUCTS_AFTER = """
+SELECT ch.txid::text as txid, ch.change_id, ch.product_id
+FROM wms.inventory_changes ch
+WHERE (ch.txid, ch.change_id) > ($1::text::xid8, $2::bigint)
+  AND ch.txid < pg_snapshot_xmin(pg_current_snapshot())
+ORDER BY ch.txid, ch.change_id
+LIMIT $3;
+"""
+
+GET_PRODUCT_STOCK_TOTALS = """
+SELECT
+    c.product_id,
+    COALESCE(v.product_name, p.name) as product_name,
+    v.category,
+    COALESCE(v.total_quantity, 0) as total_quantity,
+    COALESCE(v.locations_count, 0) as locations_count,
+    COALESCE(v.in_containers, 0) as in_containers,
+    COALESCE(v.loose, 0) as loose,
+    v.last_updated
+FROM unnest($1::varchar[]) AS c(product_id)
+LEFT JOIN wms.v_product_stock v ON v.product_id = c.product_id
+LEFT JOIN public.products p ON p.id = c.product_id
+ORDER BY c.product_id;
 """
@@ -34,6 +34,65 @@ RETURNING
     updated_at;
 """
 
+# Один уровень шаблона: каждое название под каждым родителем одним INSERT.
+# Код и path заполняет триггер так же, как при одиночном создании.
+# RETURNING не гарантирует порядок строк, поэтому результат явно
+# упорядочивается по родителю и названию в порядке шаблона.
+BULK_CREATE_LOCATIONS = """
+WITH inserted AS (
+    INSERT INTO wms.locations (
+        parent_location_id,
+        name,
+        zone_type,
+        level,
+        max_weight,
+        max_volume,
+        is_active,
+        is_pickable,
+        metadata
+    )
+    SELECT
+        p.parent_location_id,
+        n.name,
+        $3::varchar,
+        $4::int,
+        $5::numeric,
+        $6::numeric,
+        TRUE,
+        $7::boolean,
+        $8::jsonb
+    FROM unnest($1::int[]) WITH ORDINALITY AS p(parent_location_id, parent_ord)
+    CROSS JOIN unnest($2::varchar[]) WITH ORDINALITY AS n(name, name_ord)
+    ORDER BY p.parent_ord, n.name_ord
+    RETURNING location_id, location_code, parent_location_id, name
+)
+SELECT i.location_id, i.location_code
+FROM inserted i
+JOIN unnest($1::int[]) WITH ORDINALITY AS p(parent_location_id, parent_ord)
+    ON p.parent_location_id = i.parent_location_id
+JOIN unnest($2::varchar[]) WITH ORDINALITY AS n(name, name_ord)
+    ON n.name = i.name
+ORDER BY p.parent_ord, n.name_ord;
+"""
+
+# Блокировка родителя на время генерации поддерева: параллельная генерация
+# под тем же родителем ждёт, и проверка занятых названий не устаревает
+LOCK_LOCATION = """
+SELECT location_id
+FROM wms.locations
+WHERE location_id = $1
+FOR UPDATE;
+"""
+
+# Названия, уже занятые среди детей локации
+GET_EXISTING_CHILD_NAMES = """
+SELECT name
+FROM wms.locations
+WHERE parent_location_id = $1
+  AND name = ANY($2::varchar[])
+ORDER BY name;
+"""
+
 # === READ ===
 
 GET_LOCATION_BY_ID = """
@@ -82,7 +141,26 @@ LEFT JOIN wms.locations p ON l.parent_location_id = p.location_id
 WHERE l.location_code = $1;
 """
 
-GET_CHILDREN_RECURSIVE = """
+# Локации, код которых начинается с $1 без учёта регистра.
+# $1 - уже приведённый к нижнему регистру префикс с экранированными % и _
+AUTOCOMPLETE_LOCATIONS = """
+SELECT
+    location_id,
+    location_code,
+    name,
+    zone_type,
+    level,
+    is_active
+FROM wms.locations
+WHERE lower(normalize(location_code, NFC)) LIKE $1 || '%'
+  AND ($3 OR is_active)
+ORDER BY lower(normalize(location_code, NFC)) COLLATE "C", location_code COLLATE "C"
+LIMIT $2;
+"""
+
+# Потомки в порядке path: $2 - максимальная глубина от родителя (NULL - без
+# ограничения), $3 - курсор (path последней выданной локации), $4 - LIMIT
+GET_CHILDREN = """
 SELECT
     l.location_id,
     l.location_code,
@@ -98,22 +176,10 @@ CROSS JOIN (
 ) parent
 WHERE l.path <@ parent.path
   AND l.location_id != $1
-ORDER BY l.path;
-"""
-
-GET_CHILDREN_DIRECT = """
-SELECT
-    l.location_id,
-    l.location_code,
-    l.name,
-    l.zone_type,
-    l.level,
-    l.path::text,
-    l.is_active,
-    1 as depth
-FROM wms.locations l
-WHERE l.parent_location_id = $1
-ORDER BY l.location_code;
+  AND ($2::int IS NULL OR nlevel(l.path) - nlevel(parent.path) <= $2)
+  AND ($3::text IS NULL OR l.path > $3::text::ltree)
+ORDER BY l.path
+LIMIT $4;
 """
 
 GET_ZONES = """
@@ -179,6 +245,112 @@ WHERE location_id = $1
 RETURNING location_id, location_code, is_active;
 """
 
+# ID локаций поддерева ($1 - корень, $2 - уровень, $3 - включая корень),
+# если корня ещё нет в индексе иерархии в памяти
+GET_LOCATION_SUBTREE_IDS = """
+SELECT ARRAY(
+    SELECT l.location_id
+    FROM wms.locations l
+    JOIN wms.locations root ON l.path <@ root.path
+    WHERE root.location_id = $1
+      AND ($2::int IS NULL OR l.level = $2)
+      AND ($3::boolean OR l.location_id != $1)
+    ORDER BY l.path
+);
+"""
+
+# Блокировка поддерева перед массовым изменением (в той же транзакции):
+# локации $1, а при деактивации ($2 = FALSE) - и их строки остатков.
+# Движение, уже изменившее остаток в поддереве, успевает закоммититься
+# до проверки занятости, а следующее ждёт конца транзакции.
+LOCK_LOCATION_SUBTREE = """
+WITH targets AS (
+    SELECT l.location_id
+    FROM wms.locations l
+    WHERE l.location_id = ANY($1::int[])
+    FOR UPDATE OF l
+),
+locked_inventory AS (
+    SELECT i.inventory_id
+    FROM wms.inventory i
+    JOIN targets t ON i.location_id = t.location_id
+    WHERE $2::boolean = FALSE
+    FOR UPDATE OF i
+)
+SELECT
+    (SELECT COUNT(*) FROM targets) as locations,
+    (SELECT COUNT(*) FROM locked_inventory) as inventory_rows;
+"""
+
+# Локации поддерева ($1 - их ID из индекса иерархии или GET_LOCATION_SUBTREE_IDS)
+# и среди деактивируемых ($2 = FALSE) - занятые товаром
+_SUBTREE_UPDATE_TARGETS = """
+WITH targets AS (
+    SELECT l.location_id, l.location_code, l.path, l.is_active
+    FROM wms.locations l
+    WHERE l.location_id = ANY($1::int[])
+),
+blocked AS (
+    SELECT t.location_code, t.path
+    FROM targets t
+    WHERE $2::boolean = FALSE
+      AND t.is_active
+      AND (
+          EXISTS (
+              SELECT 1 FROM wms.inventory i
+              WHERE i.location_id = t.location_id AND i.quantity > 0
+          )
+          -- Ещё не перенесённые delta горячих счётчиков (008); шарды
+          -- с нулевыми delta и квотами остаются у горячих ключей всегда
+          OR EXISTS (
+              SELECT 1 FROM wms.inventory_counter_shards s
+              WHERE s.location_id = t.location_id AND s.delta <> 0
+          )
+      )
+)"""
+
+# dry_run: только подсчёт - без UPDATE и без блокировок. $3 - LIMIT кодов
+PREVIEW_LOCATION_SUBTREE_UPDATE = _SUBTREE_UPDATE_TARGETS + """
+SELECT
+    (SELECT COUNT(*) FROM targets) as matched,
+    0::bigint as updated,
+    (SELECT COUNT(*) FROM blocked) as blocked_count,
+    ARRAY(
+        SELECT location_code FROM blocked ORDER BY path LIMIT $3
+    ) as blocked_location_codes;
+"""
+
+# Массовое изменение поддерева одним запросом. Если среди деактивируемых
+# локаций есть занятые товаром, ничего не меняется и они возвращаются в blocked.
+# Выполняется после LOCK_LOCATION_SUBTREE: отдельный запрос видит всё, что
+# закоммитили движения, которых дождалась блокировка. $7 - LIMIT кодов
+UPDATE_LOCATION_SUBTREE = _SUBTREE_UPDATE_TARGETS + """,
+updated AS (
+    UPDATE wms.locations l
+    SET
+        is_active = COALESCE($2, l.is_active),
+        is_pickable = COALESCE($3, l.is_pickable),
+        max_weight = COALESCE($4, l.max_weight),
+        max_volume = COALESCE($5, l.max_volume),
+        metadata = CASE
+            WHEN $6::jsonb IS NULL THEN l.metadata
+            ELSE COALESCE(l.metadata, '{}'::jsonb) || $6::jsonb
+        END,
+        updated_at = NOW()
+    FROM targets t
+    WHERE l.location_id = t.location_id
+      AND NOT EXISTS (SELECT 1 FROM blocked)
+    RETURNING l.location_id
+)
+SELECT
+    (SELECT COUNT(*) FROM targets) as matched,
+    (SELECT COUNT(*) FROM updated) as updated,
+    (SELECT COUNT(*) FROM blocked) as blocked_count,
+    ARRAY(
+        SELECT location_code FROM blocked ORDER BY path LIMIT $7
+    ) as blocked_location_codes;
+"""
+
 # === SPECIAL ===
 
 FIND_AVAILABLE_LOCATION = """
@@ -186,49 +358,398 @@ SELECT * FROM wms.find_available_location($1, $2, $3);
 """
 
 # === Получение иерархии зон с ограничением по уровню ===
+# Один упорядоченный по path проход вместо рекурсивного CTE: родитель
+# всегда идёт раньше потомков, дерево собирается за один линейный проход.
+# Потомков неактивных локаций отбрасывает сборщик дерева.
 GET_ZONES_HIERARCHY = """
-WITH RECURSIVE location_tree AS (
-    -- Корневые локации (склады, level = 0)
-    SELECT 
+SELECT
+    l.location_id,
+    l.location_code,
+    l.name,
+    l.zone_type,
+    l.level,
+    l.path::text,
+    l.is_active,
+    l.is_pickable,
+    l.max_weight,
+    l.max_volume,
+    l.metadata,
+    l.parent_location_id
+FROM wms.locations l
+WHERE l.is_active = TRUE
+  AND (l.parent_location_id IS NULL OR l.level <= $1)  -- Ограничение по уровню
+ORDER BY l.path;
+"""
+
+# === Версия справочника локаций ===
+
+GET_LOCATION_VERSION = """
+SELECT version FROM wms.location_version;
+"""
+
+# === Индекс иерархии в памяти ===
+# Порядок по path - обход дерева в глубину, на нём строятся интервальные метки
+GET_LOCATION_INDEX = """
+SELECT
+    l.location_id,
+    l.parent_location_id,
+    l.location_code,
+    l.name,
+    l.zone_type,
+    l.level,
+    l.path::text,
+    l.is_active,
+    xy.x,
+    xy.y
+FROM wms.locations l
+LEFT JOIN LATERAL (
+    -- Координаты для маршрутов отбора, если в metadata заданы числа x и y
+    SELECT (l.metadata->>'x')::float8 as x, (l.metadata->>'y')::float8 as y
+    WHERE jsonb_typeof(l.metadata->'x') = 'number'
+      AND jsonb_typeof(l.metadata->'y') = 'number'
+) xy ON TRUE
+ORDER BY l.path;
+"""
+
+# Цепочка предков от корня до самой локации
+GET_LOCATION_ANCESTORS = """
+SELECT
+    a.location_id,
+    a.parent_location_id,
+    a.location_code,
+    a.name,
+    a.zone_type,
+    a.level,
+    a.path::text,
+    a.is_active
+FROM wms.locations l
+JOIN wms.locations a ON a.path @> l.path
+WHERE l.location_id = $1
+ORDER BY nlevel(a.path);
+"""
+
+# === Размещение (putaway) ===
+# Занятость берётся из wms.location_occupancy_current (010: свёрнутая
+# занятость и журнал delta) плюс действующие удержания ячеек. Ячейка -
+# активная локация с заданной вместимостью, нулевой предел по измерению
+# означает "не ограничено".
+
+# Вес и объём как есть: NULL - габариты не заданы, размещение такого
+# товара отклоняется (иначе он "помещался" бы в любую ячейку)
+GET_PRODUCT_DIMENSIONS = """
+SELECT
+    p.id as product_id,
+    p.weight,
+    p.volume
+FROM public.products p
+WHERE p.id = $1;
+"""
+
+# Свободные ячейки зоны, вмещающие $2 кг и $3 м³. Сначала ячейки, где
+# уже лежит товар $4, затем самые заполненные после размещения
+# (плотная укладка, пустые ячейки остаются под целые паллеты).
+# $5 - уже просмотренные ячейки, $6 - LIMIT.
+FIND_PUTAWAY_SLOTS = """
+SELECT
+    s.*,
+    CASE WHEN s.max_weight > 0 THEN s.max_weight - s.used_weight END as free_weight,
+    CASE WHEN s.max_volume > 0 THEN s.max_volume - s.used_volume END as free_volume
+FROM (
+    SELECT
         l.location_id,
         l.location_code,
-        l.name,
         l.zone_type,
-        l.level,
-        l.path::text,
-        l.is_active,
-        l.is_pickable,
         l.max_weight,
         l.max_volume,
-        l.metadata,
-        l.parent_location_id,
-        ARRAY[l.location_id] as id_path
+        COALESCE(o.used_weight, 0) + COALESCE(h.weight, 0) as used_weight,
+        COALESCE(o.used_volume, 0) + COALESCE(h.volume, 0) as used_volume,
+        COALESCE(o.stock_rows, 0) = 0 as is_empty,
+        COALESCE(h.holds, 0) as active_holds,
+        pl.location_id IS NOT NULL as has_product
     FROM wms.locations l
-    WHERE l.parent_location_id IS NULL
+    LEFT JOIN wms.location_occupancy_current o ON o.location_id = l.location_id
+    LEFT JOIN (
+        SELECT
+            location_id,
+            COUNT(*) as holds,
+            SUM(weight) as weight,
+            SUM(volume) as volume
+        FROM wms.putaway_reservations
+        WHERE expires_at > NOW()
+        GROUP BY location_id
+    ) h ON h.location_id = l.location_id
+    LEFT JOIN (
+        SELECT DISTINCT location_id
+        FROM wms.inventory
+        WHERE product_id = $4
+          AND quantity > 0
+    ) pl ON pl.location_id = l.location_id
+    WHERE l.zone_type = $1
       AND l.is_active = TRUE
+      AND (l.max_weight > 0 OR l.max_volume > 0)
+      AND NOT (l.location_id = ANY($5::int[]))
+) s
+WHERE (s.max_weight = 0 OR s.max_weight - s.used_weight >= $2::numeric)
+  AND (s.max_volume = 0 OR s.max_volume - s.used_volume >= $3::numeric)
+ORDER BY
+    s.has_product DESC,
+    GREATEST(
+        (s.used_weight + $2::numeric) / NULLIF(s.max_weight, 0),
+        (s.used_volume + $3::numeric) / NULLIF(s.max_volume, 0)
+    ) DESC NULLS LAST,
+    s.location_code
+LIMIT $6;
+"""
 
-    UNION ALL
+# === План размещения поставки ===
+
+# Как GET_PRODUCT_DIMENSIONS: NULL - габариты не заданы
+GET_PRODUCTS_DIMENSIONS = """
+SELECT
+    p.id as product_id,
+    p.weight,
+    p.volume
+FROM public.products p
+WHERE p.id = ANY($1::varchar[]);
+"""
 
-    -- Рекурсивно добавляем дочерние до max_level
-    SELECT 
+# Ячейки зоны со свободным местом для плана размещения, по возрастанию
+# свободного объёма (NULL - не ограничен). volume_key - тот же объём
+# в float8 для сортированного списка планировщика. stocked_product_ids -
+# товары из $2, которые уже лежат в ячейке (для размещения рядом с остатком).
+#
+# Вся зона не нужна: планировщик смотрит только на ячейки, ближайшие
+# по объёму к объёму строки, и на самые просторные. Поэтому отдаются:
+# - для каждого объёма строки из $3 - $4 ячеек на строку сразу за ним
+#   (самые тесные из вмещающих; окно обрывается на следующем объёме);
+# - самые просторные ячейки: не меньше $4 и пока их суммарный свободный
+#   объём меньше $5;
+# - ячейки, где уже лежат товары поставки.
+GET_PUTAWAY_CAPACITIES = """
+WITH cells AS MATERIALIZED (
+    SELECT
+        s.location_id,
+        s.location_code,
+        CASE WHEN s.max_weight > 0 THEN s.max_weight - s.used_weight END as free_weight,
+        CASE WHEN s.max_volume > 0 THEN s.max_volume - s.used_volume END as free_volume,
+        CASE
+            WHEN s.max_volume > 0 THEN (s.max_volume - s.used_volume)::float8
+            ELSE 'Infinity'::float8
+        END as volume_key,
+        s.stocked_product_ids
+    FROM (
+        SELECT
+            l.location_id,
+            l.location_code,
+            l.max_weight,
+            l.max_volume,
+            COALESCE(o.used_weight, 0) + COALESCE(h.weight, 0) as used_weight,
+            COALESCE(o.used_volume, 0) + COALESCE(h.volume, 0) as used_volume,
+            COALESCE(sp.product_ids, '{}') as stocked_product_ids
+        FROM wms.locations l
+        LEFT JOIN wms.location_occupancy_current o ON o.location_id = l.location_id
+        LEFT JOIN (
+            SELECT
+                location_id,
+                SUM(weight) as weight,
+                SUM(volume) as volume
+            FROM wms.putaway_reservations
+            WHERE expires_at > NOW()
+            GROUP BY location_id
+        ) h ON h.location_id = l.location_id
+        LEFT JOIN (
+            SELECT location_id, array_agg(DISTINCT product_id) as product_ids
+            FROM wms.inventory
+            WHERE product_id = ANY($2::varchar[])
+              AND quantity > 0
+            GROUP BY location_id
+        ) sp ON sp.location_id = l.location_id
+        WHERE l.zone_type = $1
+          AND l.is_active = TRUE
+          AND (l.max_weight > 0 OR l.max_volume > 0)
+    ) s
+    WHERE (s.max_weight = 0 OR s.used_weight < s.max_weight)
+      AND (s.max_volume = 0 OR s.used_volume < s.max_volume)
+),
+-- Ячейки и объёмы строк в одном порядке; position - сколько ячеек
+-- до текущей строки включительно (у объёма строки - до него)
+positioned AS (
+    SELECT
+        seq.*,
+        COUNT(seq.location_id) OVER (
+            ORDER BY seq.volume_key, seq.location_id IS NOT NULL, seq.location_code
+            ROWS UNBOUNDED PRECEDING
+        ) as position
+    FROM (
+        SELECT location_id, location_code, volume_key, 0::bigint as lines
+        FROM cells
+        UNION ALL
+        SELECT NULL::int, '', n.volume, COUNT(*)
+        FROM unnest($3::float8[]) AS n(volume)
+        GROUP BY n.volume
+    ) seq
+),
+windows AS (
+    SELECT position as start_position, SUM(lines) * $4 as size
+    FROM positioned
+    WHERE location_id IS NULL
+    GROUP BY position
+),
+near_lines AS (
+    SELECT p.location_id
+    FROM (
+        SELECT
+            location_id,
+            position,
+            MAX(position) FILTER (WHERE location_id IS NULL) OVER (
+                ORDER BY volume_key, location_id IS NOT NULL, location_code
+                ROWS UNBOUNDED PRECEDING
+            ) as start_position
+        FROM positioned
+    ) p
+    JOIN windows w ON w.start_position = p.start_position
+    WHERE p.location_id IS NOT NULL
+      AND p.position - p.start_position <= w.size
+),
+largest AS (
+    SELECT location_id
+    FROM (
+        SELECT
+            location_id,
+            ROW_NUMBER() OVER w as rank,
+            SUM(volume_key) OVER w - volume_key as volume_before
+        FROM cells
+        WINDOW w AS (ORDER BY volume_key DESC, location_code DESC ROWS UNBOUNDED PRECEDING)
+    ) r
+    WHERE r.rank <= $4
+       OR r.volume_before < $5::float8
+)
+SELECT
+    c.location_id,
+    c.location_code,
+    c.free_weight,
+    c.free_volume,
+    c.volume_key,
+    c.stocked_product_ids
+FROM cells c
+WHERE c.location_id IN (
+    SELECT location_id FROM near_lines
+    UNION
+    SELECT location_id FROM largest
+    UNION
+    SELECT location_id FROM cells WHERE cardinality(stocked_product_ids) > 0
+)
+ORDER BY c.volume_key, c.location_code;
+"""
+
+# Блокировка ячеек-кандидатов; занятые параллельным размещением пропускаются.
+# NO KEY UPDATE не мешает вставке остатков (FOR KEY SHARE по внешнему ключу).
+LOCK_PUTAWAY_SLOTS = """
+SELECT location_id
+FROM wms.locations
+WHERE location_id = ANY($1::int[])
+ORDER BY array_position($1::int[], location_id)
+FOR NO KEY UPDATE SKIP LOCKED;
+"""
+
+# Удержание ячейки с повторной проверкой вместимости по свежему снимку
+CREATE_PUTAWAY_RESERVATION = """
+WITH hold AS (
+    INSERT INTO wms.putaway_reservations (
+        location_id,
+        product_id,
+        quantity,
+        weight,
+        volume,
+        expires_at
+    )
+    SELECT
         l.location_id,
-        l.location_code,
-        l.name,
-        l.zone_type,
-        l.level,
-        l.path::text,
-        l.is_active,
-        l.is_pickable,
-        l.max_weight,
-        l.max_volume,
-        l.metadata,
-        l.parent_location_id,
-        lt.id_path || l.location_id
+        $2,
+        $3,
+        $4::numeric,
+        $5::numeric,
+        NOW() + make_interval(secs => $6)
     FROM wms.locations l
-    JOIN location_tree lt ON l.parent_location_id = lt.location_id
-    WHERE l.is_active = TRUE
-      AND l.level <= $1  -- Ограничение по уровню
+    LEFT JOIN wms.location_occupancy_current o ON o.location_id = l.location_id
+    CROSS JOIN LATERAL (
+        SELECT
+            COALESCE(SUM(r.weight), 0) as weight,
+            COALESCE(SUM(r.volume), 0) as volume
+        FROM wms.putaway_reservations r
+        WHERE r.location_id = l.location_id
+          AND r.expires_at > NOW()
+    ) h
+    WHERE l.location_id = $1
+      AND l.is_active = TRUE
+      AND (l.max_weight = 0 OR l.max_weight - COALESCE(o.used_weight, 0) - h.weight >= $4)
+      AND (l.max_volume = 0 OR l.max_volume - COALESCE(o.used_volume, 0) - h.volume >= $5)
+    RETURNING *
 )
-SELECT * FROM location_tree
-ORDER BY id_path;
-"""
\ No newline at end of file
+SELECT
+    hold.putaway_reservation_id,
+    hold.location_id,
+    l.location_code,
+    hold.product_id,
+    hold.quantity,
+    hold.weight,
+    hold.volume,
+    hold.expires_at,
+    hold.created_at
+FROM hold
+JOIN wms.locations l ON l.location_id = hold.location_id;
+"""
+
+RELEASE_PUTAWAY_RESERVATION = """
+DELETE FROM wms.putaway_reservations
+WHERE putaway_reservation_id = $1
+RETURNING putaway_reservation_id;
+"""
+
+# Свернуть журнал delta занятости (010); возвращает число свёрнутых delta
+FOLD_LOCATION_OCCUPANCY = """
+SELECT wms.fold_location_occupancy($1);
+"""
+
+PURGE_EXPIRED_PUTAWAY_RESERVATIONS = """
+DELETE FROM wms.putaway_reservations
+WHERE putaway_reservation_id IN (
+    SELECT putaway_reservation_id
+    FROM wms.putaway_reservations
+    WHERE expires_at <= NOW()
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING putaway_reservation_id;
+"""
+
+# Локации отбора по кодам для маршрута: цепочка (уровень, код) от корня
+# и координаты своей или ближайшей предковой локации, где они заданы
+GET_PICK_PATH_LOCATIONS = """
+SELECT
+    l.location_id,
+    l.location_code,
+    l.name,
+    chain.levels as chain_levels,
+    chain.codes as chain_codes,
+    xy.x,
+    xy.y
+FROM wms.locations l
+CROSS JOIN LATERAL (
+    SELECT
+        array_agg(a.level ORDER BY nlevel(a.path)) as levels,
+        array_agg(a.location_code ORDER BY nlevel(a.path)) as codes
+    FROM wms.locations a
+    WHERE a.path @> l.path
+) chain
+LEFT JOIN LATERAL (
+    SELECT (a.metadata->>'x')::float8 as x, (a.metadata->>'y')::float8 as y
+    FROM wms.locations a
+    WHERE a.path @> l.path
+      AND jsonb_typeof(a.metadata->'x') = 'number'
+      AND jsonb_typeof(a.metadata->'y') = 'number'
+    ORDER BY nlevel(a.path) DESC
+    LIMIT 1
+) xy ON TRUE
+WHERE l.location_code = ANY($1::varchar[]);
+"""
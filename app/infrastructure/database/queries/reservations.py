@@ -0,0 +1,305 @@
+"""SQL запросы для резервирования остатков"""
+
+# === Аллокация ===
+
+# Строки-кандидаты для резерва товара: доступный остаток в активных локациях.
+# $3 - строки, уже просмотренные этой аллокацией.
+_RESERVATION_CANDIDATES = """
+SELECT
+    i.inventory_id,
+    i.quantity + COALESCE(pending.delta, 0) - i.reserved_quantity as free_quantity
+FROM wms.inventory i
+JOIN wms.locations l ON i.location_id = l.location_id
+LEFT JOIN LATERAL (
+    -- Ещё не перенесённые delta горячих счётчиков (008)
+    SELECT SUM(s.delta) as delta
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = i.product_id
+      AND s.location_id = i.location_id
+      AND s.status = i.status
+      AND s.batch_number = COALESCE(i.batch_number, '')
+      AND s.container_code = COALESCE(i.container_code, '')
+) pending ON TRUE
+WHERE i.product_id = $1
+  AND ($2::varchar IS NULL OR i.batch_number = $2)
+  AND i.status = 'available'
+  AND i.quantity + COALESCE(pending.delta, 0) > i.reserved_quantity
+  AND l.is_active = true
+  AND NOT (i.inventory_id = ANY($3::bigint[]))
+"""
+
+# Строки, заблокированные другими аллокациями, пропускаются. Сначала строки
+# с наибольшим свободным количеством - резерв занимает меньше строк
+LOCK_RESERVATION_CANDIDATES_SKIP_LOCKED = _RESERVATION_CANDIDATES + """\
+ORDER BY free_quantity DESC, i.inventory_id
+LIMIT $4
+FOR UPDATE OF i SKIP LOCKED;
+"""
+
+# Повторный проход с ожиданием блокировок (когда свободных строк не хватило).
+# Ожидающие блокировки берутся в порядке inventory_id - параллельные
+# аллокации ждут друг друга в одном порядке
+LOCK_RESERVATION_CANDIDATES = _RESERVATION_CANDIDATES + """\
+ORDER BY i.inventory_id
+LIMIT $4
+FOR UPDATE OF i;
+"""
+
+# === CREATE ===
+
+CREATE_RESERVATION = """
+INSERT INTO wms.reservations (order_ref, expires_at)
+VALUES ($1, NOW() + make_interval(secs => $2))
+RETURNING
+    reservation_id,
+    order_ref,
+    status,
+    expires_at,
+    created_at,
+    released_at;
+"""
+
+CREATE_RESERVATION_LINES = """
+WITH alloc AS (
+    SELECT *
+    FROM unnest($2::bigint[], $3::int[]) AS a(inventory_id, quantity)
+),
+reserved AS (
+    UPDATE wms.inventory i
+    SET reserved_quantity = i.reserved_quantity + a.quantity
+    FROM alloc a
+    WHERE i.inventory_id = a.inventory_id
+    RETURNING
+        i.inventory_id,
+        i.product_id,
+        i.location_id,
+        i.batch_number,
+        i.container_code
+),
+lines AS (
+    INSERT INTO wms.reservation_lines (
+        reservation_id,
+        inventory_id,
+        product_id,
+        location_id,
+        batch_number,
+        container_code,
+        quantity
+    )
+    SELECT
+        $1,
+        r.inventory_id,
+        r.product_id,
+        r.location_id,
+        r.batch_number,
+        r.container_code,
+        a.quantity
+    FROM reserved r
+    JOIN alloc a ON a.inventory_id = r.inventory_id
+    RETURNING *
+)
+SELECT
+    ln.line_id,
+    ln.product_id,
+    ln.location_id,
+    l.location_code,
+    ln.batch_number,
+    ln.container_code,
+    ln.quantity
+FROM lines ln
+JOIN wms.locations l ON ln.location_id = l.location_id
+ORDER BY ln.product_id, l.location_code;
+"""
+
+# === READ ===
+
+GET_RESERVATION = """
+SELECT
+    reservation_id,
+    order_ref,
+    status,
+    expires_at,
+    created_at,
+    released_at
+FROM wms.reservations
+WHERE reservation_id = $1;
+"""
+
+GET_RESERVATION_LINES = """
+SELECT
+    ln.line_id,
+    ln.product_id,
+    ln.location_id,
+    l.location_code,
+    ln.batch_number,
+    ln.container_code,
+    ln.quantity
+FROM wms.reservation_lines ln
+JOIN wms.locations l ON ln.location_id = l.location_id
+WHERE ln.reservation_id = $1
+ORDER BY ln.product_id, l.location_code;
+"""
+
+# === Снятие резерва ===
+
+RELEASE_RESERVATION = """
+WITH r AS (
+    UPDATE wms.reservations
+    SET status = 'released',
+        released_at = NOW()
+    WHERE reservation_id = $1
+      AND status = 'active'
+    RETURNING
+        reservation_id,
+        order_ref,
+        status,
+        expires_at,
+        created_at,
+        released_at
+),
+freed AS (
+    SELECT ln.inventory_id, SUM(ln.quantity) as quantity
+    FROM wms.reservation_lines ln
+    JOIN r ON ln.reservation_id = r.reservation_id
+    WHERE ln.inventory_id IS NOT NULL
+    GROUP BY ln.inventory_id
+),
+unreserved AS (
+    UPDATE wms.inventory i
+    SET reserved_quantity = GREATEST(i.reserved_quantity - f.quantity, 0)
+    FROM freed f
+    WHERE i.inventory_id = f.inventory_id
+)
+SELECT * FROM r;
+"""
+
+# === Отгрузка по резерву ===
+
+# Резерв переводится в fulfilled и снимается с остатков; движения ship
+# (SHIP_RESERVATION_LINES) пишутся в той же транзакции, поэтому между
+# снятием резерва и отгрузкой товар не может занять другой резерв.
+FULFIL_RESERVATION = """
+WITH r AS (
+    UPDATE wms.reservations
+    SET status = 'fulfilled',
+        released_at = NOW()
+    WHERE reservation_id = $1
+      AND status = 'active'
+    RETURNING
+        reservation_id,
+        order_ref,
+        status,
+        expires_at,
+        created_at,
+        released_at
+),
+freed AS (
+    SELECT ln.inventory_id, SUM(ln.quantity) as quantity
+    FROM wms.reservation_lines ln
+    JOIN r ON ln.reservation_id = r.reservation_id
+    WHERE ln.inventory_id IS NOT NULL
+    GROUP BY ln.inventory_id
+),
+unreserved AS (
+    UPDATE wms.inventory i
+    SET reserved_quantity = GREATEST(i.reserved_quantity - f.quantity, 0)
+    FROM freed f
+    WHERE i.inventory_id = f.inventory_id
+)
+SELECT * FROM r;
+"""
+
+# Движение ship на каждую строку резерва; строки остатков обновляются
+# триггером движений в порядке inventory_id, как при резервировании.
+# $2 - пользователь, $3 - причина (по умолчанию - номер резерва)
+SHIP_RESERVATION_LINES = """
+INSERT INTO wms.movements (
+    movement_type,
+    product_id,
+    from_location_id,
+    quantity,
+    batch_number,
+    container_code,
+    user_name,
+    reason
+)
+SELECT
+    'ship',
+    ln.product_id,
+    ln.location_id,
+    ln.quantity,
+    ln.batch_number,
+    ln.container_code,
+    $2,
+    COALESCE($3, 'Резерв ' || $1::text)
+FROM wms.reservation_lines ln
+WHERE ln.reservation_id = $1
+ORDER BY ln.inventory_id, ln.line_id
+RETURNING movement_id;
+"""
+
+# Истёкшие резервы; занятые параллельным снятием пропускаются
+EXPIRE_RESERVATIONS = """
+WITH r AS (
+    UPDATE wms.reservations
+    SET status = 'expired',
+        released_at = NOW()
+    WHERE reservation_id IN (
+        SELECT reservation_id
+        FROM wms.reservations
+        WHERE status = 'active'
+          AND expires_at <= NOW()
+        ORDER BY expires_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING reservation_id
+),
+freed AS (
+    SELECT ln.inventory_id, SUM(ln.quantity) as quantity
+    FROM wms.reservation_lines ln
+    JOIN r ON ln.reservation_id = r.reservation_id
+    WHERE ln.inventory_id IS NOT NULL
+    GROUP BY ln.inventory_id
+),
+unreserved AS (
+    UPDATE wms.inventory i
+    SET reserved_quantity = GREATEST(i.reserved_quantity - f.quantity, 0)
+    FROM freed f
+    WHERE i.inventory_id = f.inventory_id
+)
+SELECT reservation_id FROM r ORDER BY reservation_id;
+"""
+
+# === Available-to-promise ===
+
+GET_AVAILABLE_TO_PROMISE = """
+SELECT
+    c.product_id,
+    COALESCE(SUM(q.quantity), 0) as on_hand,
+    COALESCE(SUM(LEAST(q.reserved_quantity, q.quantity)), 0) as reserved,
+    COALESCE(SUM(GREATEST(q.quantity - q.reserved_quantity, 0)), 0) as available
+FROM unnest($1::varchar[]) AS c(product_id)
+LEFT JOIN LATERAL (
+    SELECT
+        i.quantity + COALESCE(pending.delta, 0) as quantity,
+        i.reserved_quantity
+    FROM wms.inventory i
+    JOIN wms.locations l ON i.location_id = l.location_id AND l.is_active = true
+    LEFT JOIN LATERAL (
+        -- Ещё не перенесённые delta горячих счётчиков (008)
+        SELECT SUM(s.delta) as delta
+        FROM wms.inventory_counter_shards s
+        WHERE s.product_id = i.product_id
+          AND s.location_id = i.location_id
+          AND s.status = i.status
+          AND s.batch_number = COALESCE(i.batch_number, '')
+          AND s.container_code = COALESCE(i.container_code, '')
+    ) pending ON TRUE
+    WHERE i.product_id = c.product_id
+      AND i.status = 'available'
+      AND i.quantity > 0
+) q ON q.quantity > 0
+GROUP BY c.product_id
+ORDER BY c.product_id;
+"""
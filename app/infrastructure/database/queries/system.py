@@ -52,6 +52,12 @@ DELETE FROM wms.inventory
 WHERE ($1::varchar IS NULL OR product_id = $1);
 """
 
+# Шаг 1б: Очистка счётчиков горячих товаров (они тоже выводятся из movements)
+DELETE_INVENTORY_COUNTER_SHARDS = """
+DELETE FROM wms.inventory_counter_shards
+WHERE ($1::varchar IS NULL OR product_id = $1);
+"""
+
 # Шаг 2: Пересчёт из movements
 RECALCULATE_INVENTORY = """
 INSERT INTO wms.inventory (product_id, location_id, quantity, status, batch_number, container_code)
@@ -133,6 +139,12 @@ REFRESH_MATERIALIZED_VIEW = """
 REFRESH MATERIALIZED VIEW CONCURRENTLY wms.mv_product_stock;
 """
 
+LOG_MATERIALIZED_VIEW_REFRESH = """
+INSERT INTO wms.mv_refresh_log (view_name, refreshed_at)
+VALUES ('mv_product_stock', NOW())
+ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+"""
+
 GET_MATERIALIZED_VIEW_STATS = """
 SELECT
     'mv_product_stock' as view_name,
@@ -141,3 +153,130 @@ SELECT
     NOW() as refreshed_at
 FROM wms.mv_product_stock;
 """
+
+# === Проверка снимков содержимого контейнеров ===
+
+VALIDATE_CONTAINER_SNAPSHOTS = """
+SELECT
+    c.container_id,
+    c.qr_code,
+    c.contents_snapshot as snapshot,
+    actual.contents as actual
+FROM wms.containers c
+CROSS JOIN LATERAL (
+    SELECT wms.build_container_snapshot(c.container_id) as contents
+) actual
+WHERE c.contents_snapshot IS DISTINCT FROM actual.contents
+ORDER BY c.container_id;
+"""
+
+# === Счётчики горячих товаров ===
+
+GET_HOT_INVENTORY_KEYS = """
+SELECT
+    h.product_id,
+    h.location_id,
+    l.location_code,
+    COALESCE(pending.delta, 0) as pending_delta,
+    COALESCE(pending.quota, 0) as quota,
+    h.stuck_since IS NOT NULL as stuck,
+    h.stuck_since,
+    h.last_error,
+    h.created_at
+FROM wms.hot_inventory_keys h
+JOIN wms.locations l ON h.location_id = l.location_id
+LEFT JOIN LATERAL (
+    SELECT SUM(s.delta) as delta, SUM(s.quota) as quota
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = h.product_id
+      AND s.location_id = h.location_id
+) pending ON TRUE
+ORDER BY h.product_id, l.location_code;
+"""
+
+ADD_HOT_INVENTORY_KEY = """
+WITH loc AS (
+    SELECT location_id, location_code
+    FROM wms.locations
+    WHERE location_code = $2
+),
+ins AS (
+    INSERT INTO wms.hot_inventory_keys (product_id, location_id)
+    SELECT $1, location_id FROM loc
+    ON CONFLICT (product_id, location_id) DO NOTHING
+)
+SELECT
+    $1::varchar as product_id,
+    loc.location_id,
+    loc.location_code,
+    0::bigint as pending_delta,
+    0::bigint as quota,
+    false as stuck,
+    NULL::timestamptz as stuck_since,
+    NULL::text as last_error,
+    COALESCE(h.created_at, NOW()) as created_at
+FROM loc
+LEFT JOIN wms.hot_inventory_keys h
+    ON h.product_id = $1
+   AND h.location_id = loc.location_id;
+"""
+
+REMOVE_HOT_INVENTORY_KEY = """
+DELETE FROM wms.hot_inventory_keys h
+USING wms.locations l
+WHERE h.location_id = l.location_id
+  AND h.product_id = $1
+  AND l.location_code = $2
+RETURNING h.product_id, h.location_id;
+"""
+
+PRUNE_INVENTORY_CHANGES = """
+SELECT wms.prune_inventory_changes(make_interval(secs => $1), $2) as deleted;
+"""
+
+# Ключи для переноса: с неперенесёнными delta, горячие без квот (новые,
+# исчерпавшие квоты или слитые обычным путём) и бывшие горячие с шардами
+GET_INVENTORY_COUNTER_KEYS_TO_COMPACT = """
+SELECT DISTINCT s.product_id, s.location_id
+FROM wms.inventory_counter_shards s
+WHERE s.delta <> 0
+   OR NOT EXISTS (
+       SELECT 1
+       FROM wms.hot_inventory_keys h
+       WHERE h.product_id = s.product_id
+         AND h.location_id = s.location_id
+   )
+UNION
+SELECT h.product_id, h.location_id
+FROM wms.hot_inventory_keys h
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = h.product_id
+      AND s.location_id = h.location_id
+      AND s.quota > 0
+)
+ORDER BY product_id, location_id;
+"""
+
+# Перенос одного ключа; выполняется в своей транзакции
+COMPACT_INVENTORY_COUNTER_KEY = """
+SELECT wms.compact_inventory_counter_key($1, $2);
+"""
+
+MARK_HOT_INVENTORY_KEY_STUCK = """
+UPDATE wms.hot_inventory_keys
+SET stuck_since = COALESCE(stuck_since, NOW()),
+    last_error = $3
+WHERE product_id = $1
+  AND location_id = $2;
+"""
+
+# Один перенос на весь кластер: экземпляры сервиса выполняют его по очереди
+LOCK_COUNTER_COMPACTION = """
+SELECT pg_advisory_lock(hashtext('wms.compact_inventory_counters'));
+"""
+
+UNLOCK_COUNTER_COMPACTION = """
+SELECT pg_advisory_unlock(hashtext('wms.compact_inventory_counters'));
+"""
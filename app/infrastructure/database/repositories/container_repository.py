@@ -1,9 +1,14 @@
 """Репозиторий для работы с контейнерами"""
 
 import json
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from asyncpg import Pool, Record
 from app.infrastructure.database.queries import containers as queries
+from app.shared.constants import STREAM_PREFETCH
+
+
+class _UnpackLineFailed(Exception):
+    """Позиция не выполнена - откатить транзакцию вскрытия"""
 
 
 class ContainerRepository:
@@ -46,6 +51,12 @@ class ContainerRepository:
             result = await conn.fetchrow(queries.GET_CONTAINER_BY_QR, qr_code)
             return self._parse_record(result) if result else None
 
+    async def get_by_qr_codes(self, qr_codes: List[str]) -> List[dict]:
+        """Получить контейнеры по списку QR-кодов одним запросом"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_CONTAINERS_BY_QR_CODES, qr_codes)
+            return [self._parse_record(r) for r in results]
+
     async def get_by_id(self, container_id: int) -> Optional[Record]:
         """Получить контейнер по ID"""
         async with self.pool.acquire() as conn:
@@ -72,6 +83,32 @@ class ContainerRepository:
             )
             return result
 
+    async def unpack_many(
+        self, qr_code: str, lines: List[Tuple[str, int]]
+    ) -> List[Optional[Record]]:
+        """
+        Вскрыть контейнер по нескольким позициям в одной транзакции
+
+        Вызывает wms.unpack_from_container() для каждой позиции по порядку.
+        Если позиция не выполнена, транзакция откатывается целиком,
+        а результат обрывается на этой позиции (последний элемент - None
+        или запись с success = false).
+        """
+        results = []
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    for product_id, quantity in lines:
+                        result = await conn.fetchrow(
+                            queries.UNPACK_FROM_CONTAINER, qr_code, product_id, quantity
+                        )
+                        results.append(result)
+                        if not result or not result["success"]:
+                            raise _UnpackLineFailed
+            except _UnpackLineFailed:
+                pass
+        return results
+
     async def update_status(self, container_id: int, status: str) -> Optional[Record]:
         """Обновить статус контейнера"""
         async with self.pool.acquire() as conn:
@@ -80,6 +117,31 @@ class ContainerRepository:
             )
             return result
 
+    async def bulk_update_status(
+        self,
+        status: str,
+        container_ids: Optional[List[int]] = None,
+        location_id: Optional[int] = None,
+        batch_number: Optional[str] = None,
+        container_type: Optional[str] = None,
+    ) -> List[Record]:
+        """
+        Обновить статус группы контейнеров одним запросом
+
+        Возвращает все отобранные контейнеры с флагом updated
+        (false - контейнер заблокирован и пропущен).
+        """
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.BULK_UPDATE_CONTAINER_STATUS,
+                status,
+                container_ids,
+                location_id,
+                batch_number,
+                container_type,
+            )
+            return results
+
     async def get_history(self, qr_code: str) -> List[Record]:
         """Получить историю контейнера"""
         async with self.pool.acquire() as conn:
@@ -99,6 +161,51 @@ class ContainerRepository:
             )
             return results
 
+    async def get_containers_in_subtree(
+        self,
+        location_id: int,
+        status: Optional[str] = None,
+        container_type: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[Record]:
+        """Получить страницу контейнеров в поддереве локации (keyset по container_id)"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_CONTAINERS_IN_LOCATION_SUBTREE,
+                location_id,
+                status,
+                container_type,
+                after_id,
+                limit,
+            )
+            return results
+
+    async def iter_containers_in_subtree(
+        self,
+        location_id: int,
+        status: Optional[str] = None,
+        container_type: Optional[str] = None,
+    ) -> AsyncIterator[Record]:
+        """
+        Итерировать все контейнеры в поддереве локации
+
+        Читает через server-side cursor, поэтому память не растёт
+        с размером поддерева.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    queries.GET_CONTAINERS_IN_LOCATION_SUBTREE,
+                    location_id,
+                    status,
+                    container_type,
+                    None,
+                    None,
+                    prefetch=STREAM_PREFETCH,
+                ):
+                    yield record
+
     async def exists(self, qr_code: str) -> bool:
         """Проверить существование контейнера по QR-коду"""
         async with self.pool.acquire() as conn:
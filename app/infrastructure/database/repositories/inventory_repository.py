@@ -1,8 +1,10 @@
 """Репозиторий для работы с инвентарём (остатками)"""
 
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import date
 from asyncpg import Pool, Record
 from app.infrastructure.database.queries import inventory as queries
+from app.shared.constants import STREAM_PREFETCH
 
 
 class InventoryRepository:
@@ -17,18 +19,128 @@ class InventoryRepository:
             results = await conn.fetch(queries.GET_INVENTORY_BY_PRODUCT, product_id)
             return results
 
+    async def iter_by_products(self, product_ids: List[str]) -> AsyncIterator[Record]:
+        """
+        Итерировать остатки списка товаров
+
+        Один запрос по product_id = ANY($1) через server-side cursor.
+        Записи упорядочены по product_id.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    queries.GET_INVENTORY_BY_PRODUCTS, product_ids, prefetch=STREAM_PREFETCH
+                ):
+                    yield record
+
     async def get_by_location(self, location_id: int) -> List[Record]:
         """Получить все остатки в локации"""
         async with self.pool.acquire() as conn:
             results = await conn.fetch(queries.GET_INVENTORY_BY_LOCATION, location_id)
             return results
 
+    async def get_subtree_aggregate(
+        self,
+        location_id: int,
+        group_by: str = "product",
+        breakdown: bool = False,
+        product_id: Optional[str] = None,
+        loose_only: bool = False,
+    ) -> List[Record]:
+        """Получить агрегированные остатки поддерева локации"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_INVENTORY_IN_SUBTREE,
+                location_id,
+                group_by,
+                breakdown,
+                product_id,
+                loose_only,
+            )
+            return results
+
+    async def get_locations_aggregate(
+        self,
+        location_ids: List[int],
+        child_ids: List[Optional[int]],
+        group_by: str = "product",
+        product_id: Optional[str] = None,
+        loose_only: bool = False,
+    ) -> List[Record]:
+        """
+        Получить агрегированные остатки списка локаций
+
+        child_ids - параллельно location_ids: строка разбивки, в которую
+        попадает остаток локации (None - без разбивки).
+        """
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_INVENTORY_IN_LOCATIONS,
+                location_ids,
+                child_ids,
+                group_by,
+                product_id,
+                loose_only,
+            )
+            return results
+
+    async def get_allocation_candidates(
+        self, product_ids: List[str], policy: str, reservation_id: Optional[int] = None
+    ) -> List[Record]:
+        """
+        Получить доступные остатки товаров в порядке списания по политике
+
+        Строки резерва reservation_id (если он активен) считаются доступными.
+        """
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_ALLOCATION_CANDIDATES, product_ids, policy, reservation_id
+            )
+            return results
+
+    async def update_batch_expiry(
+        self, product_id: str, batch_number: str, expires_at: Optional[date]
+    ) -> Optional[Record]:
+        """Задать срок годности партии"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(
+                queries.UPDATE_BATCH_EXPIRY, product_id, batch_number, expires_at
+            )
+            return result
+
     async def get_summary(self, category: Optional[str] = None) -> List[Record]:
         """Получить агрегированные остатки по всем товарам"""
         async with self.pool.acquire() as conn:
             results = await conn.fetch(queries.GET_INVENTORY_SUMMARY, category)
             return results
 
+    async def get_summary_from_view(
+        self, category: Optional[str], max_staleness: float
+    ) -> Tuple[List[Record], float]:
+        """
+        Получить агрегированные остатки из mv_product_stock
+
+        Если представление старше max_staleness секунд, сначала обновляет его
+        (под advisory lock, чтобы параллельные запросы не обновляли его повторно).
+
+        Returns:
+            Записи и возраст данных в секундах
+        """
+        async with self.pool.acquire() as conn:
+            age = await conn.fetchval(queries.GET_PRODUCT_STOCK_VIEW_AGE)
+            if age is None or age > max_staleness:
+                async with conn.transaction():
+                    await conn.execute(queries.LOCK_PRODUCT_STOCK_VIEW_REFRESH)
+                    # Пока ждали блокировку, представление мог обновить другой запрос
+                    age = await conn.fetchval(queries.GET_PRODUCT_STOCK_VIEW_AGE)
+                    if age is None or age > max_staleness:
+                        await conn.execute(queries.REFRESH_PRODUCT_STOCK_VIEW)
+                        await conn.execute(queries.LOG_PRODUCT_STOCK_VIEW_REFRESH)
+                age = await conn.fetchval(queries.GET_PRODUCT_STOCK_VIEW_AGE)
+
+            results = await conn.fetch(queries.GET_INVENTORY_SUMMARY_FROM_VIEW, category)
+            return results, max(age or 0.0, 0.0)
+
     async def get_in_container(self, qr_code: str) -> List[Record]:
         """Получить остатки в контейнере"""
         async with self.pool.acquire() as conn:
@@ -41,8 +153,90 @@ class InventoryRepository:
             results = await conn.fetch(queries.GET_LOOSE_INVENTORY, location_id)
             return results
 
-    async def search(self, query: str) -> List[Record]:
-        """Поиск товара по product_id, названию, batch_number или container_code"""
+    async def search(
+        self, query: str, typeahead: bool = False, limit: int = 50
+    ) -> List[Record]:
+        """
+        Поиск товара по product_id, названию, batch_number или container_code
+
+        Args:
+            query: Поисковый запрос
+            typeahead: Приоритет совпадений по началу строки (для автодополнения)
+            limit: Максимум результатов
+        """
+        sql = queries.SEARCH_INVENTORY_TYPEAHEAD if typeahead else queries.SEARCH_INVENTORY
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(sql, query, limit)
+            return results
+
+    async def iter_export(
+        self,
+        zone_type: Optional[str] = None,
+        status: Optional[str] = None,
+        location_id: Optional[int] = None,
+    ) -> AsyncIterator[Record]:
+        """
+        Итерировать все остатки для выгрузки
+
+        Читает через server-side cursor, память не зависит от объёма inventory.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    queries.EXPORT_INVENTORY,
+                    zone_type,
+                    status,
+                    location_id,
+                    prefetch=STREAM_PREFETCH,
+                ):
+                    yield record
+
+    async def get_changes_head(self) -> Tuple[int, int]:
+        """Получить позицию (txid, change_id) последнего завершённого изменения"""
         async with self.pool.acquire() as conn:
-            results = await conn.fetch(queries.SEARCH_INVENTORY, query)
+            result = await conn.fetchrow(queries.GET_INVENTORY_CHANGES_HEAD)
+            if not result:
+                return 0, 0
+            return int(result["txid"]), result["change_id"]
+
+    async def get_changes_horizon(self) -> Tuple[int, int]:
+        """Получить позицию (txid, change_id) последнего удалённого изменения"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(queries.GET_INVENTORY_CHANGES_HORIZON)
+            if not result:
+                return 0, 0
+            return int(result["txid"]), result["change_id"]
+
+    async def get_changes_after(self, position: Tuple[int, int], limit: int) -> List[Record]:
+        """Получить завершённые изменения остатков после позиции (txid, change_id)"""
+        txid, change_id = position
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_INVENTORY_CHANGES_AFTER, str(txid), change_id, limit
+            )
             return results
+
+    async def get_changed_products(
+        self, position: Tuple[int, int], limit: int
+    ) -> Tuple[List[Record], Tuple[int, int], bool]:
+        """
+        Получить текущие итоги товаров, изменившихся после позиции
+
+        Просматривает не более limit изменений по индексу (txid, change_id).
+
+        Returns:
+            (итоги по товарам, позиция последнего просмотренного изменения,
+            есть ли ещё изменения)
+        """
+        txid, change_id = position
+        async with self.pool.acquire() as conn:
+            changes = await conn.fetch(
+                queries.GET_CHANGED_PRODUCTS_AFTER, str(txid), change_id, limit
+            )
+            if not changes:
+                return [], position, False
+
+            product_ids = list(dict.fromkeys(r["product_id"] for r in changes))
+            totals = await conn.fetch(queries.GET_PRODUCT_STOCK_TOTALS, product_ids)
+            last = changes[-1]
+            return totals, (int(last["txid"]), last["change_id"]), len(changes) == limit
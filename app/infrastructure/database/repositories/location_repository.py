@@ -1,8 +1,18 @@
 """Репозиторий для работы с локациями"""
 
-from typing import List, Optional
+import json
+import unicodedata
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional, Tuple
 from asyncpg import Pool, Record
 from app.infrastructure.database.queries import locations as queries
+from app.shared.constants import STREAM_PREFETCH
+
+# Сколько кодов занятых локаций возвращать при отказе в деактивации
+MAX_BLOCKED_CODES = 50
+
+# Сколько ячеек-кандидатов блокировать за один проход при удержании
+PUTAWAY_CANDIDATE_BATCH_SIZE = 5
 
 
 class LocationRepository:
@@ -11,10 +21,46 @@ class LocationRepository:
     def __init__(self, pool: Pool):
         self.pool = pool
 
-    async def get_zones_hierarchy(self, max_level: int = 5) -> List[Record]:
-        """Получить иерархию зон с ограничением по уровню"""
+    async def get_zones_hierarchy_versioned(self, max_level: int = 5) -> Tuple[int, List[Record]]:
+        """
+        Получить иерархию зон вместе с версией справочника локаций
+
+        Версия и иерархия читаются из одного снимка (REPEATABLE READ),
+        поэтому версия точно соответствует данным.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                version = await conn.fetchval(queries.GET_LOCATION_VERSION)
+                results = await conn.fetch(queries.GET_ZONES_HIERARCHY, max_level)
+            return version, results
+
+    async def get_version(self) -> int:
+        """Получить текущую версию справочника локаций"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(queries.GET_LOCATION_VERSION)
+
+    async def get_index_rows(self) -> Tuple[int, List[Record]]:
+        """
+        Получить все локации для индекса иерархии вместе с версией справочника
+
+        Версия и строки читаются из одного снимка (REPEATABLE READ).
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                version = await conn.fetchval(queries.GET_LOCATION_VERSION)
+                results = await conn.fetch(queries.GET_LOCATION_INDEX)
+            return version, results
+
+    async def get_ancestors(self, location_id: int) -> List[Record]:
+        """Получить цепочку предков от корня до самой локации"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_LOCATION_ANCESTORS, location_id)
+            return results
+
+    async def get_pick_path_locations(self, location_codes: List[str]) -> List[Record]:
+        """Получить локации отбора с цепочкой предков и координатами"""
         async with self.pool.acquire() as conn:
-            results = await conn.fetch(queries.GET_ZONES_HIERARCHY, max_level)
+            results = await conn.fetch(queries.GET_PICK_PATH_LOCATIONS, location_codes)
             return results
 
     async def get_zones(self) -> List[Record]:
@@ -40,6 +86,54 @@ class LocationRepository:
             )
             return result
 
+    async def bulk_create(
+        self, parent_location_id: int, levels: List[dict]
+    ) -> Tuple[List[str], List[List[Record]]]:
+        """
+        Создать поддерево локаций по уровням в одной транзакции
+
+        Каждый уровень - один INSERT: все названия уровня под всеми
+        локациями, созданными на предыдущем уровне. Родитель блокируется
+        FOR UPDATE, и занятость названий первого уровня проверяется в той же
+        транзакции - параллельная генерация не создаст одноимённых соседей.
+
+        Args:
+            parent_location_id: ID корня поддерева
+            levels: Уровни сверху вниз (names, zone_type, level, max_weight, ...)
+
+        Returns:
+            (занятые названия первого уровня, []) - тогда ничего не создано,
+            или ([], созданные локации (location_id, location_code) по уровням
+            в порядке шаблона)
+        """
+        created = []
+        parent_ids = [parent_location_id]
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.fetchrow(queries.LOCK_LOCATION, parent_location_id)
+                taken = await conn.fetch(
+                    queries.GET_EXISTING_CHILD_NAMES, parent_location_id, levels[0]["names"]
+                )
+                if taken:
+                    return [row["name"] for row in taken], []
+
+                for level in levels:
+                    metadata = level.get("metadata")
+                    rows = await conn.fetch(
+                        queries.BULK_CREATE_LOCATIONS,
+                        parent_ids,
+                        level["names"],
+                        level["zone_type"],
+                        level["level"],
+                        level["max_weight"],
+                        level["max_volume"],
+                        level["is_pickable"],
+                        json.dumps(metadata) if metadata is not None else None,
+                    )
+                    created.append(rows)
+                    parent_ids = [row["location_id"] for row in rows]
+        return [], created
+
     async def get_by_id(self, location_id: int) -> Optional[Record]:
         """Получить локацию по ID"""
         async with self.pool.acquire() as conn:
@@ -52,19 +146,57 @@ class LocationRepository:
             result = await conn.fetchrow(queries.GET_LOCATION_BY_CODE, location_code)
             return result
 
-    async def get_children(self, location_id: int, recursive: bool = True) -> List[Record]:
+    async def autocomplete(
+        self, prefix: str, limit: int, include_inactive: bool = False
+    ) -> List[Record]:
+        """Локации, lower(NFC(код)) которых начинается с lower(NFC(prefix))"""
+        pattern = unicodedata.normalize("NFC", prefix).lower()
+        pattern = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                queries.AUTOCOMPLETE_LOCATIONS, pattern, limit, include_inactive
+            )
+
+    async def get_children(
+        self,
+        location_id: int,
+        max_depth: Optional[int] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Record]:
         """
-        Получить дочерние локации
-        
+        Получить потомков локации в порядке path
+
         Args:
             location_id: ID родительской локации
-            recursive: Если True - все потомки, если False - только прямые дети
+            max_depth: Максимальная глубина от родителя (None - все уровни)
+            after: Курсор - path последней уже полученной локации
+            limit: Размер страницы (None - без ограничения)
         """
         async with self.pool.acquire() as conn:
-            query = queries.GET_CHILDREN_RECURSIVE if recursive else queries.GET_CHILDREN_DIRECT
-            results = await conn.fetch(query, location_id)
+            results = await conn.fetch(queries.GET_CHILDREN, location_id, max_depth, after, limit)
             return results
 
+    async def iter_children(
+        self, location_id: int, max_depth: Optional[int] = None
+    ) -> AsyncIterator[Record]:
+        """
+        Итерировать потомков локации в порядке path
+
+        Читает через server-side cursor, память не зависит от размера поддерева.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    queries.GET_CHILDREN,
+                    location_id,
+                    max_depth,
+                    None,
+                    None,
+                    prefetch=STREAM_PREFETCH,
+                ):
+                    yield record
+
     async def update(self, location_id: int, data: dict) -> Record:
         """Обновить локацию"""
         async with self.pool.acquire() as conn:
@@ -87,6 +219,63 @@ class LocationRepository:
             result = await conn.fetchrow(queries.DEACTIVATE_LOCATION, location_id)
             return result
 
+    async def update_subtree(
+        self,
+        location_id: int,
+        data: dict,
+        dry_run: bool = False,
+        location_ids: Optional[List[int]] = None,
+    ) -> Record:
+        """
+        Изменить все локации поддерева одним запросом
+
+        Args:
+            location_id: ID корня поддерева
+            data: level, include_root и изменяемые поля (None - не менять)
+            dry_run: Только посчитать затрагиваемые локации
+            location_ids: Локации поддерева из индекса иерархии
+                (None - найти в БД по level и include_root)
+
+        Без dry_run сначала блокирует локации поддерева (и их остатки при
+        деактивации), затем отдельным запросом проверяет занятость и меняет.
+        dry_run - отдельный запрос без UPDATE: ничего не блокирует и не
+        меняет версию справочника локаций.
+
+        Returns:
+            matched, updated, blocked_count, blocked_location_codes
+        """
+        metadata = data.get("metadata")
+        async with self.pool.acquire() as conn:
+            if location_ids is None:
+                location_ids = await conn.fetchval(
+                    queries.GET_LOCATION_SUBTREE_IDS,
+                    location_id,
+                    data.get("level"),
+                    data.get("include_root", True),
+                )
+            if dry_run:
+                return await conn.fetchrow(
+                    queries.PREVIEW_LOCATION_SUBTREE_UPDATE,
+                    location_ids,
+                    data.get("is_active"),
+                    MAX_BLOCKED_CODES,
+                )
+            async with conn.transaction():
+                await conn.fetchrow(
+                    queries.LOCK_LOCATION_SUBTREE, location_ids, data.get("is_active")
+                )
+                result = await conn.fetchrow(
+                    queries.UPDATE_LOCATION_SUBTREE,
+                    location_ids,
+                    data.get("is_active"),
+                    data.get("is_pickable"),
+                    data.get("max_weight"),
+                    data.get("max_volume"),
+                    json.dumps(metadata) if metadata is not None else None,
+                    MAX_BLOCKED_CODES,
+                )
+            return result
+
     async def find_available(
         self, product_id: str, quantity: int, zone_type: str = "storage"
     ) -> Optional[Record]:
@@ -100,3 +289,128 @@ class LocationRepository:
                 queries.FIND_AVAILABLE_LOCATION, product_id, quantity, zone_type
             )
             return result
+
+    async def get_product_dimensions(self, product_id: str) -> Optional[Record]:
+        """Получить вес и объём единицы товара"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(queries.GET_PRODUCT_DIMENSIONS, product_id)
+            return result
+
+    async def find_putaway_slots(
+        self,
+        zone_type: str,
+        weight: Decimal,
+        volume: Decimal,
+        product_id: str,
+        limit: int,
+    ) -> List[Record]:
+        """Получить свободные ячейки зоны, упорядоченные по пригодности"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.FIND_PUTAWAY_SLOTS, zone_type, weight, volume, product_id, [], limit
+            )
+            return results
+
+    async def get_products_dimensions(self, product_ids: List[str]) -> List[Record]:
+        """Получить вес и объём единицы для списка товаров"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_PRODUCTS_DIMENSIONS, product_ids)
+            return results
+
+    async def get_putaway_capacities(
+        self,
+        zone_type: str,
+        product_ids: List[str],
+        line_volumes: List[float],
+        cells_per_line: int,
+        spare_volume: float,
+    ) -> List[Record]:
+        """
+        Получить ячейки зоны со свободным местом для плана размещения
+
+        Вместимость учитывает удержания. Отдаются не все ячейки зоны:
+        по cells_per_line ячеек за объёмом каждой строки (line_volumes),
+        самые просторные ячейки суммарным объёмом до spare_volume и ячейки
+        с остатком товаров product_ids.
+        """
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(
+                queries.GET_PUTAWAY_CAPACITIES,
+                zone_type,
+                product_ids,
+                line_volumes,
+                cells_per_line,
+                spare_volume,
+            )
+            return results
+
+    async def reserve_putaway_slot(
+        self,
+        zone_type: str,
+        product_id: str,
+        quantity: int,
+        weight: Decimal,
+        volume: Decimal,
+        ttl_seconds: int,
+    ) -> Optional[Record]:
+        """
+        Удержать лучшую свободную ячейку под размещение
+
+        Кандидаты берутся пачками в порядке пригодности и блокируются
+        через SKIP LOCKED: параллельные запросы получают разные ячейки.
+        Вместимость перепроверяется при вставке удержания, поэтому
+        ячейка, занятая только что завершившимся запросом, пропускается.
+
+        Returns:
+            Удержание или None, если подходящих ячеек нет
+        """
+        seen: List[int] = []
+        async with self.pool.acquire() as conn:
+            while True:
+                async with conn.transaction():
+                    candidates = await conn.fetch(
+                        queries.FIND_PUTAWAY_SLOTS,
+                        zone_type,
+                        weight,
+                        volume,
+                        product_id,
+                        seen,
+                        PUTAWAY_CANDIDATE_BATCH_SIZE,
+                    )
+                    if not candidates:
+                        return None
+                    candidate_ids = [c["location_id"] for c in candidates]
+                    seen.extend(candidate_ids)
+
+                    locked = await conn.fetch(queries.LOCK_PUTAWAY_SLOTS, candidate_ids)
+                    for row in locked:
+                        hold = await conn.fetchrow(
+                            queries.CREATE_PUTAWAY_RESERVATION,
+                            row["location_id"],
+                            product_id,
+                            quantity,
+                            weight,
+                            volume,
+                            ttl_seconds,
+                        )
+                        if hold:
+                            return hold
+
+    async def release_putaway_reservation(self, putaway_reservation_id: int) -> bool:
+        """Снять удержание ячейки (False - удержания нет)"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchval(
+                queries.RELEASE_PUTAWAY_RESERVATION, putaway_reservation_id
+            )
+            return result is not None
+
+    async def fold_location_occupancy(self, limit: int) -> int:
+        """Свернуть до limit delta занятости в location_occupancy (возвращает количество)"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(queries.FOLD_LOCATION_OCCUPANCY, limit)
+
+    async def purge_expired_putaway_reservations(self, limit: int) -> int:
+        """Удалить истёкшие удержания ячеек (возвращает количество)"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.PURGE_EXPIRED_PUTAWAY_RESERVATIONS, limit)
+            return len(results)
@@ -1,10 +1,17 @@
 """Репозиторий для работы с движениями товаров"""
 
+import logging
 from typing import List, Optional
 from datetime import date
-from asyncpg import Pool, Record
+from asyncpg import Connection, Pool, Record
+from asyncpg.exceptions import DeadlockDetectedError
 from app.infrastructure.database.queries import movements as queries
 
+logger = logging.getLogger(__name__)
+
+# Сколько раз повторять движение после взаимоблокировки
+DEADLOCK_RETRIES = 3
+
 
 class MovementRepository:
     """Репозиторий для работы с таблицей wms.movements"""
@@ -16,22 +23,42 @@ class MovementRepository:
         """
         Создать движение товара
 
-        Триггер update_inventory_from_movement() автоматически обновит inventory.
+        Триггер update_inventory_from_movement() автоматически обновит inventory,
+        а trg_movements_consume_putaway (010) уменьшит удержания ячейки-назначения
+        под этот товар на поступившее количество.
+
+        Движение блокирует строки остатков обеих локаций; встречное
+        движение может взаимоблокироваться с ним. Тогда транзакция
+        повторяется целиком (до DEADLOCK_RETRIES раз).
         """
         async with self.pool.acquire() as conn:
-            result = await conn.fetchrow(
-                queries.CREATE_MOVEMENT,
-                data["movement_type"],
-                data["product_id"],
-                data.get("from_location_code"),
-                data.get("to_location_code"),
-                data["quantity"],
-                data.get("batch_number"),
-                data.get("container_code"),
-                data.get("user_name"),
-                data.get("reason"),
-            )
-            return result
+            for attempt in range(DEADLOCK_RETRIES + 1):
+                try:
+                    async with conn.transaction():
+                        return await self._create(conn, data)
+                except DeadlockDetectedError:
+                    if attempt == DEADLOCK_RETRIES:
+                        raise
+                    logger.warning(
+                        "Движение товара %s: взаимоблокировка, повтор %s",
+                        data["product_id"],
+                        attempt + 1,
+                    )
+        raise AssertionError("unreachable")
+
+    async def _create(self, conn: Connection, data: dict) -> Record:
+        return await conn.fetchrow(
+            queries.CREATE_MOVEMENT,
+            data["movement_type"],
+            data["product_id"],
+            data.get("from_location_code"),
+            data.get("to_location_code"),
+            data["quantity"],
+            data.get("batch_number"),
+            data.get("container_code"),
+            data.get("user_name"),
+            data.get("reason"),
+        )
 
     async def get_movements(
         self,
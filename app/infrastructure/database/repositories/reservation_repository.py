@@ -0,0 +1,184 @@
+"""Репозиторий для резервирования остатков"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from asyncpg import Connection, Pool, Record
+from asyncpg.exceptions import DeadlockDetectedError
+from app.infrastructure.database.queries import reservations as queries
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк-кандидатов блокировать за один запрос
+CANDIDATE_BATCH_SIZE = 20
+
+# Сколько раз повторять транзакцию резерва после взаимоблокировки
+DEADLOCK_RETRIES = 3
+
+
+class _AllocationFailed(Exception):
+    """Позицию не удалось зарезервировать (откатывает транзакцию)"""
+
+    def __init__(self, product_id: str, deadlock: bool = False):
+        super().__init__(product_id)
+        self.product_id = product_id
+        self.deadlock = deadlock
+
+
+class ReservationRepository:
+    """Репозиторий для работы с таблицами wms.reservations и wms.reservation_lines"""
+
+    def __init__(self, pool: Pool):
+        self.pool = pool
+
+    async def create(
+        self,
+        order_ref: Optional[str],
+        ttl_seconds: int,
+        lines: List[Tuple[str, int, Optional[str]]],
+    ) -> Tuple[Optional[Record], List[Record], Optional[str]]:
+        """
+        Создать резерв в одной транзакции
+
+        Для каждой позиции (product_id, quantity, batch_number) блокирует
+        строки остатков через FOR UPDATE SKIP LOCKED и набирает количество.
+        Если свободных строк не хватило, делается второй проход с ожиданием
+        блокировок. Позиции нужно передавать упорядоченными по товару.
+
+        Строки, занятые первым проходом, держатся не по порядку, поэтому
+        второй проход может взаимоблокироваться с параллельным резервом.
+        Тогда транзакция повторяется целиком (до DEADLOCK_RETRIES раз),
+        а если не удалось - позиция считается незарезервированной.
+
+        Returns:
+            (резерв, строки резерва, None) или (None, [], product_id позиции,
+            которую не удалось зарезервировать) - тогда транзакция откатывается
+        """
+        async with self.pool.acquire() as conn:
+            for attempt in range(DEADLOCK_RETRIES + 1):
+                try:
+                    async with conn.transaction():
+                        return await self._create(conn, order_ref, ttl_seconds, lines)
+                except _AllocationFailed as e:
+                    if not e.deadlock:
+                        return None, [], e.product_id
+                    if attempt == DEADLOCK_RETRIES:
+                        logger.warning(
+                            "Резерв товара %s не создан: взаимоблокировка "
+                            "после %s попыток",
+                            e.product_id,
+                            attempt + 1,
+                        )
+                        return None, [], e.product_id
+        raise AssertionError("unreachable")
+
+    async def _create(
+        self,
+        conn: Connection,
+        order_ref: Optional[str],
+        ttl_seconds: int,
+        lines: List[Tuple[str, int, Optional[str]]],
+    ) -> Tuple[Record, List[Record], None]:
+        """Создать резерв в открытой транзакции"""
+        allocated: Dict[int, int] = {}
+        for product_id, quantity, batch_number in lines:
+            try:
+                shortfall = await self._allocate(
+                    conn, allocated, product_id, quantity, batch_number
+                )
+            except DeadlockDetectedError as e:
+                raise _AllocationFailed(product_id, deadlock=True) from e
+            if shortfall:
+                raise _AllocationFailed(product_id)
+
+        reservation = await conn.fetchrow(
+            queries.CREATE_RESERVATION, order_ref, ttl_seconds
+        )
+        reserved_lines = await conn.fetch(
+            queries.CREATE_RESERVATION_LINES,
+            reservation["reservation_id"],
+            list(allocated.keys()),
+            list(allocated.values()),
+        )
+        return reservation, reserved_lines, None
+
+    async def _allocate(
+        self,
+        conn: Connection,
+        allocated: Dict[int, int],
+        product_id: str,
+        quantity: int,
+        batch_number: Optional[str],
+    ) -> int:
+        """Набрать количество по строкам остатков (возвращает недобор)"""
+        need = quantity
+        for query in (
+            queries.LOCK_RESERVATION_CANDIDATES_SKIP_LOCKED,
+            queries.LOCK_RESERVATION_CANDIDATES,
+        ):
+            seen: List[int] = []
+            while need > 0:
+                candidates = await conn.fetch(
+                    query, product_id, batch_number, seen, CANDIDATE_BATCH_SIZE
+                )
+                for candidate in candidates:
+                    inventory_id = candidate["inventory_id"]
+                    seen.append(inventory_id)
+                    free = candidate["free_quantity"] - allocated.get(inventory_id, 0)
+                    take = min(free, need)
+                    if take <= 0:
+                        continue
+                    allocated[inventory_id] = allocated.get(inventory_id, 0) + take
+                    need -= take
+                    if need == 0:
+                        break
+                if len(candidates) < CANDIDATE_BATCH_SIZE:
+                    break
+            if need == 0:
+                break
+        return need
+
+    async def get_by_id(self, reservation_id: int) -> Optional[Record]:
+        """Получить резерв по ID"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(queries.GET_RESERVATION, reservation_id)
+            return result
+
+    async def get_lines(self, reservation_id: int) -> List[Record]:
+        """Получить строки резерва"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_RESERVATION_LINES, reservation_id)
+            return results
+
+    async def release(self, reservation_id: int) -> Optional[Record]:
+        """Снять активный резерв (None - резерв не активен)"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(queries.RELEASE_RESERVATION, reservation_id)
+            return result
+
+    async def fulfil(
+        self, reservation_id: int, user_name: Optional[str], reason: Optional[str]
+    ) -> Optional[Record]:
+        """
+        Отгрузить активный резерв: снять его и записать движения ship
+        в одной транзакции (None - резерв не активен)
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.fetchrow(queries.FULFIL_RESERVATION, reservation_id)
+                if result:
+                    await conn.execute(
+                        queries.SHIP_RESERVATION_LINES, reservation_id, user_name, reason
+                    )
+                return result
+
+    async def expire(self, limit: int) -> List[int]:
+        """Снять истёкшие резервы (не более limit за вызов)"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.EXPIRE_RESERVATIONS, limit)
+            return [r["reservation_id"] for r in results]
+
+    async def get_available_to_promise(self, product_ids: List[str]) -> List[Record]:
+        """Получить доступное к резервированию количество по товарам"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_AVAILABLE_TO_PROMISE, product_ids)
+            return results
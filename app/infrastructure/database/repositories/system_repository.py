@@ -1,10 +1,14 @@
 """Репозиторий для системных операций"""
 
+import json
+import logging
 from typing import List, Optional
-from datetime import date
-from asyncpg import Pool, Record
+from datetime import date, datetime, timezone
+from asyncpg import Pool, PostgresError, Record
 from app.infrastructure.database.queries import system as queries
 
+logger = logging.getLogger(__name__)
+
 
 class SystemRepository:
     """Репозиторий для системных операций над БД"""
@@ -12,12 +16,26 @@ class SystemRepository:
     def __init__(self, pool: Pool):
         self.pool = pool
 
+    def _parse_record(self, record: Record) -> dict:
+        """Конвертирует asyncpg.Record в dict с парсингом JSON полей"""
+        data = dict(record)
+        for field in ("snapshot", "actual"):
+            if isinstance(data.get(field), str):
+                data[field] = json.loads(data[field])
+        return data
+
     async def validate_integrity(self) -> List[Record]:
         """Проверить целостность данных между inventory и movements"""
         async with self.pool.acquire() as conn:
             results = await conn.fetch(queries.VALIDATE_INTEGRITY)
             return results
 
+    async def validate_container_snapshots(self) -> List[dict]:
+        """Найти контейнеры, у которых снимок содержимого расходится с container_contents"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.VALIDATE_CONTAINER_SNAPSHOTS)
+            return [self._parse_record(r) for r in results]
+
     async def recalculate_inventory(
         self,
         product_id: Optional[str] = None,
@@ -35,6 +53,7 @@ class SystemRepository:
             async with conn.transaction():
                 # Шаг 1: Очистка
                 await conn.execute(queries.DELETE_INVENTORY, product_id)
+                await conn.execute(queries.DELETE_INVENTORY_COUNTER_SHARDS, product_id)
 
                 # Шаг 2: Пересчёт
                 await conn.execute(
@@ -66,9 +85,92 @@ class SystemRepository:
         Обновляет mv_product_stock CONCURRENTLY (без блокировки чтения).
         """
         async with self.pool.acquire() as conn:
-            # Обновление представления
-            await conn.execute(queries.REFRESH_MATERIALIZED_VIEW)
+            # Обновление представления и запись времени обновления
+            async with conn.transaction():
+                await conn.execute(queries.REFRESH_MATERIALIZED_VIEW)
+                await conn.execute(queries.LOG_MATERIALIZED_VIEW_REFRESH)
 
             # Статистика
             result = await conn.fetchrow(queries.GET_MATERIALIZED_VIEW_STATS)
             return result
+
+    async def get_hot_inventory_keys(self) -> List[Record]:
+        """Получить горячие ключи (товар, локация) и их неперенесённые delta"""
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(queries.GET_HOT_INVENTORY_KEYS)
+            return results
+
+    async def add_hot_inventory_key(self, product_id: str, location_code: str) -> Optional[Record]:
+        """Включить режим счётчиков для товара в локации (None - локация не найдена)"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow(
+                queries.ADD_HOT_INVENTORY_KEY, product_id, location_code
+            )
+            return result
+
+    async def remove_hot_inventory_key(self, product_id: str, location_code: str) -> bool:
+        """
+        Выключить режим счётчиков для товара в локации
+
+        Накопленные delta переносятся в inventory сразу, в той же транзакции.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.fetchrow(
+                    queries.REMOVE_HOT_INVENTORY_KEY, product_id, location_code
+                )
+                if result:
+                    await conn.fetchval(
+                        queries.COMPACT_INVENTORY_COUNTER_KEY, product_id, result["location_id"]
+                    )
+                return result is not None
+
+    async def prune_inventory_changes(self, retention: float, limit: int) -> int:
+        """Удалить из ленты не более limit изменений старше retention секунд"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(queries.PRUNE_INVENTORY_CHANGES, retention, limit)
+
+    async def compact_inventory_counters(self) -> dict:
+        """
+        Перенести накопленные delta горячих счётчиков в inventory
+
+        Каждый ключ (товар, локация) переносится в своей транзакции:
+        блокировки шардов и строк inventory держатся только на время
+        переноса одного ключа. Ключ, перенос которого не удался,
+        помечается в wms.hot_inventory_keys (stuck_since, last_error),
+        остальные переносятся.
+        """
+        compacted = stuck = 0
+        async with self.pool.acquire() as conn:
+            await conn.fetchval(queries.LOCK_COUNTER_COMPACTION)
+            try:
+                keys = await conn.fetch(queries.GET_INVENTORY_COUNTER_KEYS_TO_COMPACT)
+                for key in keys:
+                    try:
+                        async with conn.transaction():
+                            compacted += await conn.fetchval(
+                                queries.COMPACT_INVENTORY_COUNTER_KEY,
+                                key["product_id"],
+                                key["location_id"],
+                            )
+                    except PostgresError as e:
+                        stuck += 1
+                        logger.warning(
+                            "Перенос счётчиков (%s, %s) не удался: %s",
+                            key["product_id"],
+                            key["location_id"],
+                            e,
+                        )
+                        await conn.execute(
+                            queries.MARK_HOT_INVENTORY_KEY_STUCK,
+                            key["product_id"],
+                            key["location_id"],
+                            str(e),
+                        )
+            finally:
+                await conn.fetchval(queries.UNLOCK_COUNTER_COMPACTION)
+        return {
+            "compacted_keys": compacted,
+            "stuck_keys": stuck,
+            "compacted_at": datetime.now(timezone.utc),
+        }
@@ -0,0 +1,55 @@
+"""Фоновое снятие истёкших резервов"""
+
+import logging
+from typing import Optional
+
+from asyncpg import Pool
+from app.shared.config import settings
+from app.shared.utils.periodic import PeriodicTask
+from app.infrastructure.database.repositories.reservation_repository import (
+    ReservationRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationExpiry:
+    """
+    Периодически снимает истёкшие резервы
+
+    Раз в RESERVATION_EXPIRE_INTERVAL снимает истёкшие резервы пачками
+    по RESERVATION_EXPIRE_BATCH. Несколько экземпляров сервиса не мешают
+    друг другу: резервы выбираются через FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(self):
+        self._repo: Optional[ReservationRepository] = None
+        self._task: Optional[PeriodicTask] = None
+
+    def start(self, pool: Pool):
+        """Запустить фоновую задачу (если интервал задан)"""
+        self._repo = ReservationRepository(pool)
+        self._task = PeriodicTask(
+            settings.RESERVATION_EXPIRE_INTERVAL,
+            self._expire,
+            "Ошибка снятия истёкших резервов",
+        )
+        self._task.start()
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task:
+            await self._task.stop()
+            self._task = None
+
+    async def _expire(self):
+        """Снять истёкшие резервы пачками, пока есть что снимать"""
+        while True:
+            expired = await self._repo.expire(settings.RESERVATION_EXPIRE_BATCH)
+            if expired:
+                logger.info(f"Снято истёкших резервов: {len(expired)}")
+            if len(expired) < settings.RESERVATION_EXPIRE_BATCH:
+                return
+
+
+reservation_expiry = ReservationExpiry()
@@ -7,6 +7,14 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.shared.config import settings
 from app.infrastructure.database.connection import get_db_pool, close_db_pool
+from app.infrastructure.database.listener import db_listener
+from app.infrastructure.database.location_index import location_index
+from app.infrastructure.database.change_feed import inventory_change_feed
+from app.infrastructure.database.change_retention import inventory_change_pruning
+from app.infrastructure.database.reservation_expiry import reservation_expiry
+from app.infrastructure.database.putaway_hold_purge import putaway_hold_purge
+from app.infrastructure.database.occupancy_fold import location_occupancy_fold
+from app.infrastructure.database.counter_compaction import inventory_counter_compaction
 from app.api.v1.router import api_router
 from app.middleware.error_handler import add_exception_handlers
 from app.middleware.logging import add_logging_middleware
@@ -30,13 +38,31 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Запуск WMS Service...")
     logger.info(f"📊 Подключение к БД: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
-    await get_db_pool()
+    pool = await get_db_pool()
     logger.info("✅ База данных подключена")
+    await db_listener.start()
+    await location_index.start(pool, db_listener)
+    logger.info("✅ Индекс локаций загружен")
+    await inventory_change_feed.start(pool, db_listener)
+    logger.info("✅ Лента изменений остатков запущена")
+    inventory_change_pruning.start(pool)
+    reservation_expiry.start(pool)
+    putaway_hold_purge.start(pool)
+    location_occupancy_fold.start(pool)
+    inventory_counter_compaction.start(pool)
     
     yield
     
     # Shutdown
     logger.info("🛑 Остановка WMS Service...")
+    await inventory_counter_compaction.stop()
+    await location_occupancy_fold.stop()
+    await putaway_hold_purge.stop()
+    await reservation_expiry.stop()
+    await inventory_change_pruning.stop()
+    await inventory_change_feed.stop()
+    await location_index.stop()
+    await db_listener.stop()
     await close_db_pool()
     logger.info("✅ База данных отключена")
 
@@ -76,6 +102,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Data-Age"],
 )
 
 # Middleware
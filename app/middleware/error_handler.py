@@ -7,10 +7,17 @@ from app.core.exceptions import (
     LocationNotFoundError,
     ContainerNotFoundError,
     InventoryNotFoundError,
+    HotInventoryKeyNotFoundError,
     ParentLocationInactiveError,
     ContainerAlreadyExistsError,
     InsufficientInventoryError,
     InsufficientContainerQuantityError,
+    ReservationNotFoundError,
+    ReservationNotActiveError,
+    PutawayReservationNotFoundError,
+    LocationAlreadyExistsError,
+    LocationHasInventoryError,
+    ProductDimensionsMissingError,
 )
 import logging
 
@@ -44,6 +51,42 @@ def add_exception_handlers(app: FastAPI):
             content={"detail": str(exc), "error_code": "INVENTORY_NOT_FOUND"},
         )
 
+    @app.exception_handler(HotInventoryKeyNotFoundError)
+    async def hot_inventory_key_not_found_handler(
+        request: Request, exc: HotInventoryKeyNotFoundError
+    ):
+        logger.warning(f"Горячий ключ не найден: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"detail": str(exc), "error_code": "HOT_INVENTORY_KEY_NOT_FOUND"},
+        )
+
+    @app.exception_handler(ReservationNotFoundError)
+    async def reservation_not_found_handler(request: Request, exc: ReservationNotFoundError):
+        logger.warning(f"Резерв не найден: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"detail": str(exc), "error_code": "RESERVATION_NOT_FOUND"},
+        )
+
+    @app.exception_handler(ReservationNotActiveError)
+    async def reservation_not_active_handler(request: Request, exc: ReservationNotActiveError):
+        logger.warning(f"Резерв не активен: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": str(exc), "error_code": "RESERVATION_NOT_ACTIVE"},
+        )
+
+    @app.exception_handler(PutawayReservationNotFoundError)
+    async def putaway_reservation_not_found_handler(
+        request: Request, exc: PutawayReservationNotFoundError
+    ):
+        logger.warning(f"Удержание ячейки не найдено: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"detail": str(exc), "error_code": "PUTAWAY_RESERVATION_NOT_FOUND"},
+        )
+
     @app.exception_handler(ParentLocationInactiveError)
     async def parent_location_inactive_handler(request: Request, exc: ParentLocationInactiveError):
         logger.warning(f"Родительская локация неактивна: {exc}")
@@ -60,6 +103,32 @@ def add_exception_handlers(app: FastAPI):
             content={"detail": str(exc), "error_code": "CONTAINER_ALREADY_EXISTS"},
         )
 
+    @app.exception_handler(LocationAlreadyExistsError)
+    async def location_already_exists_handler(request: Request, exc: LocationAlreadyExistsError):
+        logger.warning(f"Локация уже существует: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": str(exc), "error_code": "LOCATION_ALREADY_EXISTS"},
+        )
+
+    @app.exception_handler(LocationHasInventoryError)
+    async def location_has_inventory_handler(request: Request, exc: LocationHasInventoryError):
+        logger.warning(f"В локации есть товар: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": str(exc), "error_code": "LOCATION_HAS_INVENTORY"},
+        )
+
+    @app.exception_handler(ProductDimensionsMissingError)
+    async def product_dimensions_missing_handler(
+        request: Request, exc: ProductDimensionsMissingError
+    ):
+        logger.warning(f"Не заданы габариты товара: {exc}")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": str(exc), "error_code": "PRODUCT_DIMENSIONS_MISSING"},
+        )
+
     @app.exception_handler(InsufficientInventoryError)
     async def insufficient_inventory_handler(request: Request, exc: InsufficientInventoryError):
         logger.warning(f"Недостаточно товара: {exc}")
@@ -26,6 +26,28 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: Optional[str] = None
     JWT_ALGORITHM: str = "HS256"
 
+    # Лента изменений остатков (SSE)
+    CHANGE_FEED_POLL_INTERVAL: float = 1.0  # Опрос БД, если NOTIFY не пришёл (секунды)
+    CHANGE_FEED_KEEPALIVE: float = 15.0  # Интервал keepalive-комментариев SSE (секунды)
+    CHANGE_FEED_RETENTION: float = 7 * 24 * 3600.0  # Срок хранения изменений (секунды)
+    CHANGE_FEED_PRUNE_INTERVAL: float = 300.0  # Период удаления старых изменений (0 - выкл.)
+    CHANGE_FEED_PRUNE_BATCH: int = 10000  # Изменений за один DELETE
+
+    # Резервирование
+    RESERVATION_DEFAULT_TTL: int = 900  # Срок резерва по умолчанию (секунды)
+    RESERVATION_EXPIRE_INTERVAL: float = 30.0  # Период снятия истёкших резервов (0 - выкл.)
+    RESERVATION_EXPIRE_BATCH: int = 500  # Резервов за один проход
+
+    # Размещение (putaway)
+    PUTAWAY_HOLD_TTL: int = 300  # Срок удержания ячейки под размещение (секунды)
+    PUTAWAY_HOLD_PURGE_INTERVAL: float = 300.0  # Период удаления истёкших удержаний (0 - выкл.)
+    PUTAWAY_HOLD_PURGE_BATCH: int = 1000  # Удержаний за один DELETE
+    OCCUPANCY_FOLD_INTERVAL: float = 1.0  # Период свёртки журнала занятости (0 - выкл.)
+    OCCUPANCY_FOLD_BATCH: int = 10000  # Delta занятости за одну свёртку
+
+    # Счётчики горячих товаров
+    HOT_COUNTER_COMPACT_INTERVAL: float = 2.0  # Период переноса в inventory (0 - выкл.)
+
     # Внешние сервисы
     PRODUCTS_SERVICE_URL: Optional[str] = None
 
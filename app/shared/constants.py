@@ -12,3 +12,27 @@ MAX_BATCH_NUMBER_LENGTH = 50
 # Уровни локаций
 MIN_LOCATION_LEVEL = 1
 MAX_LOCATION_LEVEL = 5
+
+# Путь ltree: метки из латиницы, цифр, "_" и "-" (до 1000 символов), через точку.
+# Курсор страниц потомков - path, иначе БД отвечает ошибкой синтаксиса ltree
+LTREE_PATH_PATTERN = r"^[A-Za-z0-9_-]{1,1000}(\.[A-Za-z0-9_-]{1,1000})*$"
+
+# Пакетные запросы
+MAX_BATCH_PRODUCT_IDS = 5000
+MAX_BULK_STATUS_CONTAINERS = 1000
+MAX_CONTAINER_LOOKUP_CODES = 1000
+MAX_UNPACK_LINES = 500
+MAX_RESERVATION_LINES = 500
+# ID передаются в строке запроса (GET): лимит меньше MAX_BATCH_PRODUCT_IDS
+MAX_ATP_PRODUCT_IDS = 1000
+MAX_ALLOCATION_LINES = 500
+MAX_TEMPLATE_LOCATIONS = 50000
+MAX_PUTAWAY_PLAN_LINES = 1000
+MAX_PICK_PATH_STOPS = 2000
+
+# Сводка остатков: меньший допустимый возраст обновлял бы
+# mv_product_stock на каждый опрос дашборда
+MIN_SUMMARY_STALENESS = 5
+
+# Потоковая выдача (server-side cursor)
+STREAM_PREFETCH = 1000
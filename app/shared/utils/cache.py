@@ -0,0 +1,38 @@
+"""Кэш значений, привязанных к версии данных"""
+
+from typing import Any, Dict, Hashable, Optional
+
+
+class VersionedCache:
+    """
+    In-process кэш, действительный для одной версии данных
+
+    Значения хранятся вместе с версией, для которой они построены.
+    Запрос с другой версией сбрасывает весь кэш: после изменения данных
+    все ранее построенные значения устарели.
+    """
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._values: Dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """Получить значение для версии (None - нет в кэше)"""
+        if version != self._version:
+            return None
+        return self._values.get(key)
+
+    def set(self, key: Hashable, version: int, value: Any):
+        """Сохранить значение, построенное для версии"""
+        if self._version is None or version > self._version:
+            self._version = version
+            self._values = {}
+        elif version < self._version:
+            # Значение построено по устаревшим данным
+            return
+        self._values[key] = value
+
+    def clear(self):
+        """Сбросить кэш"""
+        self._version = None
+        self._values = {}
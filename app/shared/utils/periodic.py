@@ -0,0 +1,54 @@
+"""Периодические фоновые задачи"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Фоновая задача, вызывающая coro раз в interval секунд
+
+    Первый вызов - через interval после start(). Ошибка вызова
+    логируется и не останавливает задачу: следующий вызов будет
+    по расписанию. При interval <= 0 задача не запускается.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        coro: Callable[[], Awaitable[None]],
+        error_message: str,
+    ):
+        self.interval = interval
+        self._coro = coro
+        self._error_message = error_message
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запустить задачу (если интервал задан)"""
+        if self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить задачу и дождаться её завершения"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._coro()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(self._error_message)
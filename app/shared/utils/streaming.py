@@ -0,0 +1,107 @@
+"""Утилиты для потоковой выдачи больших ответов"""
+
+import csv
+import io
+import zlib
+from typing import AsyncIterable, AsyncIterator, List, Optional, Type
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Комментарий SSE, не дающий прокси закрыть простаивающее соединение
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+# Размер чанка, который отдаётся клиенту за одну запись в сокет
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def ndjson_stream(items: AsyncIterable[BaseModel]) -> AsyncIterator[bytes]:
+    """
+    Сериализовать поток моделей в NDJSON (одна JSON-строка на объект)
+
+    Строки копятся в буфер и отдаются чанками по STREAM_CHUNK_SIZE,
+    чтобы не писать в сокет на каждую запись.
+    """
+    buffer = bytearray()
+    async for item in items:
+        buffer += item.model_dump_json().encode()
+        buffer += b"\n"
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def csv_stream(
+    items: AsyncIterable[BaseModel], model: Type[BaseModel]
+) -> AsyncIterator[bytes]:
+    """
+    Сериализовать поток моделей в CSV с заголовком по полям модели
+
+    Значения приводятся как в JSON (даты в ISO, enum - значением).
+    """
+    fieldnames: List[str] = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+
+    async for item in items:
+        writer.writerow(item.model_dump(mode="json"))
+        if buffer.tell() >= STREAM_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Разрешает ли заголовок Accept-Encoding ответ в gzip
+
+    Учитываются q-значения: "gzip;q=0" запрещает gzip, "*" разрешает его,
+    если gzip не перечислен явно.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in weights:
+            return weights[coding] > 0
+    return False
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Сжимать поток байтов в gzip на лету"""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def sse_event(data: str, event_id: Optional[str] = None, event: Optional[str] = None) -> bytes:
+    """Сформировать событие Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return ("\n".join(lines) + "\n\n").encode()
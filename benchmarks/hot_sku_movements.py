@@ -0,0 +1,117 @@
+"""
+Пропускная способность движений по одному горячему товару
+
+Запускает N параллельных писателей, каждый из которых создаёт перемещения
+одного товара между двумя локациями (туда и обратно, по одному), в двух
+режимах:
+
+- row: обычный путь, триггер обновляет строки wms.inventory;
+- hot: товар в обеих локациях в wms.hot_inventory_keys (008),
+  движения списывают квоты шардов и пишут в них delta.
+
+Нужны применённые миграции и не менее 32 единиц товара россыпью без
+партии в каждой из локаций --from и --to (иначе часть квот нулевая
+и движения уходят обычным путём). Остатки после прогона не меняются:
+каждый писатель делает чётное число перемещений, счётчики переносятся
+в конце.
+
+Пример:
+    DB_HOST=... DB_USER=... DB_PASSWORD=... DB_NAME=... \\
+    python -m benchmarks.hot_sku_movements --product SKU-1 --from A-01-01 --to A-01-02
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import asyncpg
+
+from app.shared.config import settings
+from app.infrastructure.database.queries import movements as movement_queries
+from app.infrastructure.database.repositories.system_repository import SystemRepository
+
+
+async def writer(pool, product_id, from_code, to_code, movements, latencies):
+    async with pool.acquire() as conn:
+        for i in range(movements):
+            source, target = (from_code, to_code) if i % 2 == 0 else (to_code, from_code)
+            started = time.perf_counter()
+            await conn.fetchrow(
+                movement_queries.CREATE_MOVEMENT,
+                "transfer",
+                product_id,
+                source,
+                target,
+                1,
+                None,
+                None,
+                "benchmark",
+                "hot_sku_movements",
+            )
+            latencies.append(time.perf_counter() - started)
+
+
+async def run_mode(pool, args, hot: bool):
+    repo = SystemRepository(pool)
+    for code in (args.from_code, args.to_code):
+        if hot:
+            await repo.add_hot_inventory_key(args.product, code)
+        else:
+            await repo.remove_hot_inventory_key(args.product, code)
+    # Раздать квоты новым горячим ключам
+    await repo.compact_inventory_counters()
+
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            writer(pool, args.product, args.from_code, args.to_code, args.movements, latencies)
+            for _ in range(args.writers)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    print(
+        f"{'hot' if hot else 'row':>4}: {total} движений за {elapsed:.2f} с, "
+        f"{total / elapsed:,.0f} движений/с, "
+        f"p50 {statistics.median(latencies) * 1000:.1f} мс, "
+        f"p99 {latencies[int(total * 0.99) - 1] * 1000:.1f} мс"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--product", required=True, help="ID товара")
+    parser.add_argument("--from", dest="from_code", required=True, help="Код первой локации")
+    parser.add_argument("--to", dest="to_code", required=True, help="Код второй локации")
+    parser.add_argument("--writers", type=int, default=50, help="Параллельных писателей")
+    parser.add_argument(
+        "--movements", type=int, default=200, help="Движений на писателя (чётное)"
+    )
+    args = parser.parse_args()
+    args.movements += args.movements % 2
+
+    pool = await asyncpg.create_pool(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database=settings.DB_NAME,
+        min_size=args.writers,
+        max_size=args.writers,
+    )
+    try:
+        await run_mode(pool, args, hot=False)
+        await run_mode(pool, args, hot=True)
+    finally:
+        repo = SystemRepository(pool)
+        for code in (args.from_code, args.to_code):
+            await repo.remove_hot_inventory_key(args.product, code)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
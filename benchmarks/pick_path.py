@@ -0,0 +1,133 @@
+"""
+Маршрут отбора на синтетическом складе
+
+Строит индекс локаций склада (зона - проходы - секции - ярусы),
+задаёт координаты секциям, выбирает случайные ячейки и упорядочивает
+их через LocationService.get_pick_path обоими способами. Печатает
+время и длину маршрута в сравнении с исходным порядком.
+
+БД не нужна.
+
+Пример:
+    DB_HOST=x DB_USER=x DB_PASSWORD=x DB_NAME=x python -m benchmarks.pick_path --stops 500
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+
+from app.core.enums import PickPathStrategy
+from app.core.schemas.location import PickPathRequest
+from app.core.services.location_service import LocationService
+from app.infrastructure.database.location_index import location_index
+
+AISLE_WIDTH = 3.0
+SECTION_LENGTH = 1.2
+
+
+def synthetic_warehouse(aisles: int, sections: int, tiers: int) -> list:
+    """Строки GET_LOCATION_INDEX: координаты заданы секциям, ярусы их наследуют"""
+    rows = []
+
+    def add(parent, code, level, x=None, y=None):
+        location_id = len(rows) + 1
+        path = f"{parent['path']}.{location_id}" if parent else str(location_id)
+        row = {
+            "location_id": location_id,
+            "parent_location_id": parent["location_id"] if parent else None,
+            "location_code": code,
+            "name": code,
+            "zone_type": "storage",
+            "level": level,
+            "path": path,
+            "is_active": True,
+            "x": x,
+            "y": y,
+        }
+        rows.append(row)
+        return row
+
+    zone = add(None, "PUSHKINO-ХРАНЕНИЕ", 1)
+    for a in range(1, aisles + 1):
+        aisle = add(zone, f"{zone['location_code']}-{a:02d}", 2)
+        for s in range(1, sections + 1):
+            section = add(
+                aisle, f"{aisle['location_code']}-S{s}", 3, a * AISLE_WIDTH, s * SECTION_LENGTH
+            )
+            for t in range(1, tiers + 1):
+                add(section, f"{section['location_code']}-{t}", 4)
+
+    rows.sort(key=lambda r: tuple(r["path"].split(".")))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--aisles", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=60)
+    parser.add_argument("--tiers", type=int, default=5)
+    parser.add_argument("--stops", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--start-distance",
+        type=float,
+        default=0.0,
+        help="Начать маршрут от ворот на таком удалении от склада, м (0 - без ворот)",
+    )
+    args = parser.parse_args()
+
+    rows = synthetic_warehouse(args.aisles, args.sections, args.tiers)
+    start_code = None
+    if args.start_distance > 0:
+        # Ворота вне сетки ячеек: ближайший сосед стартует издалека
+        start_code = "PUSHKINO-ВОРОТА"
+        rows.append(
+            {
+                **rows[0],
+                "location_id": len(rows) + 1,
+                "parent_location_id": None,
+                "location_code": start_code,
+                "name": start_code,
+                "level": 1,
+                "path": str(len(rows) + 1),
+                "x": -args.start_distance,
+                "y": -args.start_distance,
+            }
+        )
+    location_index.build(rows, 1)
+    cells = [r["location_code"] for r in rows if r["level"] == 4]
+    codes = random.Random(args.seed).sample(cells, args.stops)
+    service = LocationService(None)
+
+    async def run(strategy):
+        """Первый вызов и медиана повторных (ключи кодов уже в кэше)"""
+        request = PickPathRequest(
+            location_codes=codes, strategy=strategy, start_location_code=start_code
+        )
+        timings = []
+        for _ in range(args.repeat + 1):
+            started = time.perf_counter()
+            response = await service.get_pick_path(request)
+            timings.append(time.perf_counter() - started)
+        return response, timings[0], statistics.median(timings[1:])
+
+    sections = [
+        location_index.get(location_index.get_by_code(code).parent_location_id) for code in codes
+    ]
+    baseline = sum(math.dist((a.x, a.y), (b.x, b.y)) for a, b in zip(sections, sections[1:]))
+    print(f"{args.stops} остановок, исходный порядок: {baseline:.0f} м")
+    for strategy in PickPathStrategy:
+        response, first, median = asyncio.run(run(strategy))
+        assert len(response.stops) == args.stops
+        print(
+            f"{strategy.value}: первый вызов {first * 1000:.1f} мс, "
+            f"далее {median * 1000:.1f} мс, маршрут {response.distance:.0f} м"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+План размещения поставки на синтетической зоне хранения
+
+Генерирует ячейки зоны (часть уже занята, часть с остатком товаров
+поставки) и строки поставки, затем строит план plan_putaway по всей
+зоне и по ячейкам, которые отобрал бы GET_PUTAWAY_CAPACITIES, и
+проверяет, что ни одна ячейка не переполнена.
+
+БД не нужна.
+
+Пример:
+    DB_HOST=x DB_USER=x DB_PASSWORD=x DB_NAME=x python -m benchmarks.putaway_plan
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from app.core.services.putaway_planner import (
+    PUTAWAY_PLAN_SPARE_VOLUME,
+    PUTAWAY_SCAN_LIMIT,
+    plan_putaway,
+)
+
+
+def synthetic_zone(cells: int, products: List[str], rng: random.Random) -> List[dict]:
+    """
+    Ячейки 500 кг / 1.2 м³, занятые на 0-90%, у 5% - остаток товара поставки
+
+    Строки в формате и порядке GET_PUTAWAY_CAPACITIES.
+    """
+    rows = []
+    for i in range(cells):
+        fill = Decimal(rng.randint(0, 90)) / 100
+        free_volume = (Decimal("1.2") * (1 - fill)).quantize(Decimal("0.000001"))
+        rows.append(
+            {
+                "location_id": i + 1,
+                "location_code": f"S-{i // 1000:03d}-{i % 1000:03d}",
+                "free_weight": (Decimal("500") * (1 - fill)).quantize(Decimal("0.001")),
+                "free_volume": free_volume,
+                "volume_key": float(free_volume),
+                "stocked_product_ids": [rng.choice(products)] if rng.random() < 0.05 else [],
+            }
+        )
+    rows.sort(key=lambda r: (r["volume_key"], r["location_code"]))
+    return rows
+
+
+def synthetic_shipment(
+    lines: int, products: List[str], rng: random.Random
+) -> Tuple[Dict[str, Tuple[Decimal, Decimal]], List[Tuple[str, int]]]:
+    dimensions = {
+        product_id: (
+            Decimal(rng.randint(100, 20000)) / 1000,
+            Decimal(rng.randint(500, 60000)) / 1000000,
+        )
+        for product_id in products
+    }
+    shipment = [(rng.choice(products), rng.randint(1, 400)) for _ in range(lines)]
+    return dimensions, shipment
+
+
+def prefiltered_zone(cells: List[dict], dimensions, shipment) -> List[dict]:
+    """Ячейки, которые отдал бы GET_PUTAWAY_CAPACITIES (тот же отбор в Python)"""
+    line_volumes = [float(dimensions[product_id][1] * qty) for product_id, qty in shipment]
+    windows: Dict[float, int] = {}
+    for volume in line_volumes:
+        windows[volume] = windows.get(volume, 0) + PUTAWAY_SCAN_LIMIT
+
+    selected = set()
+    markers = sorted(windows.items())
+    position, start, size, m = 0, None, 0, 0
+    for cell in cells:
+        # Объёмы строк, не больше свободного объёма ячейки, открывают окно
+        while m < len(markers) and markers[m][0] <= cell["volume_key"]:
+            if start != position:
+                start, size = position, 0
+            size += markers[m][1]
+            m += 1
+        position += 1
+        if start is not None and position - start <= size:
+            selected.add(cell["location_id"])
+
+    spare = sum(line_volumes) * PUTAWAY_PLAN_SPARE_VOLUME
+    volume_before = 0.0
+    for rank, cell in enumerate(reversed(cells), start=1):
+        if rank > PUTAWAY_SCAN_LIMIT and volume_before >= spare:
+            break
+        selected.add(cell["location_id"])
+        volume_before += cell["volume_key"]
+
+    return [
+        cell
+        for cell in cells
+        if cell["location_id"] in selected or cell["stocked_product_ids"]
+    ]
+
+
+def check(cells: List[dict], dimensions, results) -> None:
+    """Проверить, что план не превышает вместимость ячеек"""
+    by_id = {c["location_id"]: c for c in cells}
+    added: Dict[int, List[Decimal]] = {}
+    for line in results:
+        unit_weight, unit_volume = dimensions[line.product_id]
+        assert line.planned + line.unplaced == line.requested
+        assert sum(p.quantity for p in line.placements) == line.planned
+        for p in line.placements:
+            acc = added.setdefault(p.location_id, [Decimal(0), Decimal(0)])
+            acc[0] += unit_weight * p.quantity
+            acc[1] += unit_volume * p.quantity
+    for location_id, (weight, volume) in added.items():
+        cell = by_id[location_id]
+        assert weight <= cell["free_weight"], location_id
+        assert volume <= cell["free_volume"], location_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    products = [f"SKU-{i:05d}" for i in range(args.products)]
+    cells = synthetic_zone(args.cells, products, rng)
+    dimensions, shipment = synthetic_shipment(args.lines, products, rng)
+
+    for label, zone in (
+        ("вся зона", cells),
+        ("отбор запроса", prefiltered_zone(cells, dimensions, shipment)),
+    ):
+        started = time.perf_counter()
+        results = plan_putaway(zone, dimensions, shipment)
+        elapsed = time.perf_counter() - started
+
+        check(zone, dimensions, results)
+        placements = sum(len(line.placements) for line in results)
+        co_located = sum(p.co_located for line in results for p in line.placements)
+        unplaced = sum(line.unplaced for line in results)
+        print(
+            f"{label}: {len(zone)} ячеек, {args.lines} строк: {elapsed * 1000:.0f} мс, "
+            f"размещений {placements} (рядом с остатком {co_located}), не размещено {unplaced}"
+        )
+
+if __name__ == "__main__":
+    main()
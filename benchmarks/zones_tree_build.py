@@ -0,0 +1,118 @@
+"""
+Сборка дерева зон на синтетическом складе
+
+Строит плоский список локаций 5-уровневого склада (~200k локаций)
+в порядке path - так, как его возвращает GET_ZONES_HIERARCHY, - и
+сравнивает время от списка до JSON-ответа:
+
+- nested: dict-узлы + рекурсивный LocationTreeNode.model_validate
+  (прежняя сборка дерева зон);
+- single-pass: location_tree_json (один проход по списку сразу в JSON).
+
+БД не нужна.
+
+Пример:
+    DB_HOST=x DB_USER=x DB_PASSWORD=x DB_NAME=x python -m benchmarks.zones_tree_build
+"""
+
+import argparse
+import time
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.core.schemas.location import LocationTreeNode
+from app.core.services.location_service import location_tree_json
+
+ZONE_TYPES = ["receiving", "storage", "picking", "packing", "shipping"]
+
+
+def synthetic_warehouse(aisles: int, sections: int, tiers: int, cells: int) -> List[dict]:
+    """Склад -> 5 зон -> ряды -> секции -> ярусы -> ячейки, в порядке path"""
+    rows = []
+    next_id = iter(range(1, 10**9))
+
+    def add(parent, code, level, zone_type):
+        location_id = next(next_id)
+        path = f"{parent['path']}.{code}" if parent else code
+        row = {
+            "location_id": location_id,
+            "location_code": path.replace(".", "-"),
+            "name": code,
+            "zone_type": zone_type,
+            "level": level,
+            "path": path,
+            "is_active": True,
+            "is_pickable": level == 5,
+            "max_weight": Decimal("100.00"),
+            "max_volume": Decimal("1.500"),
+            "metadata": None,
+            "parent_location_id": parent["location_id"] if parent else None,
+        }
+        rows.append(row)
+        return row
+
+    warehouse = add(None, "WH", 0, "warehouse")
+    for z, zone_type in enumerate(ZONE_TYPES, 1):
+        zone = add(warehouse, f"Z{z}", 1, zone_type)
+        for a in range(1, aisles + 1):
+            aisle = add(zone, f"A{a:02d}", 2, zone_type)
+            for s in range(1, sections + 1):
+                section = add(aisle, f"S{s:02d}", 3, zone_type)
+                for t in range(1, tiers + 1):
+                    tier = add(section, f"L{t}", 4, zone_type)
+                    for c in range(1, cells + 1):
+                        add(tier, f"C{c:02d}", 5, zone_type)
+    return rows
+
+
+def build_nested(locations) -> List[LocationTreeNode]:
+    """Прежняя сборка: dict-узлы и рекурсивная валидация"""
+    locations_dict = {loc["location_id"]: dict(loc) for loc in locations}
+    for loc in locations_dict.values():
+        loc["children"] = []
+    roots = []
+    for loc in locations_dict.values():
+        if loc["parent_location_id"] is None:
+            roots.append(loc)
+        else:
+            parent = locations_dict.get(loc["parent_location_id"])
+            if parent:
+                parent["children"].append(loc)
+    return [LocationTreeNode.model_validate(root) for root in roots]
+
+
+def measure(name, serialize, rows, repeat):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = serialize(rows)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:>12}: {best * 1000:8.1f} мс ({len(body) / 1e6:.1f} МБ JSON)")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--aisles", type=int, default=20, help="Рядов в зоне")
+    parser.add_argument("--sections", type=int, default=20, help="Секций в ряду")
+    parser.add_argument("--tiers", type=int, default=5, help="Ярусов в секции")
+    parser.add_argument("--cells", type=int, default=19, help="Ячеек в ярусе")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов (берётся лучший)")
+    args = parser.parse_args()
+
+    rows = synthetic_warehouse(args.aisles, args.sections, args.tiers, args.cells)
+    print(f"Локаций: {len(rows):,}")
+
+    adapter = TypeAdapter(List[LocationTreeNode])
+    nested = measure(
+        "nested", lambda rows: adapter.dump_json(build_nested(rows)), rows, args.repeat
+    )
+    single = measure("single-pass", location_tree_json, rows, args.repeat)
+    assert nested == single, "Результаты сериализации различаются"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+-- Денормализованный снимок содержимого контейнера
+--
+-- Активное содержимое контейнера вместе с названиями товаров хранится
+-- прямо в строке wms.containers (contents_snapshot). Скан контейнера
+-- становится чтением одной строки без GROUP BY по container_contents.
+-- Снимок поддерживается триггерами на wms.container_contents и
+-- public.products; расхождения ищет POST /api/system/validate-container-snapshots.
+
+ALTER TABLE wms.containers
+    ADD COLUMN IF NOT EXISTS contents_snapshot JSONB;
+
+-- Сборка снимка для одного контейнера (тот же формат, что отдавал json_agg в API)
+CREATE OR REPLACE FUNCTION wms.build_container_snapshot(p_container_id INTEGER)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_agg(
+        jsonb_build_object(
+            'product_id', cc.product_id,
+            'product_name', p.name,
+            'quantity', cc.quantity,
+            'batch_number', cc.batch_number,
+            'is_scanned', cc.is_scanned
+        ) ORDER BY cc.product_id
+    )
+    FROM wms.container_contents cc
+    LEFT JOIN public.products p ON cc.product_id = p.id
+    WHERE cc.container_id = p_container_id
+      AND cc.status = 'active';
+$$;
+
+-- Statement-level триггер: пересобираем снимок один раз на контейнер,
+-- даже если register_container вставил десятки строк содержимого
+CREATE OR REPLACE FUNCTION wms.refresh_container_snapshots()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE wms.containers c
+        SET contents_snapshot = wms.build_container_snapshot(c.container_id)
+        WHERE c.container_id IN (SELECT DISTINCT container_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE wms.containers c
+        SET contents_snapshot = wms.build_container_snapshot(c.container_id)
+        WHERE c.container_id IN (SELECT DISTINCT container_id FROM old_rows);
+    ELSE
+        UPDATE wms.containers c
+        SET contents_snapshot = wms.build_container_snapshot(c.container_id)
+        WHERE c.container_id IN (
+            SELECT container_id FROM new_rows
+            UNION
+            SELECT container_id FROM old_rows
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_container_contents_snapshot_ins ON wms.container_contents;
+CREATE TRIGGER trg_container_contents_snapshot_ins
+    AFTER INSERT ON wms.container_contents
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.refresh_container_snapshots();
+
+DROP TRIGGER IF EXISTS trg_container_contents_snapshot_upd ON wms.container_contents;
+CREATE TRIGGER trg_container_contents_snapshot_upd
+    AFTER UPDATE ON wms.container_contents
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.refresh_container_snapshots();
+
+DROP TRIGGER IF EXISTS trg_container_contents_snapshot_del ON wms.container_contents;
+CREATE TRIGGER trg_container_contents_snapshot_del
+    AFTER DELETE ON wms.container_contents
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.refresh_container_snapshots();
+
+-- Переименование товара меняет product_name в снимках
+CREATE OR REPLACE FUNCTION wms.refresh_container_snapshots_on_product()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE wms.containers c
+    SET contents_snapshot = wms.build_container_snapshot(c.container_id)
+    WHERE c.container_id IN (
+        SELECT DISTINCT cc.container_id
+        FROM wms.container_contents cc
+        WHERE cc.product_id = NEW.id
+          AND cc.status = 'active'
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_container_snapshot ON public.products;
+CREATE TRIGGER trg_products_container_snapshot
+    AFTER UPDATE OF name ON public.products
+    FOR EACH ROW
+    WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION wms.refresh_container_snapshots_on_product();
+
+-- Первичное заполнение
+UPDATE wms.containers
+SET contents_snapshot = wms.build_container_snapshot(container_id);
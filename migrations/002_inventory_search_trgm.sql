@@ -0,0 +1,29 @@
+-- Индексы для поиска товара на складе
+--
+-- Поиск (GET /api/inventory/search) ищет подстроку в product_id,
+-- названии товара, номере партии и коде контейнера. Каждое поле
+-- запрашивается отдельной веткой UNION ALL, поэтому каждая ветка
+-- использует свой триграммный индекс вместо seq scan по inventory.
+-- Индексы по inventory частичные (quantity > 0) - как и условие поиска.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_product_id_trgm
+    ON wms.inventory USING gin (product_id gin_trgm_ops)
+    WHERE quantity > 0;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_batch_number_trgm
+    ON wms.inventory USING gin (batch_number gin_trgm_ops)
+    WHERE quantity > 0;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_container_code_trgm
+    ON wms.inventory USING gin (container_code gin_trgm_ops)
+    WHERE quantity > 0;
+
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+    ON public.products USING gin (name gin_trgm_ops);
+
+-- Для ветки по названию: остатки товара по product_id
+CREATE INDEX IF NOT EXISTS idx_inventory_product_id_positive
+    ON wms.inventory (product_id)
+    WHERE quantity > 0;
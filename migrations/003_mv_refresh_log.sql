@@ -0,0 +1,16 @@
+-- Журнал обновлений материализованных представлений
+--
+-- PostgreSQL не хранит время последнего REFRESH MATERIALIZED VIEW.
+-- Время пишется сюда при каждом обновлении. По нему
+-- GET /api/inventory/summary?max_staleness=N решает, можно ли отдать
+-- mv_product_stock или его нужно сначала обновить.
+
+CREATE TABLE IF NOT EXISTS wms.mv_refresh_log (
+    view_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL
+);
+
+-- Время прошлых ручных обновлений неизвестно: считаем представление устаревшим
+INSERT INTO wms.mv_refresh_log (view_name, refreshed_at)
+VALUES ('mv_product_stock', 'epoch')
+ON CONFLICT (view_name) DO NOTHING;
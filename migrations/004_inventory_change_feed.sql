@@ -0,0 +1,77 @@
+-- Лента изменений остатков (outbox)
+--
+-- Каждое изменение quantity в wms.inventory пишется в wms.inventory_changes
+-- тем же триггерным путём, что и само изменение (в той же транзакции),
+-- и сопровождается NOTIFY wms_inventory_changes.
+--
+-- Порядок выдачи - (txid, change_id). Отдаются только изменения транзакций,
+-- которые старше pg_snapshot_xmin текущего снимка, т.е. гарантированно
+-- завершены. Поэтому токен продолжения "txid:change_id" никогда
+-- не перескакивает через изменение, закоммиченное позже.
+
+CREATE TABLE IF NOT EXISTS wms.inventory_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    product_id VARCHAR(100) NOT NULL,
+    location_id INTEGER NOT NULL,
+    status VARCHAR(20),
+    batch_number VARCHAR(50),
+    container_code VARCHAR(50),
+    old_quantity INTEGER NOT NULL,
+    new_quantity INTEGER NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_txid
+    ON wms.inventory_changes (txid, change_id);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_changed_at
+    ON wms.inventory_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION wms.log_inventory_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO wms.inventory_changes (
+            product_id, location_id, status, batch_number, container_code,
+            old_quantity, new_quantity
+        )
+        VALUES (
+            NEW.product_id, NEW.location_id, NEW.status, NEW.batch_number, NEW.container_code,
+            0, NEW.quantity
+        );
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF OLD.quantity IS NOT DISTINCT FROM NEW.quantity THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO wms.inventory_changes (
+            product_id, location_id, status, batch_number, container_code,
+            old_quantity, new_quantity
+        )
+        VALUES (
+            NEW.product_id, NEW.location_id, NEW.status, NEW.batch_number, NEW.container_code,
+            OLD.quantity, NEW.quantity
+        );
+    ELSE
+        INSERT INTO wms.inventory_changes (
+            product_id, location_id, status, batch_number, container_code,
+            old_quantity, new_quantity
+        )
+        VALUES (
+            OLD.product_id, OLD.location_id, OLD.status, OLD.batch_number, OLD.container_code,
+            OLD.quantity, 0
+        );
+    END IF;
+
+    -- Одинаковые уведомления в транзакции схлопываются в одно
+    PERFORM pg_notify('wms_inventory_changes', '');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_inventory_change_feed ON wms.inventory;
+CREATE TRIGGER trg_inventory_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON wms.inventory
+    FOR EACH ROW EXECUTE FUNCTION wms.log_inventory_change();
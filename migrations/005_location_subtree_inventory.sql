@@ -0,0 +1,21 @@
+-- Индексы для агрегации остатков по поддереву локаций
+--
+-- GET /api/inventory/location/{id}/subtree выбирает локации поддерева
+-- по ltree-пути (path <@ root.path) и суммирует их остатки.
+-- GiST-индекс по path отдаёт поддерево зоны без полного обхода
+-- локаций, btree по path нужен для поиска прямого потомка по
+-- subpath(...) в разбивке по дочерним локациям. Покрывающий индекс
+-- по inventory позволяет суммировать остатки локации без чтения таблицы.
+
+CREATE EXTENSION IF NOT EXISTS ltree;
+
+CREATE INDEX IF NOT EXISTS idx_locations_path_gist
+    ON wms.locations USING gist (path);
+
+CREATE INDEX IF NOT EXISTS idx_locations_path_btree
+    ON wms.locations USING btree (path);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_location_positive
+    ON wms.inventory (location_id)
+    INCLUDE (product_id, status, batch_number, container_code, quantity)
+    WHERE quantity > 0;
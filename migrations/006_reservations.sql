@@ -0,0 +1,64 @@
+-- Резервирование остатков и available-to-promise (ATP)
+--
+-- Резерв не переводит остаток в статус reserved (это потребовало бы
+-- движений): в строке wms.inventory хранится reserved_quantity, а какие
+-- строки кем зарезервированы - в wms.reservation_lines.
+-- Доступно к резервированию = quantity - reserved_quantity.
+-- Движения reserved_quantity не проверяют: отгрузка по резерву идёт
+-- через wms.reservations (fulfilled), которая снимает резерв и пишет
+-- движения ship в одной транзакции.
+--
+-- Аллокация блокирует строки-кандидаты через FOR UPDATE SKIP LOCKED:
+-- параллельные резервы одного товара расходятся по разным строкам,
+-- а не выстраиваются в очередь за одной.
+
+ALTER TABLE wms.inventory
+    ADD COLUMN IF NOT EXISTS reserved_quantity INTEGER NOT NULL DEFAULT 0
+        CHECK (reserved_quantity >= 0);
+
+CREATE TABLE IF NOT EXISTS wms.reservations (
+    reservation_id BIGSERIAL PRIMARY KEY,
+    order_ref VARCHAR(100),
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    released_at TIMESTAMPTZ
+);
+
+-- fulfilled - резерв отгружен (снят вместе с отгрузкой в одной транзакции)
+ALTER TABLE wms.reservations DROP CONSTRAINT IF EXISTS reservations_status_check;
+ALTER TABLE wms.reservations ADD CONSTRAINT reservations_status_check
+    CHECK (status IN ('active', 'released', 'expired', 'fulfilled'));
+
+-- Для истечения: только активные резервы, по сроку
+CREATE INDEX IF NOT EXISTS idx_reservations_active_expires_at
+    ON wms.reservations (expires_at)
+    WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_reservations_order_ref
+    ON wms.reservations (order_ref);
+
+CREATE TABLE IF NOT EXISTS wms.reservation_lines (
+    line_id BIGSERIAL PRIMARY KEY,
+    reservation_id BIGINT NOT NULL
+        REFERENCES wms.reservations (reservation_id) ON DELETE CASCADE,
+    inventory_id BIGINT
+        REFERENCES wms.inventory (inventory_id) ON DELETE SET NULL,
+    product_id VARCHAR(100) NOT NULL,
+    location_id INTEGER NOT NULL,
+    batch_number VARCHAR(50),
+    container_code VARCHAR(50),
+    quantity INTEGER NOT NULL CHECK (quantity > 0)
+);
+
+CREATE INDEX IF NOT EXISTS idx_reservation_lines_reservation_id
+    ON wms.reservation_lines (reservation_id);
+
+CREATE INDEX IF NOT EXISTS idx_reservation_lines_inventory_id
+    ON wms.reservation_lines (inventory_id);
+
+-- ATP и поиск кандидатов: остатки товара без обращения к таблице
+CREATE INDEX IF NOT EXISTS idx_inventory_product_available
+    ON wms.inventory (product_id)
+    INCLUDE (location_id, batch_number, quantity, reserved_quantity)
+    WHERE status = 'available' AND quantity > 0;
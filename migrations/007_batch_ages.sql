@@ -0,0 +1,47 @@
+-- Возраст и срок годности партий для FIFO/FEFO-аллокации
+--
+-- wms.batch_ages хранит для каждой партии товара дату первой приёмки
+-- и срок годности. Аллокация (POST /api/inventory/allocate) сортирует
+-- остатки по этой таблице вместо поиска первой приёмки по movements
+-- (как в GET_BATCHES_REPORT) на каждый запрос.
+--
+-- first_received_at поддерживается триггером на приёмку, expires_at
+-- задаётся через PUT /api/inventory/batches/expiry.
+
+CREATE TABLE IF NOT EXISTS wms.batch_ages (
+    product_id VARCHAR(100) NOT NULL,
+    batch_number VARCHAR(50) NOT NULL,
+    first_received_at TIMESTAMPTZ NOT NULL,
+    expires_at DATE,
+    PRIMARY KEY (product_id, batch_number)
+);
+
+CREATE OR REPLACE FUNCTION wms.track_batch_age()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO wms.batch_ages (product_id, batch_number, first_received_at)
+    VALUES (NEW.product_id, NEW.batch_number, NEW.created_at)
+    ON CONFLICT (product_id, batch_number) DO UPDATE
+    SET first_received_at = LEAST(wms.batch_ages.first_received_at, EXCLUDED.first_received_at)
+    WHERE EXCLUDED.first_received_at < wms.batch_ages.first_received_at;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_movements_batch_age ON wms.movements;
+CREATE TRIGGER trg_movements_batch_age
+    AFTER INSERT ON wms.movements
+    FOR EACH ROW
+    WHEN (NEW.movement_type = 'receive' AND NEW.batch_number IS NOT NULL)
+    EXECUTE FUNCTION wms.track_batch_age();
+
+-- Заполнение по уже принятым партиям
+INSERT INTO wms.batch_ages (product_id, batch_number, first_received_at)
+SELECT product_id, batch_number, MIN(created_at)
+FROM wms.movements
+WHERE movement_type = 'receive'
+  AND batch_number IS NOT NULL
+GROUP BY product_id, batch_number
+ON CONFLICT (product_id, batch_number) DO NOTHING;
@@ -0,0 +1,455 @@
+-- Остатки "горячих" товаров без конкуренции за строку inventory
+--
+-- Триггер update_inventory_from_movement() обновляет одну строку
+-- wms.inventory на товар/локацию/партию/контейнер, поэтому параллельные
+-- движения одного товара в одной локации выстраиваются в очередь за
+-- блокировкой этой строки.
+--
+-- Для пар (товар, локация) из wms.hot_inventory_keys доступный остаток
+-- раздаётся квотами (escrow) по шардам wms.inventory_counter_shards:
+-- до 32 шардов на строку inventory, сумма квот не больше остатка.
+-- Движение receive, ship, transfer или write_off, все локации которого
+-- горячие, обслуживается шардами (movements.counter_applied = TRUE):
+--   - списание уменьшает quota и delta одного шарда, где квоты хватает
+--     (CHECK quota >= 0) - остаток не может уйти в минус;
+--   - поступление увеличивает delta одного шарда, если строка inventory
+--     уже есть.
+-- Иначе (квоты ни в одном шарде не хватает, первая приёмка в локацию,
+-- другие типы движений) шарды ключа сливаются в inventory, квоты
+-- отзываются, и движение идёт обычным путём - со всеми проверками
+-- исходного триггера. Квоты выдаются заново при следующем переносе.
+--
+-- wms.compact_inventory_counter_key() переносит накопленные delta ключа
+-- в inventory и заново раздаёт квоты; сервис вызывает её по ключам,
+-- каждый в своей транзакции. Ключ, перенос которого не удался, помечается
+-- в wms.hot_inventory_keys (stuck_since, last_error).
+--
+-- Ещё не перенесённые delta складывают с inventory.quantity: остатки
+-- товара (по одному и пакетно), остатки в локации и в поддереве,
+-- аллокация, резервирование и ATP. Остальные чтения согласованы
+-- в конечном счёте - видят горячие движения только после переноса
+-- (не дольше HOT_COUNTER_COMPACT_INTERVAL): сводка по товарам и её
+-- материализованное представление, поиск, экспорт, лента изменений (004).
+
+CREATE TABLE IF NOT EXISTS wms.hot_inventory_keys (
+    product_id VARCHAR(100) NOT NULL,
+    location_id INTEGER NOT NULL REFERENCES wms.locations (location_id),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (product_id, location_id)
+);
+
+-- Ключ, перенос которого не удался: с какого момента и последняя ошибка
+ALTER TABLE wms.hot_inventory_keys
+    ADD COLUMN IF NOT EXISTS stuck_since TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+-- Пустая строка вместо NULL в партии/контейнере: ключ шарда уникален.
+-- quota - сколько ещё можно списать через шард, delta - неперенесённое
+-- изменение остатка
+CREATE TABLE IF NOT EXISTS wms.inventory_counter_shards (
+    product_id VARCHAR(100) NOT NULL,
+    location_id INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'available',
+    batch_number VARCHAR(50) NOT NULL DEFAULT '',
+    container_code VARCHAR(50) NOT NULL DEFAULT '',
+    shard SMALLINT NOT NULL,
+    delta BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, location_id, status, batch_number, container_code, shard)
+);
+
+ALTER TABLE wms.inventory_counter_shards
+    ADD COLUMN IF NOT EXISTS quota BIGINT NOT NULL DEFAULT 0 CHECK (quota >= 0);
+
+-- Движение учтено в шардах, исходный триггер его пропускает.
+-- Выставляется только триггером trg_movements_hot_counters
+ALTER TABLE wms.movements
+    ADD COLUMN IF NOT EXISTS counter_applied BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE OR REPLACE FUNCTION wms.is_hot_inventory_key(
+    p_product_id VARCHAR,
+    p_location_id INTEGER
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT EXISTS (
+        SELECT 1
+        FROM wms.hot_inventory_keys h
+        WHERE h.product_id = p_product_id
+          AND h.location_id = p_location_id
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION wms.touches_hot_inventory_key(
+    p_product_id VARCHAR,
+    p_from_location_id INTEGER,
+    p_to_location_id INTEGER
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT EXISTS (
+        SELECT 1
+        FROM wms.hot_inventory_keys h
+        WHERE h.product_id = p_product_id
+          AND h.location_id IN (p_from_location_id, p_to_location_id)
+    );
+$$;
+
+-- Списать p_quantity из квоты одного шарда (FALSE - ни в одном шарде
+-- квоты не хватает). Сначала - шарды, не занятые другими движениями,
+-- начиная со случайного; если все подходящие заняты - ожидание одного
+-- из них (после ожидания условие по квоте перепроверяется)
+CREATE OR REPLACE FUNCTION wms.claim_inventory_quota(
+    p_product_id VARCHAR,
+    p_location_id INTEGER,
+    p_batch_number VARCHAR,
+    p_container_code VARCHAR,
+    p_quantity BIGINT
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start INTEGER := floor(random() * 32)::int;
+    v_shard SMALLINT;
+BEGIN
+    SELECT c.shard INTO v_shard
+    FROM wms.inventory_counter_shards c
+    WHERE c.product_id = p_product_id
+      AND c.location_id = p_location_id
+      AND c.status = 'available'
+      AND c.batch_number = COALESCE(p_batch_number, '')
+      AND c.container_code = COALESCE(p_container_code, '')
+      AND c.quota >= p_quantity
+    ORDER BY (c.shard + 32 - v_start) % 32
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF NOT FOUND THEN
+        SELECT c.shard INTO v_shard
+        FROM wms.inventory_counter_shards c
+        WHERE c.product_id = p_product_id
+          AND c.location_id = p_location_id
+          AND c.status = 'available'
+          AND c.batch_number = COALESCE(p_batch_number, '')
+          AND c.container_code = COALESCE(p_container_code, '')
+          AND c.quota >= p_quantity
+        ORDER BY (c.shard + 32 - v_start) % 32
+        LIMIT 1
+        FOR UPDATE;
+
+        IF NOT FOUND THEN
+            RETURN FALSE;
+        END IF;
+    END IF;
+
+    UPDATE wms.inventory_counter_shards c
+    SET quota = c.quota - p_quantity,
+        delta = c.delta - p_quantity
+    WHERE c.product_id = p_product_id
+      AND c.location_id = p_location_id
+      AND c.status = 'available'
+      AND c.batch_number = COALESCE(p_batch_number, '')
+      AND c.container_code = COALESCE(p_container_code, '')
+      AND c.shard = v_shard;
+    RETURN TRUE;
+END;
+$$;
+
+-- Добавить поступление в delta шарда: свободного, начиная со случайного;
+-- если все заняты (или шардов ещё нет) - в случайный
+CREATE OR REPLACE FUNCTION wms.add_inventory_counter_delta(
+    p_product_id VARCHAR,
+    p_location_id INTEGER,
+    p_batch_number VARCHAR,
+    p_container_code VARCHAR,
+    p_delta BIGINT
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start INTEGER := floor(random() * 32)::int;
+BEGIN
+    UPDATE wms.inventory_counter_shards c
+    SET delta = c.delta + p_delta
+    WHERE c.product_id = p_product_id
+      AND c.location_id = p_location_id
+      AND c.status = 'available'
+      AND c.batch_number = COALESCE(p_batch_number, '')
+      AND c.container_code = COALESCE(p_container_code, '')
+      AND c.shard = (
+          SELECT f.shard
+          FROM wms.inventory_counter_shards f
+          WHERE f.product_id = p_product_id
+            AND f.location_id = p_location_id
+            AND f.status = 'available'
+            AND f.batch_number = COALESCE(p_batch_number, '')
+            AND f.container_code = COALESCE(p_container_code, '')
+          ORDER BY (f.shard + 32 - v_start) % 32
+          LIMIT 1
+          FOR UPDATE SKIP LOCKED
+      );
+
+    IF NOT FOUND THEN
+        INSERT INTO wms.inventory_counter_shards (
+            product_id, location_id, status, batch_number, container_code, shard, delta
+        )
+        VALUES (
+            p_product_id,
+            p_location_id,
+            'available',
+            COALESCE(p_batch_number, ''),
+            COALESCE(p_container_code, ''),
+            v_start,
+            p_delta
+        )
+        ON CONFLICT (product_id, location_id, status, batch_number, container_code, shard)
+        DO UPDATE SET delta = wms.inventory_counter_shards.delta + EXCLUDED.delta;
+    END IF;
+END;
+$$;
+
+-- Перенести delta ключа (товар, локация) в inventory и заново раздать
+-- квоты (p_reissue и ключ горячий) либо отозвать их. Блокировки - сначала
+-- строки inventory ключа, затем его шарды: списания через шарды ждут
+-- только на шардах, поэтому перенос видит все завершённые списания.
+-- Возвращает число обновлённых строк inventory
+CREATE OR REPLACE FUNCTION wms.compact_inventory_counter_key(
+    p_product_id VARCHAR,
+    p_location_id INTEGER,
+    p_reissue BOOLEAN DEFAULT TRUE
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    k RECORD;
+    compacted INTEGER := 0;
+BEGIN
+    PERFORM 1
+    FROM wms.inventory i
+    WHERE i.product_id = p_product_id
+      AND i.location_id = p_location_id
+    ORDER BY i.inventory_id
+    FOR UPDATE;
+
+    PERFORM 1
+    FROM wms.inventory_counter_shards s
+    WHERE s.product_id = p_product_id
+      AND s.location_id = p_location_id
+    ORDER BY s.status, s.batch_number, s.container_code, s.shard
+    FOR UPDATE;
+
+    FOR k IN
+        SELECT s.status, s.batch_number, s.container_code, SUM(s.delta) as delta
+        FROM wms.inventory_counter_shards s
+        WHERE s.product_id = p_product_id
+          AND s.location_id = p_location_id
+        GROUP BY s.status, s.batch_number, s.container_code
+        HAVING SUM(s.delta) <> 0
+    LOOP
+        UPDATE wms.inventory i
+        SET quantity = i.quantity + k.delta,
+            updated_at = NOW()
+        WHERE i.product_id = p_product_id
+          AND i.location_id = p_location_id
+          AND i.status = k.status
+          AND i.batch_number IS NOT DISTINCT FROM NULLIF(k.batch_number, '')
+          AND i.container_code IS NOT DISTINCT FROM NULLIF(k.container_code, '');
+
+        IF NOT FOUND THEN
+            INSERT INTO wms.inventory (
+                product_id, location_id, quantity, status, batch_number, container_code
+            )
+            VALUES (
+                p_product_id, p_location_id, k.delta, k.status,
+                NULLIF(k.batch_number, ''), NULLIF(k.container_code, '')
+            );
+        END IF;
+
+        compacted := compacted + 1;
+    END LOOP;
+
+    IF NOT (p_reissue AND wms.is_hot_inventory_key(p_product_id, p_location_id)) THEN
+        DELETE FROM wms.inventory_counter_shards s
+        WHERE s.product_id = p_product_id
+          AND s.location_id = p_location_id;
+        RETURN compacted;
+    END IF;
+
+    -- Шарды обновляются на месте, а не пересоздаются: списание, ждущее
+    -- шард, после переноса увидит его новую квоту
+    UPDATE wms.inventory_counter_shards s
+    SET quota = 0,
+        delta = 0
+    WHERE s.product_id = p_product_id
+      AND s.location_id = p_location_id
+      AND (s.quota <> 0 OR s.delta <> 0);
+
+    INSERT INTO wms.inventory_counter_shards (
+        product_id, location_id, status, batch_number, container_code, shard, quota
+    )
+    SELECT
+        i.product_id,
+        i.location_id,
+        i.status,
+        COALESCE(i.batch_number, ''),
+        COALESCE(i.container_code, ''),
+        g.shard,
+        i.quantity / n.shards + CASE WHEN g.shard < i.quantity % n.shards THEN 1 ELSE 0 END
+    FROM wms.inventory i
+    CROSS JOIN LATERAL (SELECT LEAST(32, i.quantity)::int as shards) n
+    CROSS JOIN LATERAL generate_series(0, n.shards - 1) AS g(shard)
+    WHERE i.product_id = p_product_id
+      AND i.location_id = p_location_id
+      AND i.status = 'available'
+      AND i.quantity > 0
+    ON CONFLICT (product_id, location_id, status, batch_number, container_code, shard)
+    DO UPDATE SET quota = EXCLUDED.quota;
+
+    UPDATE wms.hot_inventory_keys h
+    SET stuck_since = NULL,
+        last_error = NULL
+    WHERE h.product_id = p_product_id
+      AND h.location_id = p_location_id
+      AND h.stuck_since IS NOT NULL;
+
+    RETURN compacted;
+END;
+$$;
+
+-- Маршрутизация движения, затрагивающего горячий ключ (BEFORE INSERT)
+CREATE OR REPLACE FUNCTION wms.route_hot_movement()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_escrow BOOLEAN;
+    v_location_id INTEGER;
+BEGIN
+    v_escrow := NEW.movement_type IN ('receive', 'ship', 'transfer', 'write_off')
+        AND (NEW.from_location_id IS NULL
+             OR wms.is_hot_inventory_key(NEW.product_id, NEW.from_location_id))
+        AND (NEW.to_location_id IS NULL
+             OR wms.is_hot_inventory_key(NEW.product_id, NEW.to_location_id));
+
+    -- Поступление через шард - только в существующую строку inventory,
+    -- иначе до переноса оно не было бы видно
+    IF v_escrow AND NEW.to_location_id IS NOT NULL THEN
+        v_escrow := EXISTS (
+            SELECT 1
+            FROM wms.inventory i
+            WHERE i.product_id = NEW.product_id
+              AND i.location_id = NEW.to_location_id
+              AND i.status = 'available'
+              AND i.batch_number IS NOT DISTINCT FROM NEW.batch_number
+              AND i.container_code IS NOT DISTINCT FROM NEW.container_code
+        );
+    END IF;
+
+    IF v_escrow AND NEW.from_location_id IS NOT NULL THEN
+        v_escrow := wms.claim_inventory_quota(
+            NEW.product_id, NEW.from_location_id, NEW.batch_number, NEW.container_code,
+            NEW.quantity
+        );
+    END IF;
+
+    IF v_escrow THEN
+        IF NEW.to_location_id IS NOT NULL THEN
+            PERFORM wms.add_inventory_counter_delta(
+                NEW.product_id, NEW.to_location_id, NEW.batch_number, NEW.container_code,
+                NEW.quantity
+            );
+        END IF;
+        NEW.counter_applied := TRUE;
+        RETURN NEW;
+    END IF;
+
+    -- Обычный путь: сначала слить шарды горячих локаций (в порядке
+    -- location_id), чтобы исходный триггер проверял полный остаток
+    FOR v_location_id IN
+        SELECT l.location_id
+        FROM unnest(ARRAY[NEW.from_location_id, NEW.to_location_id]) AS l(location_id)
+        WHERE l.location_id IS NOT NULL
+          AND wms.is_hot_inventory_key(NEW.product_id, l.location_id)
+        ORDER BY l.location_id
+    LOOP
+        PERFORM wms.compact_inventory_counter_key(NEW.product_id, v_location_id, FALSE);
+    END LOOP;
+    NEW.counter_applied := FALSE;
+    RETURN NEW;
+END;
+$$;
+
+-- Прежняя версия: AFTER-триггер писал delta без проверок
+DROP TRIGGER IF EXISTS trg_movements_hot_counters ON wms.movements;
+DROP FUNCTION IF EXISTS wms.append_hot_movement_deltas();
+DROP FUNCTION IF EXISTS wms.compact_inventory_counters();
+
+CREATE TRIGGER trg_movements_hot_counters
+    BEFORE INSERT ON wms.movements
+    FOR EACH ROW
+    WHEN (wms.touches_hot_inventory_key(
+        NEW.product_id, NEW.from_location_id, NEW.to_location_id
+    ))
+    EXECUTE FUNCTION wms.route_hot_movement();
+
+-- Исходный триггер пропускает движения, учтённые в шардах: пересоздаём
+-- его с условием WHEN, сохраняя имя, момент срабатывания и события.
+-- Триггер должен быть ровно один - иначе миграция прерывается, чтобы
+-- горячие движения не обновили inventory дважды (через триггер и перенос).
+DO $$
+DECLARE
+    t RECORD;
+    base_def TEXT;
+    guarded_def TEXT;
+    triggers INTEGER := 0;
+BEGIN
+    FOR t IN
+        SELECT tg.tgname, tg.tgqual IS NOT NULL as has_when, pg_get_triggerdef(tg.oid) as def
+        FROM pg_trigger tg
+        JOIN pg_proc p ON p.oid = tg.tgfoid
+        WHERE tg.tgrelid = 'wms.movements'::regclass
+          AND p.proname = 'update_inventory_from_movement'
+          AND NOT tg.tgisinternal
+    LOOP
+        triggers := triggers + 1;
+        base_def := t.def;
+        IF t.has_when THEN
+            -- Повторный запуск миграции: условие уже добавлено
+            IF position('counter_applied' in t.def) > 0 THEN
+                CONTINUE;
+            END IF;
+            -- Условие прежней версии миграции снимается, другие - нет
+            IF position('is_hot_movement' in t.def) = 0 THEN
+                RAISE EXCEPTION 'Триггер % на wms.movements уже имеет условие WHEN: %',
+                    t.tgname, t.def;
+            END IF;
+            base_def := regexp_replace(
+                t.def, ' WHEN \(.*\) EXECUTE FUNCTION ', ' EXECUTE FUNCTION '
+            );
+        END IF;
+        guarded_def := replace(
+            base_def,
+            ' EXECUTE FUNCTION ',
+            ' WHEN (NOT NEW.counter_applied) EXECUTE FUNCTION '
+        );
+        IF guarded_def = base_def THEN
+            RAISE EXCEPTION 'Не удалось добавить условие в триггер %: %', t.tgname, t.def;
+        END IF;
+        EXECUTE format('DROP TRIGGER %I ON wms.movements', t.tgname);
+        EXECUTE guarded_def;
+    END LOOP;
+
+    IF triggers <> 1 THEN
+        RAISE EXCEPTION 'Ожидался один триггер update_inventory_from_movement() '
+            'на wms.movements, найдено: %', triggers;
+    END IF;
+END;
+$$;
+
+DROP FUNCTION IF EXISTS wms.is_hot_movement(VARCHAR, VARCHAR, INTEGER, INTEGER);
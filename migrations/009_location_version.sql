@@ -0,0 +1,68 @@
+-- Версия справочника локаций
+--
+-- Любое изменение wms.locations (создание, обновление, деактивация)
+-- увеличивает wms.location_version.version и отправляет
+-- NOTIFY wms_locations_changed. Сервис кэширует дерево зон по версии
+-- и отдаёт её в ETag (GET /api/locations/zones/tree).
+
+CREATE TABLE IF NOT EXISTS wms.location_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 1,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO wms.location_version (id) VALUES (TRUE)
+ON CONFLICT (id) DO NOTHING;
+
+-- Уровня оператора: массовое изменение увеличивает версию один раз.
+-- Оператор, не изменивший ни одной строки (dry run, отказ в деактивации),
+-- версию не трогает: иначе он разослал бы NOTIFY, сбросил ETag и индекс
+-- локаций во всех процессах и заблокировал строку location_version
+CREATE OR REPLACE FUNCTION wms.bump_location_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE wms.location_version
+    SET version = version + 1,
+        changed_at = NOW()
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('wms_locations_changed', new_version::text);
+    RETURN NULL;
+END;
+$$;
+
+-- Таблицы переходов задаются для каждого события отдельно
+DROP TRIGGER IF EXISTS trg_locations_version ON wms.locations;
+DROP TRIGGER IF EXISTS trg_locations_version_insert ON wms.locations;
+DROP TRIGGER IF EXISTS trg_locations_version_update ON wms.locations;
+DROP TRIGGER IF EXISTS trg_locations_version_delete ON wms.locations;
+
+CREATE TRIGGER trg_locations_version_insert
+    AFTER INSERT ON wms.locations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION wms.bump_location_version();
+
+CREATE TRIGGER trg_locations_version_update
+    AFTER UPDATE ON wms.locations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION wms.bump_location_version();
+
+CREATE TRIGGER trg_locations_version_delete
+    AFTER DELETE ON wms.locations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION wms.bump_location_version();
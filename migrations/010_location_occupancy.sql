@@ -0,0 +1,351 @@
+-- Индекс занятости ячеек и удержания ячеек под размещение (putaway)
+--
+-- wms.location_occupancy хранит по каждой локации занятый вес, объём,
+-- количество единиц и число непустых строк остатков, поэтому поиск
+-- свободной ячейки не пересчитывает загрузку по inventory на каждый вызов.
+--
+-- Триггеры на wms.inventory (остатки, в свою очередь, обновляются из
+-- movements) не трогают location_occupancy, а только дописывают delta
+-- в журнал wms.location_occupancy_deltas, как шарды счётчиков в 008:
+-- движения в одну ячейку не ждут друг друга на её строке занятости и не
+-- взаимоблокируются на паре строк (откуда, куда). Журнал сворачивается
+-- в location_occupancy фоновой задачей (wms.fold_location_occupancy()),
+-- а читатели берут занятость из wms.location_occupancy_current - строка
+-- плюс ещё не свёрнутые delta. Delta горячих счётчиков (008) попадают
+-- сюда после переноса в inventory.
+--
+-- wms.putaway_reservations - короткие удержания ячейки под паллету:
+-- пока удержание не истекло, его вес и объём считаются занятыми, и
+-- параллельные запросы на размещение не направляют товар в ту же ячейку.
+-- Любое движение в ячейку (REST, распаковка контейнера, пакетные вставки)
+-- уменьшает удержания под этот товар триггером на wms.movements.
+--
+-- Ячейкой для размещения считается активная локация с заданной
+-- вместимостью (max_weight > 0 или max_volume > 0); нулевой предел
+-- по одному из измерений означает, что оно не ограничено.
+
+-- Вес (кг) и объём (м³) единицы товара
+ALTER TABLE public.products
+    ADD COLUMN IF NOT EXISTS weight NUMERIC(12, 3),
+    ADD COLUMN IF NOT EXISTS volume NUMERIC(12, 6);
+
+CREATE TABLE IF NOT EXISTS wms.location_occupancy (
+    location_id INTEGER PRIMARY KEY REFERENCES wms.locations(location_id) ON DELETE CASCADE,
+    used_weight NUMERIC(14, 3) NOT NULL DEFAULT 0,
+    used_volume NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    units BIGINT NOT NULL DEFAULT 0,
+    stock_rows INTEGER NOT NULL DEFAULT 0,  -- строки inventory с quantity > 0
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Журнал delta занятости: только INSERT из триггеров, сворачивается
+-- в location_occupancy и удаляется wms.fold_location_occupancy()
+CREATE TABLE IF NOT EXISTS wms.location_occupancy_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    location_id INTEGER NOT NULL REFERENCES wms.locations(location_id) ON DELETE CASCADE,
+    used_weight NUMERIC(14, 3) NOT NULL DEFAULT 0,
+    used_volume NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    units BIGINT NOT NULL DEFAULT 0,
+    stock_rows INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_location_occupancy_deltas_location
+    ON wms.location_occupancy_deltas (location_id);
+
+-- Занятость с учётом ещё не свёрнутых delta
+CREATE OR REPLACE VIEW wms.location_occupancy_current AS
+SELECT
+    o.location_id,
+    SUM(o.used_weight) as used_weight,
+    SUM(o.used_volume) as used_volume,
+    SUM(o.units) as units,
+    SUM(o.stock_rows) as stock_rows
+FROM (
+    SELECT location_id, used_weight, used_volume, units, stock_rows
+    FROM wms.location_occupancy
+    UNION ALL
+    SELECT location_id, used_weight, used_volume, units, stock_rows
+    FROM wms.location_occupancy_deltas
+) o
+GROUP BY o.location_id;
+
+CREATE TABLE IF NOT EXISTS wms.putaway_reservations (
+    putaway_reservation_id BIGSERIAL PRIMARY KEY,
+    location_id INTEGER NOT NULL REFERENCES wms.locations(location_id) ON DELETE CASCADE,
+    product_id VARCHAR(100) NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    weight NUMERIC(14, 3) NOT NULL DEFAULT 0,
+    volume NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_putaway_reservations_location
+    ON wms.putaway_reservations (location_id, expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_putaway_reservations_expires
+    ON wms.putaway_reservations (expires_at);
+
+-- Ячейки для размещения по типу зоны
+CREATE INDEX IF NOT EXISTS idx_locations_putaway_slots
+    ON wms.locations (zone_type, location_code)
+    WHERE is_active AND (max_weight > 0 OR max_volume > 0);
+
+-- Дописать delta остатков в журнал занятости: одна строка на локацию,
+-- нулевые delta отбрасываются. Только INSERT - без блокировок строк.
+CREATE OR REPLACE FUNCTION wms.add_location_occupancy(
+    p_location_ids INTEGER[],
+    p_product_ids VARCHAR[],
+    p_quantities NUMERIC[],
+    p_stock_rows INTEGER[]
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO wms.location_occupancy_deltas (
+        location_id, used_weight, used_volume, units, stock_rows
+    )
+    SELECT
+        d.location_id,
+        SUM(d.quantity * COALESCE(p.weight, 0)),
+        SUM(d.quantity * COALESCE(p.volume, 0)),
+        SUM(d.quantity),
+        SUM(d.stock_rows)
+    FROM unnest(p_location_ids, p_product_ids, p_quantities, p_stock_rows)
+        AS d(location_id, product_id, quantity, stock_rows)
+    LEFT JOIN public.products p ON p.id = d.product_id
+    GROUP BY d.location_id
+    HAVING SUM(d.quantity) <> 0 OR SUM(d.stock_rows) <> 0;
+$$;
+
+CREATE OR REPLACE FUNCTION wms.refresh_location_occupancy()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM wms.add_location_occupancy(
+            array_agg(location_id), array_agg(product_id),
+            array_agg(quantity::numeric), array_agg((quantity > 0)::int)
+        )
+        FROM new_rows;
+    ELSE
+        PERFORM wms.add_location_occupancy(
+            array_agg(location_id), array_agg(product_id),
+            array_agg(-quantity::numeric), array_agg(-(quantity > 0)::int)
+        )
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- UPDATE: строка уходит со старыми значениями и приходит с новыми
+CREATE OR REPLACE FUNCTION wms.refresh_location_occupancy_on_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM wms.add_location_occupancy(
+        ARRAY[OLD.location_id, NEW.location_id],
+        ARRAY[OLD.product_id, NEW.product_id],
+        ARRAY[-OLD.quantity::numeric, NEW.quantity::numeric],
+        ARRAY[-(OLD.quantity > 0)::int, (NEW.quantity > 0)::int]
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_inventory_occupancy_ins ON wms.inventory;
+CREATE TRIGGER trg_inventory_occupancy_ins
+    AFTER INSERT ON wms.inventory
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.refresh_location_occupancy();
+
+-- Построчный: transition tables недопустимы в триггере со списком столбцов,
+-- а список нужен, чтобы UPDATE одного reserved_quantity триггер не вызывал
+DROP TRIGGER IF EXISTS trg_inventory_occupancy_upd ON wms.inventory;
+CREATE TRIGGER trg_inventory_occupancy_upd
+    AFTER UPDATE OF quantity, location_id, product_id ON wms.inventory
+    FOR EACH ROW
+    WHEN (
+        OLD.quantity IS DISTINCT FROM NEW.quantity
+        OR OLD.location_id IS DISTINCT FROM NEW.location_id
+        OR OLD.product_id IS DISTINCT FROM NEW.product_id
+    )
+    EXECUTE FUNCTION wms.refresh_location_occupancy_on_update();
+
+DROP TRIGGER IF EXISTS trg_inventory_occupancy_del ON wms.inventory;
+CREATE TRIGGER trg_inventory_occupancy_del
+    AFTER DELETE ON wms.inventory
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.refresh_location_occupancy();
+
+-- Свернуть до p_limit самых старых delta журнала в location_occupancy.
+-- Удаление delta и прибавление к строке - в одной транзакции, поэтому
+-- location_occupancy_current не меняется. Параллельные вызовы берут
+-- разные delta (SKIP LOCKED) и обновляют строки в порядке location_id.
+-- Возвращает число свёрнутых delta.
+CREATE OR REPLACE FUNCTION wms.fold_location_occupancy(p_limit INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_folded INTEGER;
+BEGIN
+    WITH moved AS (
+        DELETE FROM wms.location_occupancy_deltas
+        WHERE delta_id IN (
+            SELECT delta_id
+            FROM wms.location_occupancy_deltas
+            ORDER BY delta_id
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING location_id, used_weight, used_volume, units, stock_rows
+    ),
+    folded AS (
+        INSERT INTO wms.location_occupancy AS o (
+            location_id, used_weight, used_volume, units, stock_rows, updated_at
+        )
+        SELECT
+            location_id,
+            SUM(used_weight),
+            SUM(used_volume),
+            SUM(units),
+            SUM(stock_rows),
+            NOW()
+        FROM moved
+        GROUP BY location_id
+        ORDER BY location_id
+        ON CONFLICT (location_id) DO UPDATE
+        SET used_weight = o.used_weight + EXCLUDED.used_weight,
+            used_volume = o.used_volume + EXCLUDED.used_volume,
+            units = o.units + EXCLUDED.units,
+            stock_rows = o.stock_rows + EXCLUDED.stock_rows,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT COUNT(*) INTO v_folded FROM moved;
+    RETURN v_folded;
+END;
+$$;
+
+-- Изменение веса или объёма товара дописывает delta занятости его локаций
+CREATE OR REPLACE FUNCTION wms.refresh_location_occupancy_on_product()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.weight IS DISTINCT FROM OLD.weight OR NEW.volume IS DISTINCT FROM OLD.volume THEN
+        INSERT INTO wms.location_occupancy_deltas (location_id, used_weight, used_volume)
+        SELECT
+            i.location_id,
+            i.quantity * (COALESCE(NEW.weight, 0) - COALESCE(OLD.weight, 0)),
+            i.quantity * (COALESCE(NEW.volume, 0) - COALESCE(OLD.volume, 0))
+        FROM (
+            SELECT location_id, SUM(quantity) as quantity
+            FROM wms.inventory
+            WHERE product_id = NEW.id
+            GROUP BY location_id
+        ) i
+        WHERE i.quantity <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_location_occupancy ON public.products;
+CREATE TRIGGER trg_products_location_occupancy
+    AFTER UPDATE OF weight, volume ON public.products
+    FOR EACH ROW
+    EXECUTE FUNCTION wms.refresh_location_occupancy_on_product();
+
+-- Поступивший в ячейку товар занимает место сам (location_occupancy),
+-- поэтому удержания ячейки под этот товар уменьшаются на поступившее
+-- количество: от старых к новым, полностью покрытые удаляются, последнее
+-- частично покрытое уменьшается вместе с весом и объёмом. Statement-level:
+-- пакетная вставка движений (распаковка контейнера) обрабатывается одним
+-- проходом, удержания блокируются в порядке (location_id, id).
+CREATE OR REPLACE FUNCTION wms.consume_putaway_reservations()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH arrived AS (
+        SELECT product_id, to_location_id as location_id, SUM(quantity) as quantity
+        FROM new_rows
+        WHERE to_location_id IS NOT NULL
+          AND quantity > 0
+        GROUP BY product_id, to_location_id
+    ),
+    holds AS (
+        SELECT
+            h.putaway_reservation_id,
+            h.quantity,
+            a.quantity as arrived,
+            SUM(h.quantity) OVER (
+                PARTITION BY h.product_id, h.location_id
+                ORDER BY h.created_at, h.putaway_reservation_id
+            ) - h.quantity as quantity_before
+        FROM (
+            SELECT r.putaway_reservation_id, r.product_id, r.location_id, r.quantity, r.created_at
+            FROM wms.putaway_reservations r
+            JOIN arrived a ON a.product_id = r.product_id AND a.location_id = r.location_id
+            WHERE r.expires_at > NOW()
+            ORDER BY r.location_id, r.putaway_reservation_id
+            FOR UPDATE OF r
+        ) h
+        JOIN arrived a ON a.product_id = h.product_id AND a.location_id = h.location_id
+    ),
+    consumed AS (
+        SELECT
+            putaway_reservation_id,
+            quantity,
+            LEAST(quantity, arrived - quantity_before) as taken
+        FROM holds
+        WHERE quantity_before < arrived
+    ),
+    released AS (
+        DELETE FROM wms.putaway_reservations r
+        USING consumed c
+        WHERE r.putaway_reservation_id = c.putaway_reservation_id
+          AND c.taken = c.quantity
+    )
+    UPDATE wms.putaway_reservations r
+    SET quantity = r.quantity - c.taken,
+        weight = r.weight * (r.quantity - c.taken) / r.quantity,
+        volume = r.volume * (r.quantity - c.taken) / r.quantity
+    FROM consumed c
+    WHERE r.putaway_reservation_id = c.putaway_reservation_id
+      AND c.taken < c.quantity;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_movements_consume_putaway ON wms.movements;
+CREATE TRIGGER trg_movements_consume_putaway
+    AFTER INSERT ON wms.movements
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION wms.consume_putaway_reservations();
+
+-- Начальное заполнение по текущим остаткам (журнал пересчитывается заново)
+DELETE FROM wms.location_occupancy_deltas;
+
+INSERT INTO wms.location_occupancy (location_id, used_weight, used_volume, units, stock_rows)
+SELECT
+    i.location_id,
+    SUM(i.quantity * COALESCE(p.weight, 0)),
+    SUM(i.quantity * COALESCE(p.volume, 0)),
+    SUM(i.quantity),
+    COUNT(*) FILTER (WHERE i.quantity > 0)
+FROM wms.inventory i
+LEFT JOIN public.products p ON p.id = i.product_id
+GROUP BY i.location_id
+ON CONFLICT (location_id) DO UPDATE
+SET used_weight = EXCLUDED.used_weight,
+    used_volume = EXCLUDED.used_volume,
+    units = EXCLUDED.units,
+    stock_rows = EXCLUDED.stock_rows,
+    updated_at = NOW();
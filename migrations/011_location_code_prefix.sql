@@ -0,0 +1,14 @@
+-- Поиск локаций по началу кода без учёта регистра
+--
+-- Автодополнение кода (GET /api/locations/autocomplete) обычно
+-- отвечает из индекса иерархии в памяти сервиса; в БД запрос идёт,
+-- пока индекс не загружен. Ключ - lower() от кода в NFC, как можно
+-- ближе к code_key индекса (NFC + casefold); расхождения casefold и
+-- lower (ß, ſ, лигатуры) сервис досеивает по code_key.
+-- text_pattern_ops позволяет использовать индекс для LIKE 'префикс%'
+-- при любой collation базы.
+
+DROP INDEX IF EXISTS wms.idx_locations_code_lower_prefix;
+
+CREATE INDEX IF NOT EXISTS idx_locations_code_key_prefix
+    ON wms.locations (lower(normalize(location_code, NFC)) text_pattern_ops);
@@ -0,0 +1,63 @@
+-- Срок хранения ленты изменений остатков
+--
+-- wms.inventory_changes (004) получает строку на каждое изменение
+-- остатка. wms.prune_inventory_changes() удаляет строки старше срока
+-- хранения пачками и запоминает позицию (txid, change_id) самого
+-- позднего удалённого изменения. Токен продолжения раньше этой позиции
+-- означает, что часть изменений после него уже удалена: клиент получает
+-- сигнал пересинхронизации (полная выгрузка и новый watermark).
+
+CREATE TABLE IF NOT EXISTS wms.inventory_changes_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    pruned_txid XID8 NOT NULL DEFAULT '0',
+    pruned_change_id BIGINT NOT NULL DEFAULT 0,
+    pruned_at TIMESTAMPTZ
+);
+
+INSERT INTO wms.inventory_changes_horizon (id) VALUES (TRUE)
+ON CONFLICT (id) DO NOTHING;
+
+-- Удалить не более p_limit изменений старше p_retention.
+-- Возвращает число удалённых строк.
+CREATE OR REPLACE FUNCTION wms.prune_inventory_changes(
+    p_retention INTERVAL,
+    p_limit INTEGER
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_txid XID8;
+    v_change_id BIGINT;
+    v_deleted INTEGER;
+BEGIN
+    WITH deleted AS (
+        DELETE FROM wms.inventory_changes
+        WHERE change_id IN (
+            SELECT change_id
+            FROM wms.inventory_changes
+            WHERE changed_at < NOW() - p_retention
+            ORDER BY changed_at
+            LIMIT p_limit
+        )
+        RETURNING txid, change_id
+    )
+    SELECT d.txid, d.change_id, COUNT(*) OVER ()
+    INTO v_txid, v_change_id, v_deleted
+    FROM deleted d
+    ORDER BY d.txid DESC, d.change_id DESC
+    LIMIT 1;
+
+    IF v_deleted IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    UPDATE wms.inventory_changes_horizon
+    SET pruned_txid = v_txid,
+        pruned_change_id = v_change_id,
+        pruned_at = NOW()
+    WHERE (pruned_txid, pruned_change_id) < (v_txid, v_change_id);
+
+    RETURN v_deleted;
+END;
+$$;